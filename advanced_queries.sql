@@ -43,7 +43,7 @@ BEGIN
     DECLARE userId INT;
     DECLARE shelterId INT;
     DECLARE petPrice DECIMAL(10,2);
-    DECLARE userWallet DECIMAL(10,2);
+    DECLARE userWallet DECIMAL(12,2);
 
     -- Update adoption application status
     UPDATE AdopterApplication
@@ -53,13 +53,13 @@ BEGIN
     IF new_status = 'approved' THEN
         SELECT pet_id, user_id INTO petId, userId FROM AdopterApplication WHERE application_id = app_id;
         SELECT price, shelter_id INTO petPrice, shelterId FROM Pet WHERE pet_id = petId;
-        SELECT wallet INTO userWallet FROM User WHERE user_id = userId;
+        CALL wallet_lock(userId, 32, userWallet);
 
-        IF userWallet < petPrice THEN
+        IF IFNULL(userWallet, 0) < petPrice THEN
             SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Insufficient funds in user wallet. Adoption cannot be approved.';
         END IF;
 
-        UPDATE User SET wallet = wallet - petPrice WHERE user_id = userId;
+        CALL wallet_post(userId, -petPrice, 'adoption', CONCAT('application:', app_id), CONCAT('adoption:', app_id));
         UPDATE Shelter SET inventory = inventory + petPrice WHERE shelter_id = shelterId;
         UPDATE Pet SET status = 'Adopted' WHERE pet_id = petId;
         DELETE FROM CaretakerPet WHERE pet_id = petId;
@@ -156,8 +156,11 @@ DELIMITER $$
 CREATE FUNCTION GetUserWallet(p_user_id INT) RETURNS DECIMAL(10,2) DETERMINISTIC
 READS SQL DATA
 BEGIN
-    DECLARE user_wallet DECIMAL(10,2);
-    SELECT wallet INTO user_wallet FROM User WHERE user_id = p_user_id;
+    DECLARE user_wallet DECIMAL(12,2);
+    -- Ledger snapshot plus the rows not folded into it yet (see section 14 of routines_and_triggers.sql)
+    SELECT b.balance + COALESCE((SELECT SUM(t.amount) FROM WalletTransaction t
+                                 WHERE t.user_id = b.user_id AND t.txn_id > b.last_txn_id), 0)
+      INTO user_wallet FROM WalletBalance b WHERE b.user_id = p_user_id;
     RETURN IFNULL(user_wallet, 0.00);
 END $$
 DELIMITER ;
@@ -166,9 +169,10 @@ DELIMITER $$
 CREATE FUNCTION GetShelterCaretakerCount(p_shelter_id INT) RETURNS INT DETERMINISTIC
 READS SQL DATA
 BEGIN
-    DECLARE caretaker_count INT;
-    SELECT COUNT(*) INTO caretaker_count FROM Caretaker WHERE shelter_id = p_shelter_id;
-    RETURN caretaker_count;
+    DECLARE v_caretaker_count INT;
+    -- Maintained by triggers in sharded rows (see ShelterStats in routines_and_triggers.sql)
+    SELECT SUM(caretaker_count) INTO v_caretaker_count FROM ShelterStats WHERE shelter_id = p_shelter_id;
+    RETURN IFNULL(v_caretaker_count, 0);
 END $$
 DELIMITER ;
 
@@ -177,8 +181,9 @@ CREATE FUNCTION GetShelterPetCount(p_shelter_id INT) RETURNS INT DETERMINISTIC
 READS SQL DATA
 BEGIN
     DECLARE pet_count INT;
-    SELECT COUNT(*) INTO pet_count FROM Pet WHERE shelter_id = p_shelter_id AND status = 'Available';
-    RETURN pet_count;
+    -- Maintained by triggers in sharded rows (see ShelterStats in routines_and_triggers.sql)
+    SELECT SUM(available_count) INTO pet_count FROM ShelterStats WHERE shelter_id = p_shelter_id;
+    RETURN IFNULL(pet_count, 0);
 END $$
 DELIMITER ;
 
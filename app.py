@@ -1,14 +1,34 @@
 """
 Pet Adoption & Inventory Management System - Flask Backend
 """
-from flask import Flask, request, jsonify, render_template, session
+from flask import Flask, request, jsonify, render_template, session, g, make_response, Response, stream_with_context, has_request_context
 from flask_cors import CORS
 import mysql.connector
 from mysql.connector import Error
-from datetime import datetime
+from datetime import date, datetime, timezone
+from decimal import Decimal
+import base64
+import bisect
+import click
+import concurrent.futures
+import csv
+import gzip
+import hashlib
+import hmac
+import io
+import json
+import mimetypes
 import os
-from functools import wraps
+import queue
+import re
+import secrets
+import threading
+import time
+import unicodedata
+from collections import OrderedDict, defaultdict, deque
+from functools import lru_cache, wraps
 from dotenv import load_dotenv
+from werkzeug.http import parse_accept_header
 
 load_dotenv()
 
@@ -27,15 +47,183 @@ DB_CONFIG = {
     'database': os.environ.get('DB_NAME', 'pet_center')
 }
 
+# Connection pool configuration
+POOL_CONFIG = {
+    'size': int(os.environ.get('DB_POOL_SIZE', 10)),                 # connections kept open while idle
+    'max_overflow': int(os.environ.get('DB_POOL_MAX_OVERFLOW', 10)), # extra connections allowed under load
+    'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 5)),          # seconds to wait for a free connection
+    'pre_ping': os.environ.get('DB_POOL_PRE_PING', '1') == '1',      # health-check a connection on borrow
+    'recycle': float(os.environ.get('DB_POOL_RECYCLE', 1800)),       # max connection lifetime in seconds
+}
+
+
+class PoolTimeout(Error):
+    """Raised when no connection could be checked out within the pool timeout"""
+
+
+class ConnectionPool:
+    """Thread-safe pool of MySQL connections built around DB_CONFIG.
+
+    Keeps up to `size` idle connections open and allows `max_overflow` extra
+    connections under load; overflow connections are closed when returned.
+    """
+
+    def __init__(self, db_config, size=10, max_overflow=10, timeout=5.0, pre_ping=True, recycle=1800):
+        self.db_config = db_config
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.pre_ping = pre_ping
+        self.recycle = recycle
+        self._idle = []      # list of (connection, created_at)
+        self._created = {}   # id(connection) -> created_at for every open connection
+        self._pending = 0    # slots reserved by connects in progress
+        self._cond = threading.Condition()
+        self._stats = {'checkouts': 0, 'waits': 0, 'timeouts': 0, 'created': 0, 'discarded': 0}
+
+    def _discard(self, conn):
+        self._created.pop(id(conn), None)
+        self._stats['discarded'] += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _is_usable(self, conn, created_at):
+        if self.recycle and time.monotonic() - created_at > self.recycle:
+            return False
+        if self.pre_ping:
+            try:
+                conn.ping(reconnect=False)
+            except Exception:
+                return False
+        return True
+
+    def acquire(self):
+        """Borrow a connection, waiting up to `timeout` seconds when the pool is exhausted"""
+        deadline = time.monotonic() + self.timeout
+        waited = False
+        while True:
+            with self._cond:
+                while not self._idle and len(self._created) + self._pending >= self.size + self.max_overflow:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeout(msg=f"Timed out after {self.timeout}s waiting for a database connection")
+                    if not waited:
+                        self._stats['waits'] += 1
+                        waited = True
+                    self._cond.wait(remaining)
+                if self._idle:
+                    conn, created_at = self._idle.pop()
+                else:
+                    # Reserve a slot, then connect outside the lock
+                    conn, created_at = None, None
+                    self._pending += 1
+            if conn is None:
+                try:
+                    conn = mysql.connector.connect(**self.db_config)
+                finally:
+                    with self._cond:
+                        self._pending -= 1
+                        self._cond.notify()
+                with self._cond:
+                    self._created[id(conn)] = time.monotonic()
+                    self._stats['created'] += 1
+                    self._stats['checkouts'] += 1
+                return conn
+            if self._is_usable(conn, created_at):
+                with self._cond:
+                    self._stats['checkouts'] += 1
+                return conn
+            with self._cond:
+                self._discard(conn)
+                self._cond.notify()
+
+    def release(self, conn):
+        """Return a connection, ending any open transaction so the next borrower starts clean"""
+        healthy = True
+        try:
+            conn.rollback()
+        except Exception:
+            healthy = False
+        with self._cond:
+            created_at = self._created.get(id(conn))
+            if not healthy or created_at is None or len(self._idle) >= self.size:
+                self._discard(conn)
+            else:
+                self._idle.append((conn, created_at))
+            self._cond.notify()
+
+    def discard(self, conn):
+        """Drop a borrowed connection instead of returning it, e.g. one whose unbuffered result
+        was abandoned part-way. Rolling back or closing such a connection reads the rest of the
+        result from the server first, so the server is told to kill it (from a short-lived
+        second connection) before it is closed."""
+        try:
+            killer = mysql.connector.connect(**self.db_config)
+            try:
+                killer.cmd_query(f"KILL CONNECTION {int(conn.connection_id)}")
+            finally:
+                killer.close()
+        except Exception as e:
+            print(f"Could not kill connection {getattr(conn, 'connection_id', '?')}: {e}")
+        with self._cond:
+            self._discard(conn)
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            open_count = len(self._created)
+            idle = len(self._idle)
+            return dict(self._stats, in_use=open_count - idle, idle=idle, open=open_count,
+                        size=self.size, max_overflow=self.max_overflow)
+
+
+class PooledConnection:
+    """Request-scoped handle to a pooled connection.
+
+    Routes call conn.close() in their finally blocks; that is a no-op here and the
+    connection goes back to the pool when the request context tears down.
+    """
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        cursor = self._conn.cursor(*args, **kwargs)
+        return InstrumentedCursor(cursor) if METRICS_ENABLED or slow_queries.enabled else cursor
+
+    def close(self):
+        pass
+
+
+db_pool = ConnectionPool(DB_CONFIG, **POOL_CONFIG)
+
+
 def get_db_connection():
-    """Create and return a database connection"""
-    try:
-        conn = mysql.connector.connect(**DB_CONFIG)
+    """Return the connection borrowed for the current request, checking one out on first use"""
+    conn = g.get('db_conn')
+    if conn is not None:
         return conn
+    try:
+        g.db_conn = PooledConnection(db_pool.acquire())
+        return g.db_conn
     except Error as e:
         print(f"Database connection error: {e}")
         return None
 
+
+@app.teardown_appcontext
+def release_db_connection(exc):
+    """Return the request's connection to the pool"""
+    conn = g.pop('db_conn', None)
+    if conn is not None:
+        db_pool.release(conn._conn)
+
 def login_required(f):
     """Decorator to require login for routes"""
     @wraps(f)
@@ -45,23 +233,663 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def current_identity():
+    """{user_id, username, is_admin} of the logged-in user, or None.
+
+    The session cookie only says who the user is; the role comes from identity_cache, so a
+    promotion or demotion applies on the next request instead of at the next login. A cache
+    miss costs one primary-key lookup.
+    """
+    user_id = session.get('user_id')
+    if user_id is None:
+        return None
+    if app.debug and session.get('dev'):
+        return {'user_id': user_id, 'username': session.get('username'), 'is_admin': bool(session.get('is_admin'))}
+
+    def load():
+        conn = get_db_connection()
+        if not conn:
+            raise Error(msg='Database connection failed')
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute("SELECT user_id, username, is_admin FROM User WHERE user_id = %s", (user_id,))
+            row = cursor.fetchone()
+            conn.rollback()
+        finally:
+            cursor.close()
+        return row and dict(row, is_admin=bool(row['is_admin']))
+    return identity_cache.get_or_load(user_id, load)
+
 def admin_required(f):
     """Decorator to require admin privilege for routes"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
         if 'user_id' not in session:
             return jsonify({'error': 'Login required'}), 401
-        if not session.get('is_admin'):
+        try:
+            identity = current_identity()
+        except Error as e:
+            return jsonify({'error': str(e)}), 500
+        if identity is None:
+            session.clear()
+            return jsonify({'error': 'Login required'}), 401
+        if not identity['is_admin']:
             return jsonify({'error': 'Admin privilege required'}), 403
         return f(*args, **kwargs)
     return decorated_function
 
+# ============= METRICS =============
+# Per-route and per-statement latency histograms, kept in process and exposed on
+# /api/admin/metrics. Recording is a dict lookup, a bisect and a few additions under one lock.
+
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')        # lets a Prometheus scraper read the metrics
+METRIC_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MAX_QUERY_FINGERPRINTS = 500
+
+class Histogram:
+    """Latency histogram over METRIC_BUCKETS (seconds); not thread-safe on its own"""
+    __slots__ = ('counts', 'count', 'total')
+
+    def __init__(self):
+        self.counts = [0] * (len(METRIC_BUCKETS) + 1)   # last slot is +Inf
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(METRIC_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def percentile(self, p):
+        """Upper bound (ms) of the bucket holding the p-th percentile; None above the last bucket"""
+        if not self.count:
+            return None
+        rank, seen = self.count * p / 100, 0
+        for bound, n in zip(METRIC_BUCKETS, self.counts):
+            seen += n
+            if seen >= rank:
+                return round(bound * 1000, 1)
+        return None
+
+    def summary(self):
+        return {'count': self.count, 'total_ms': round(self.total * 1000, 1),
+                'mean_ms': round(self.total * 1000 / self.count, 2) if self.count else None,
+                'p50_ms': self.percentile(50), 'p95_ms': self.percentile(95), 'p99_ms': self.percentile(99)}
+
+
+class MetricsRegistry:
+    """Thread-safe request and query metrics keyed by route template and statement fingerprint"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._routes = {}    # (method, route) -> {'latency', 'statuses', 'bytes'}
+            self._queries = {}   # fingerprint -> {'latency', 'rows', 'errors'}
+            self._started_at = time.time()
+
+    def record_request(self, method, route, status, seconds, size):
+        key = (method, route)
+        with self._lock:
+            entry = self._routes.get(key)
+            if entry is None:
+                entry = self._routes[key] = {'latency': Histogram(), 'statuses': {}, 'bytes': 0}
+            entry['latency'].observe(seconds)
+            entry['statuses'][status] = entry['statuses'].get(status, 0) + 1
+            entry['bytes'] += size or 0
+
+    def _query_entry(self, fingerprint):
+        entry = self._queries.get(fingerprint)
+        if entry is None:
+            if len(self._queries) >= MAX_QUERY_FINGERPRINTS:
+                fingerprint = 'other'
+            entry = self._queries.setdefault(fingerprint, {'latency': Histogram(), 'rows': 0, 'errors': 0})
+        return entry
+
+    def record_query(self, fingerprint, seconds, rows=0, error=False):
+        with self._lock:
+            entry = self._query_entry(fingerprint)
+            entry['latency'].observe(seconds)
+            entry['rows'] += rows
+            entry['errors'] += error
+
+    def add_rows(self, fingerprint, rows):
+        """Count rows fetched after the statement was timed"""
+        with self._lock:
+            self._query_entry(fingerprint)['rows'] += rows
+
+    def snapshot(self):
+        """JSON view: routes and queries sorted by total time spent, slowest first"""
+        with self._lock:
+            routes = [dict(method=method, route=route, statuses={str(k): v for k, v in e['statuses'].items()},
+                           bytes=e['bytes'], **e['latency'].summary())
+                      for (method, route), e in self._routes.items()]
+            queries = [dict(statement=fp, rows=e['rows'], errors=e['errors'], **e['latency'].summary())
+                       for fp, e in self._queries.items()]
+            since = self._started_at
+        routes.sort(key=lambda r: r['total_ms'], reverse=True)
+        queries.sort(key=lambda q: q['total_ms'], reverse=True)
+        return {'since': datetime.fromtimestamp(since, timezone.utc).isoformat(),
+                'buckets_ms': [b * 1000 for b in METRIC_BUCKETS], 'routes': routes, 'queries': queries}
+
+    def prometheus(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+
+        def histogram(name, labels, hist):
+            cumulative = 0
+            for bound, n in zip(METRIC_BUCKETS + ('+Inf',), hist.counts):
+                cumulative += n
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{{{labels}}} {hist.total:.6f}')
+            lines.append(f'{name}_count{{{labels}}} {hist.count}')
+
+        with self._lock:
+            lines.append('# HELP petcentre_http_request_duration_seconds Request latency by route')
+            lines.append('# TYPE petcentre_http_request_duration_seconds histogram')
+            for (method, route), e in self._routes.items():
+                histogram('petcentre_http_request_duration_seconds',
+                          f'method="{method}",route="{_label(route)}"', e['latency'])
+            lines.append('# HELP petcentre_http_responses_total Responses by route and status code')
+            lines.append('# TYPE petcentre_http_responses_total counter')
+            for (method, route), e in self._routes.items():
+                for status, n in e['statuses'].items():
+                    lines.append(f'petcentre_http_responses_total{{method="{method}",route="{_label(route)}",'
+                                 f'status="{status}"}} {n}')
+            lines.append('# HELP petcentre_http_response_bytes_total Response payload bytes by route')
+            lines.append('# TYPE petcentre_http_response_bytes_total counter')
+            for (method, route), e in self._routes.items():
+                lines.append(f'petcentre_http_response_bytes_total{{method="{method}",route="{_label(route)}"}} '
+                             f'{e["bytes"]}')
+            lines.append('# HELP petcentre_db_query_duration_seconds Statement latency by fingerprint')
+            lines.append('# TYPE petcentre_db_query_duration_seconds histogram')
+            for fp, e in self._queries.items():
+                histogram('petcentre_db_query_duration_seconds', f'statement="{_label(fp)}"', e['latency'])
+            lines.append('# HELP petcentre_db_query_rows_total Rows fetched or affected by fingerprint')
+            lines.append('# TYPE petcentre_db_query_rows_total counter')
+            for fp, e in self._queries.items():
+                lines.append(f'petcentre_db_query_rows_total{{statement="{_label(fp)}"}} {e["rows"]}')
+            lines.append('# HELP petcentre_db_query_errors_total Failed statements by fingerprint')
+            lines.append('# TYPE petcentre_db_query_errors_total counter')
+            for fp, e in self._queries.items():
+                lines.append(f'petcentre_db_query_errors_total{{statement="{_label(fp)}"}} {e["errors"]}')
+        return '\n'.join(lines) + '\n'
+
+
+def _label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+_SQL_STRING = re.compile(r"'(?:[^'\\]|\\.)*'")
+_SQL_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_SQL_VALUE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+
+@lru_cache(maxsize=2048)
+def sql_fingerprint(sql):
+    """Normalize a statement for grouping: literals and placeholders become ?, IN lists collapse"""
+    sql = ' '.join(sql.split())
+    sql = _SQL_STRING.sub('?', sql).replace('%s', '?')
+    sql = _SQL_NUMBER.sub('?', sql)
+    return _SQL_VALUE_LIST.sub('(...)', sql)
+
+
+class InstrumentedCursor:
+    """Cursor proxy timing execute/executemany/callproc into `metrics` by statement fingerprint.
+    Rows are counted as affected (DML) or as fetched. Statements slower than SLOW_QUERY_MS,
+    measured up to the end of fetchall(), go to `slow_queries`."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._fingerprint = None
+        self._pending = None   # (sql, params, started) until checked against the slow threshold
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def _check_slow(self):
+        sql, params, started = self._pending
+        self._pending = None
+        elapsed = time.perf_counter() - started
+        if slow_queries.enabled and elapsed >= slow_queries.threshold:
+            slow_queries.capture(self._fingerprint, sql, params, elapsed)
+
+    def _timed(self, fingerprint, sql, params, call, *args):
+        if self._pending:
+            self._check_slow()   # previous statement's rows were never fetched in full
+        self._fingerprint = fingerprint
+        started = time.perf_counter()
+        try:
+            result = call(*args)
+        except Exception:
+            if METRICS_ENABLED:
+                metrics.record_query(fingerprint, time.perf_counter() - started, error=True)
+            raise
+        if METRICS_ENABLED:
+            rowcount = 0 if getattr(self._cursor, 'with_rows', False) else self._cursor.rowcount
+            metrics.record_query(fingerprint, time.perf_counter() - started, max(rowcount or 0, 0))
+        self._pending = (sql, params, started)
+        if not getattr(self._cursor, 'with_rows', False):
+            self._check_slow()
+        return result
+
+    def _timed_results(self, fingerprint, sql, params, results):
+        """multi=True statements only run while their results are iterated, so time that instead.
+        Result sets are handed out through the proxy so their rows are counted too."""
+        self._fingerprint = fingerprint
+        started = time.perf_counter()
+        error = False
+        try:
+            for result in results:
+                yield self if result is self._cursor else result
+        except Exception:
+            error = True
+            raise
+        finally:
+            if METRICS_ENABLED:
+                metrics.record_query(fingerprint, time.perf_counter() - started, error=error)
+            self._pending = (sql, params, started)
+            self._check_slow()
+
+    def execute(self, operation, params=None, multi=False):
+        fingerprint = sql_fingerprint(operation)
+        if multi:
+            return self._timed_results(fingerprint, operation, params,
+                                       self._cursor.execute(operation, params, multi=True))
+        return self._timed(fingerprint, operation, params, self._cursor.execute, operation, params)
+
+    def executemany(self, operation, seq_params):
+        # Timed as one statement; the parameter list is not kept for the slow query log
+        return self._timed(sql_fingerprint(operation), operation, None, self._cursor.executemany, operation, seq_params)
+
+    def callproc(self, procname, args=()):
+        return self._timed(f'CALL {procname}', f'CALL {procname}', args, self._cursor.callproc, procname, args)
+
+    def _count(self, rows):
+        if METRICS_ENABLED and self._fingerprint and rows:
+            metrics.add_rows(self._fingerprint, len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._count(self._cursor.fetchall())
+        if self._pending:
+            self._check_slow()
+        return rows
+
+    def fetchmany(self, size=1):
+        # Streaming readers (exports) fetch in chunks for as long as the client reads,
+        # so only execute() counts towards the slow threshold here
+        return self._count(self._cursor.fetchmany(size))
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None and self._fingerprint:
+            self._count([row])
+        if self._pending:
+            self._check_slow()
+        return row
+
+
+metrics = MetricsRegistry()
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop('request_started', None)
+    if METRICS_ENABLED and started is not None:
+        # Route templates (/api/pets/<int:pet_id>) keep the label set bounded
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.record_request(request.method, route, response.status_code,
+                               time.perf_counter() - started, response.content_length)
+    return response
+
+# ============= COMPRESSION & STATIC ASSETS =============
+# Responses of COMPRESS_MIN_SIZE bytes or more in a text format (JSON lists, HTML, CSS, JS) are
+# gzip- or brotli-compressed, whichever the client accepts. brotli is optional: without the
+# package only gzip is offered. Files in static/ are also served from /assets/ under
+# content-hashed names (asset_url()), compressed once at startup and cached for a year.
+
+COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))  # gzip level for responses (assets use 9)
+ASSET_MAX_AGE = 365 * 24 * 3600
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+def choose_encoding(accept_encoding):
+    """'br', 'gzip' or None for an Accept-Encoding header value"""
+    accepted = parse_accept_header(accept_encoding or '')
+    for encoding in ('br', 'gzip') if brotli else ('gzip',):
+        if accepted.quality(encoding) > 0:
+            return encoding
+    return None
+
+def compress_bytes(data, encoding, static=False):
+    """Compress for a response body; static=True spends more CPU for a smaller result"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=11 if static else 4)
+    return gzip.compress(data, compresslevel=9 if static else COMPRESS_LEVEL, mtime=0)
+
+def is_compressible(mimetype):
+    return bool(mimetype) and (mimetype.startswith('text/')
+                               or mimetype in ('application/json', 'application/javascript', 'image/svg+xml'))
+
+@app.after_request
+def compress_response(response):
+    """Compress buffered responses; streamed exports and files sent from disk are left alone"""
+    if (response.direct_passthrough or response.is_streamed or 'Content-Encoding' in response.headers
+            or not 200 <= response.status_code < 300 or not is_compressible(response.mimetype)):
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+    if encoding:
+        response.set_data(compress_bytes(data, encoding))
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+class StaticAssets:
+    """Content-hashed URLs for the files in static/, served from memory.
+
+    Each file is read, hashed and compressed once (build() runs at startup; in debug mode a
+    file is reloaded when it changes on disk), so serving an asset costs no disk read and no
+    compression. url('js/app.js') gives '/assets/js/app.<hash>.js'; a new version of a file gets
+    a new URL, so browsers may cache every URL for ASSET_MAX_AGE.
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        self._assets = {}   # filename -> {'name', 'digest', 'mtime', 'mimetype', 'identity', 'encoded'}
+        self._by_name = {}  # hashed name -> entry
+        self._lock = threading.Lock()
+
+    def _load(self, filename):
+        path = os.path.join(self.folder, filename)
+        mtime = os.path.getmtime(path)
+        entry = self._assets.get(filename)
+        if entry is not None and entry['mtime'] == mtime:
+            return entry
+        with open(path, 'rb') as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        root, ext = os.path.splitext(filename)
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        encoded = {}
+        if is_compressible(mimetype) and len(data) >= COMPRESS_MIN_SIZE:
+            for encoding in ('br', 'gzip') if brotli else ('gzip',):
+                encoded[encoding] = compress_bytes(data, encoding, static=True)
+        entry = {'name': f'{root}.{digest}{ext}', 'digest': digest, 'mtime': mtime,
+                 'mimetype': mimetype, 'identity': data, 'encoded': encoded}
+        with self._lock:
+            self._assets[filename] = entry
+            self._by_name[entry['name']] = entry
+        return entry
+
+    def build(self):
+        """Load every file under the folder; returns the number of assets"""
+        for dirpath, _, files in os.walk(self.folder):
+            for name in files:
+                self._load(os.path.relpath(os.path.join(dirpath, name), self.folder).replace(os.sep, '/'))
+        return len(self._assets)
+
+    def url(self, filename):
+        entry = self._assets.get(filename)
+        if entry is None or app.debug:
+            entry = self._load(filename)
+        return f"/assets/{entry['name']}"
+
+    def lookup(self, name):
+        return self._by_name.get(name)
+
+    def stats(self):
+        with self._lock:
+            return {filename: {'url': f"/assets/{e['name']}", 'bytes': len(e['identity']),
+                               **{f'{enc}_bytes': len(data) for enc, data in e['encoded'].items()}}
+                    for filename, e in self._assets.items()}
+
+
+static_assets = StaticAssets(app.static_folder)
+static_assets.build()
+
+@app.context_processor
+def asset_helpers():
+    return {'asset_url': static_assets.url}
+
+@app.route('/assets/<path:name>')
+def get_static_asset(name):
+    """A fingerprinted static file, precompressed, cacheable for ASSET_MAX_AGE"""
+    entry = static_assets.lookup(name)
+    if entry is None:
+        return jsonify({'error': 'Not found'}), 404
+    encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+    data = entry['encoded'].get(encoding)
+    response = Response(data if data is not None else entry['identity'], mimetype=entry['mimetype'])
+    if data is not None:
+        response.headers['Content-Encoding'] = encoding
+    if entry['encoded']:
+        response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = f'public, max-age={ASSET_MAX_AGE}, immutable'
+    response.set_etag(entry['digest'], weak=True)
+    return response.make_conditional(request)
+
+# ============= SLOW QUERY LOG =============
+
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 200))          # 0 disables the log
+SLOW_QUERY_BUFFER = int(os.environ.get('SLOW_QUERY_BUFFER', 200))    # entries kept
+SLOW_QUERY_EXPLAIN = os.environ.get('SLOW_QUERY_EXPLAIN', '1') == '1'
+EXPLAINABLE_STATEMENTS = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+_SENSITIVE_SQL = re.compile(r'\bUser\b|\bWallet\w+|password', re.IGNORECASE)
+
+class SlowQueryLog:
+    """Ring buffer of statements slower than SLOW_QUERY_MS.
+
+    The first time a fingerprint is seen, EXPLAIN FORMAT=JSON for that statement is run on a
+    background thread with its own pooled connection: the route's connection may still be
+    streaming rows, and the route should not wait for the plan.
+    """
+
+    def __init__(self, threshold_ms=SLOW_QUERY_MS, size=SLOW_QUERY_BUFFER, explain=SLOW_QUERY_EXPLAIN):
+        self.enabled = threshold_ms > 0
+        self.threshold = threshold_ms / 1000
+        self.explain = explain
+        self._entries = deque(maxlen=size)
+        self._plans = {}   # fingerprint -> EXPLAIN output, {'error': ...}, or None while pending
+        self._queue = queue.Queue(maxsize=64)
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def capture(self, fingerprint, sql, params, seconds, route=None):
+        if route is None and has_request_context():
+            route = f"{request.method} {request.url_rule.rule if request.url_rule else request.path}"
+        entry = {
+            'at': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+            'route': route,
+            'duration_ms': round(seconds * 1000, 1),
+            'fingerprint': fingerprint,
+            'sql': ' '.join(sql.split()),
+            # Statements on User and the wallet tables carry credentials and balances
+            'params': '[redacted]' if _SENSITIVE_SQL.search(sql) else _loggable_params(params),
+        }
+        print(f"Slow query ({entry['duration_ms']} ms) in {route or '-'}: {fingerprint}")
+        wanted = (self.explain and sql.lstrip().split(None, 1)[0].upper() in EXPLAINABLE_STATEMENTS
+                  and (params is None or isinstance(params, (tuple, list, dict))))
+        with self._lock:
+            self._entries.append(entry)
+            wanted = wanted and fingerprint not in self._plans and len(self._plans) < MAX_QUERY_FINGERPRINTS
+            if wanted:
+                self._plans[fingerprint] = None
+        if wanted:
+            self._start_worker()
+            try:
+                self._queue.put_nowait((fingerprint, sql, params))
+            except queue.Full:
+                with self._lock:
+                    self._plans.pop(fingerprint, None)   # retried the next time it is slow
+
+    def _start_worker(self):
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._explain_loop, name='slow-query-explain', daemon=True)
+                self._worker.start()
+
+    def _explain_loop(self):
+        while True:
+            fingerprint, sql, params = self._queue.get()
+            try:
+                conn = db_pool.acquire()
+                try:
+                    cursor = conn.cursor()
+                    cursor.execute('EXPLAIN FORMAT=JSON ' + sql, params)
+                    plan = json.loads(cursor.fetchone()[0])
+                    cursor.close()
+                finally:
+                    db_pool.release(conn)
+            except (Error, ValueError, TypeError) as e:
+                plan = {'error': str(e)}
+            with self._lock:
+                self._plans[fingerprint] = plan
+
+    def snapshot(self):
+        """Entries newest first, plus the captured plan for each fingerprint among them"""
+        with self._lock:
+            entries = list(reversed(self._entries))
+            plans = {e['fingerprint']: self._plans.get(e['fingerprint']) for e in entries}
+        return {'threshold_ms': self.threshold * 1000, 'capacity': self._entries.maxlen,
+                'queries': entries, 'plans': plans}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._plans = {k: v for k, v in self._plans.items() if v is None}
+
+
+def _loggable_params(params):
+    def short(value):
+        if value is None or isinstance(value, (bool, int, float)):
+            return value
+        return str(value)[:200]
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {k: short(v) for k, v in params.items()}
+    return [short(v) for v in params]
+
+
+slow_queries = SlowQueryLog()
+
+# ============= PASSWORD HASHING =============
+# Passwords are stored as salted scrypt hashes, "scrypt$<log2 N>$<r>$<p>$<salt>$<hash>" (base64).
+# The cost is set per deployment; hashes made with another cost are upgraded at the next login,
+# as are legacy plaintext passwords. Hashing is deliberately slow, so it runs on a bounded
+# worker pool: a login storm queues up to PASSWORD_HASH_QUEUE jobs, and beyond that requests
+# get a 503 instead of tying up every request thread.
+
+PASSWORD_SCRYPT_LOG_N = int(os.environ.get('PASSWORD_SCRYPT_LOG_N', 14))  # N = 16384, 16 MiB per hash
+PASSWORD_SCRYPT_R = int(os.environ.get('PASSWORD_SCRYPT_R', 8))
+PASSWORD_SCRYPT_P = int(os.environ.get('PASSWORD_SCRYPT_P', 1))
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 2))
+PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 4 * PASSWORD_HASH_WORKERS))
+PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 5))  # seconds a request waits for its hash
+
+# hashlib.scrypt releases the GIL, so threads hash in parallel
+_password_pool = concurrent.futures.ThreadPoolExecutor(PASSWORD_HASH_WORKERS, thread_name_prefix='password')
+_password_slots = threading.BoundedSemaphore(PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE)
+
+
+class PasswordHasherBusy(Exception):
+    """The password worker pool is full, or a job did not finish within PASSWORD_HASH_TIMEOUT"""
+
+
+def _scrypt(password, salt, log_n, r, p):
+    n = 1 << log_n
+    # scrypt needs 128 * r * (N + p) bytes plus a little working space
+    return hashlib.scrypt(password.encode('utf-8'), salt=salt, n=n, r=r, p=p,
+                          maxmem=132 * r * (n + p + 2), dklen=32)
+
+
+def _hash_password(password, log_n=None, r=None, p=None):
+    log_n, r, p = log_n or PASSWORD_SCRYPT_LOG_N, r or PASSWORD_SCRYPT_R, p or PASSWORD_SCRYPT_P
+    salt = secrets.token_bytes(16)
+    return '$'.join(['scrypt', str(log_n), str(r), str(p), base64.b64encode(salt).decode(),
+                     base64.b64encode(_scrypt(password, salt, log_n, r, p)).decode()])
+
+
+def _verify_password(password, stored):
+    """(matches, needs_rehash) for a stored hash, or a legacy plaintext password"""
+    if not stored.startswith('scrypt$'):
+        return hmac.compare_digest(stored.encode('utf-8'), password.encode('utf-8')), True
+    try:
+        _, log_n, r, p, salt, expected = stored.split('$')
+        log_n, r, p = int(log_n), int(r), int(p)
+        matches = hmac.compare_digest(_scrypt(password, base64.b64decode(salt, validate=True), log_n, r, p),
+                                      base64.b64decode(expected, validate=True))
+    except ValueError:
+        # Malformed hash (wrong field count, non-numeric or out-of-range cost, bad base64):
+        # nothing can match it, so the login fails like a wrong password
+        return False, False
+    return matches, (log_n, r, p) != (PASSWORD_SCRYPT_LOG_N, PASSWORD_SCRYPT_R, PASSWORD_SCRYPT_P)
+
+
+@lru_cache(maxsize=1)
+def _dummy_password_hash():
+    return _hash_password(secrets.token_urlsafe(16))
+
+
+def run_password_job(fn, *args):
+    """Run fn(*args) on the password pool and wait for it; raises PasswordHasherBusy when
+    PASSWORD_HASH_QUEUE jobs are already waiting or the job takes over PASSWORD_HASH_TIMEOUT"""
+    if not _password_slots.acquire(blocking=False):
+        raise PasswordHasherBusy()
+    try:
+        future = _password_pool.submit(fn, *args)
+    except BaseException:
+        _password_slots.release()
+        raise
+    future.add_done_callback(lambda _: _password_slots.release())
+    try:
+        return future.result(timeout=PASSWORD_HASH_TIMEOUT)
+    except concurrent.futures.TimeoutError:
+        raise PasswordHasherBusy()
+
+
+def hash_password(password):
+    """Salted scrypt hash of password at the configured cost"""
+    return run_password_job(_hash_password, password)
+
+
+def verify_password(password, stored):
+    """(matches, needs_rehash). With stored=None (unknown user) a dummy hash is checked, so
+    unknown usernames take as long as wrong passwords."""
+    if stored is None:
+        run_password_job(_verify_password, password, _dummy_password_hash())
+        return False, False
+    return run_password_job(_verify_password, password, stored)
+
+
+def password_busy_response():
+    response = jsonify({'error': 'Server is busy, please retry'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
 # ============= AUTHENTICATION ROUTES =============
 
 @app.route('/')
 def index():
-    """Home page"""
-    return render_template('index.html')
+    """Home page. Revalidated on every visit, so it always links the current asset URLs."""
+    response = make_response(render_template('index.html'))
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 @app.route('/api/register', methods=['POST'])
 def register():
@@ -75,6 +903,10 @@ def register():
     
     if not all([username, password, name, contact]):
         return jsonify({'error': 'Missing required fields'}), 400
+    try:
+        password_hash = hash_password(password)
+    except PasswordHasherBusy:
+        return password_busy_response()
     
     conn = get_db_connection()
     if not conn:
@@ -82,9 +914,6 @@ def register():
     
     try:
         cursor = conn.cursor()
-        # Simple password hash (use bcrypt in production!)
-        password_hash = password  # TODO: Use proper hashing
-        
         cursor.execute(
             "INSERT INTO User (username, password_hash, name, contact, address, wallet) VALUES (%s, %s, %s, %s, %s, 0.00)",
             (username, password_hash, name, contact, address)
@@ -113,36 +942,61 @@ def login():
     if not conn:
         return jsonify({'error': 'Database connection failed'}), 500
     
+    cursor = conn.cursor(dictionary=True)
     try:
-        cursor = conn.cursor(dictionary=True)
         cursor.execute(
-            "SELECT user_id, username, name, wallet FROM User WHERE username = %s AND password_hash = %s",
-            (username, password)
+            f"SELECT u.user_id, u.username, u.name, u.is_admin, u.password_hash, {WALLET_BALANCE_SQL} AS wallet "
+            "FROM User u WHERE u.username = %s",
+            (username,)
         )
         user = cursor.fetchone()
-        
-        if user:
-            session['user_id'] = user['user_id']
-            session['username'] = user['username']
-            # Determine admin flag: prefer an 'is_admin' column if present, otherwise treat username 'admin' as admin
-            try:
-                cursor.execute("SELECT is_admin FROM User WHERE user_id = %s", (user['user_id'],))
-                is_admin_row = cursor.fetchone()
-                if is_admin_row and 'is_admin' in is_admin_row:
-                    session['is_admin'] = bool(is_admin_row['is_admin'])
-                else:
-                    session['is_admin'] = (user['username'].lower() == 'admin')
-            except Exception:
-                session['is_admin'] = (user['username'].lower() == 'admin')
-            # Debug: print session info
-            print(f"[DEBUG] login: session user_id={session.get('user_id')} username={session.get('username')} is_admin={session.get('is_admin')}")
-            # Return is_admin flag to client as well
-            return jsonify({'message': 'Login successful', 'user': user, 'is_admin': session.get('is_admin', False)}), 200
-        else:
-            return jsonify({'error': 'Invalid credentials'}), 401
+        conn.rollback()
+    except Error as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        cursor.close()
+    # Checking the password is slow: hand the connection back to the pool meanwhile
+    release_db_connection(None)
+    stored_hash = user.pop('password_hash') if user else None
+    try:
+        matches, needs_rehash = verify_password(password, stored_hash)
+    except PasswordHasherBusy:
+        return password_busy_response()
+    if not matches:
+        return jsonify({'error': 'Invalid credentials'}), 401
+    if needs_rehash:
+        rehash_password(user['user_id'], password, stored_hash)
+
+    is_admin = bool(user.pop('is_admin'))
+    session.clear()
+    session['user_id'] = user['user_id']
+    session['username'] = user['username']
+    # Logging in refreshes the cached identity
+    identity_cache.discard(user['user_id'])
+    identity_cache.get_or_load(user['user_id'], lambda: {
+        'user_id': user['user_id'], 'username': user['username'], 'is_admin': is_admin})
+    return jsonify({'message': 'Login successful', 'user': user, 'is_admin': is_admin}), 200
+
+def rehash_password(user_id, password, old_hash):
+    """Store password hashed at the current cost, unless it changed since old_hash was read.
+    Best effort: the login succeeds even if this fails, and the next login retries."""
+    try:
+        new_hash = hash_password(password)
+    except PasswordHasherBusy:
+        return
+    conn = get_db_connection()
+    if not conn:
+        return
+    cursor = conn.cursor()
+    try:
+        cursor.execute("UPDATE User SET password_hash = %s WHERE user_id = %s AND password_hash = %s",
+                       (new_hash, user_id, old_hash))
+        conn.commit()
+    except Error as e:
+        conn.rollback()
+        print(f"Password rehash failed for user {user_id}: {e}")
     finally:
         cursor.close()
-        conn.close()
 
 @app.route('/api/logout', methods=['POST'])
 def logout():
@@ -151,51 +1005,777 @@ def logout():
     return jsonify({'message': 'Logout successful'}), 200
 
 
-@app.route('/api/me', methods=['GET'])
-def me():
-    """Return current session user info"""
-    if 'user_id' not in session:
-        return jsonify({'error': 'Not authenticated'}), 401
-    user_info = {
-        'user_id': session.get('user_id'),
-        'username': session.get('username'),
-        'is_admin': bool(session.get('is_admin', False))
-    }
-    print(f"[DEBUG] /api/me called — session: {dict(session)}")
-    return jsonify({'user': user_info}), 200
+@app.route('/api/me', methods=['GET'])
+def me():
+    """Return current session user info"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    try:
+        user_info = current_identity()
+    except Error as e:
+        return jsonify({'error': str(e)}), 500
+    if user_info is None:
+        session.clear()
+        return jsonify({'error': 'Not authenticated'}), 401
+    return jsonify({'user': user_info}), 200
+
+
+# Development helper: set a session quickly for testing (only when debug=True)
+@app.route('/dev/login-as', methods=['POST'])
+def dev_login_as():
+    """Dev-only: create a session for a given username and admin flag. Only enabled when app.debug is True."""
+    if not app.debug:
+        return jsonify({'error': 'Not available'}), 404
+    data = request.json or {}
+    username = data.get('username', 'devuser')
+    is_admin = bool(data.get('is_admin', False))
+    # Set a fake user id for dev testing
+    session['user_id'] = -999
+    session['username'] = username
+    session['is_admin'] = is_admin
+    session['dev'] = True  # current_identity() trusts this session instead of looking the user up
+    print(f"[DEV] created session for {username} is_admin={is_admin}")
+    return jsonify({'message': 'dev session created', 'user': {'username': username, 'is_admin': is_admin}}), 200
+
+
+@app.route('/dev/session-check', methods=['GET'])
+def dev_session_check():
+    """Dev-only: show current session state for debugging."""
+    if not app.debug:
+        return jsonify({'error': 'Not available'}), 404
+    return jsonify({'session': dict(session), 'session_keys': list(session.keys())}), 200
+
+# ============= REFERENCE DATA CACHE =============
+
+CACHE_TTL = float(os.environ.get('CACHE_TTL', 60))
+CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 128))
+
+class TTLCache:
+    """Thread-safe read-through cache with per-entry TTL and LRU eviction.
+
+    Used for small reference lists (shelters, caretakers) keyed by their query filter.
+    Write routes call invalidate() after commit so readers never wait for the TTL.
+    """
+
+    def __init__(self, name, ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()   # key -> (expires_at, value)
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+
+    def get(self, key):
+        """Return (hit, value, generation). On a miss, load the value and hand it to put()
+        together with the generation so a concurrent invalidate() is not overwritten."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return True, entry[1], self._generation
+                del self._entries[key]
+                self._stats['expirations'] += 1
+            self._stats['misses'] += 1
+            return False, None, self._generation
+
+    def put(self, key, value, generation):
+        """Store a value loaded after a get() miss"""
+        with self._lock:
+            # Skip storing if a write invalidated the cache while we were loading
+            if generation == self._generation:
+                self._entries[key] = (time.monotonic() + self.ttl, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self._stats['evictions'] += 1
+
+    def get_or_load(self, key, loader):
+        """Return the cached value for key, calling loader() and storing its result on a miss"""
+        hit, value, generation = self.get(key)
+        if hit:
+            return value
+        value = loader()
+        self.put(key, value, generation)
+        return value
+
+    def discard(self, key):
+        """Drop one entry; loads already in flight are not stored either"""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._generation += 1
+            self._stats['invalidations'] += 1
+
+    def invalidate(self):
+        """Drop every entry; call after committing a write to the cached table"""
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+            self._stats['invalidations'] += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return dict(self._stats, entries=len(self._entries), ttl=self.ttl, max_entries=self.max_entries,
+                        hit_ratio=round(self._stats['hits'] / lookups, 3) if lookups else None)
+
+
+shelter_cache = TTLCache('shelters')
+caretaker_cache = TTLCache('caretakers')
+# Identity and role per user_id, read by current_identity(). promote/demote discard the user's
+# entry in this process; other processes see the change within IDENTITY_CACHE_TTL seconds.
+identity_cache = TTLCache('identities', ttl=float(os.environ.get('IDENTITY_CACHE_TTL', 30)),
+                          max_entries=int(os.environ.get('IDENTITY_CACHE_MAX_ENTRIES', 10000)))
+
+# ============= QUERY PLANS =============
+# Read endpoints that are also served by the async server (asgi.py) describe their queries as
+# generators: each `rows = yield (sql, params)` hands one statement to a driver and receives its
+# rows as dicts, and the generator's return value is the result. run_query_plan drives a plan on
+# a mysql-connector cursor; asgi.run_query_plan drives the same plan on an aiomysql cursor.
+
+def run_query_plan(cursor, plan):
+    """Run a query plan on a dictionary cursor and return its result.
+    Statements starting with CALL return the procedure's first result set."""
+    try:
+        sql, params = next(plan)
+        while True:
+            if sql.startswith('CALL '):
+                result_sets = [result.fetchall() for result in cursor.execute(sql, params, multi=True)
+                               if result.with_rows]
+                rows = result_sets[0] if result_sets else []
+            else:
+                cursor.execute(sql, params)
+                rows = cursor.fetchall()
+            sql, params = plan.send(rows)
+    except StopIteration as done:
+        return done.value
+
+# ============= CONDITIONAL GET =============
+
+# Tables whose rows also count towards an entity's version, as (query returning version and
+# updated_at, scope column): their writers change a row they already write or lock rather than
+# bumping a single EntityVersion row per scope
+ENTITY_VERSION_SHARDS = {
+    # The ledger position: rows folded into the snapshot plus the pending ones, both read from the
+    # (user_id, txn_id) index. Every committed ledger row adds one, in whatever txn_id order they
+    # commit, and compaction only moves it forward (the new last_txn_id is at least the old one
+    # plus the rows it folds)
+    'wallet': ("SELECT b.last_txn_id + (SELECT COUNT(*) FROM WalletTransaction t "
+               "WHERE t.user_id = b.user_id AND t.txn_id > b.last_txn_id), "
+               "(SELECT t.created_at FROM WalletTransaction t WHERE t.user_id = b.user_id "
+               "ORDER BY t.txn_id DESC LIMIT 1) FROM WalletBalance b", 'b.user_id'),
+}
+
+def entity_version_plan(entity, scope_id=None):
+    """Query plan returning (version, last_modified) for an entity from EntityVersion
+    (plus its ENTITY_VERSION_SHARDS table, if any).
+
+    The versions of every shard (and, without scope_id, every scope) are summed; each bump
+    only ever increases one of them, so the sum changes whenever anything in the entity changes.
+    """
+    sql = "SELECT version, updated_at FROM EntityVersion WHERE entity = %s"
+    params = [entity]
+    if scope_id is not None:
+        sql += " AND scope_id = %s"
+        params.append(scope_id)
+    if entity in ENTITY_VERSION_SHARDS:
+        shard_sql, column = ENTITY_VERSION_SHARDS[entity]
+        sql += f" UNION ALL {shard_sql}"
+        if scope_id is not None:
+            sql += f" WHERE {column} = %s"
+            params.append(scope_id)
+    sql = ("SELECT COALESCE(SUM(version), 0) AS version, UNIX_TIMESTAMP(MAX(updated_at)) AS updated_at "
+           f"FROM ({sql}) versions")
+    rows = yield (sql, tuple(params))
+    updated_at = rows[0]['updated_at']
+    last_modified = datetime.fromtimestamp(float(updated_at), timezone.utc) if updated_at is not None else None
+    return int(rows[0]['version']), last_modified
+
+def get_entity_version(conn, entity, scope_id=None):
+    """Return (version, last_modified) for an entity, see entity_version_plan"""
+    cursor = conn.cursor(dictionary=True)
+    try:
+        return run_query_plan(cursor, entity_version_plan(entity, scope_id))
+    finally:
+        cursor.close()
+
+def entity_etag(entity, scope_id, version, extra, query_string):
+    """ETag for a response built from an entity version, its scope, extra() and the query string"""
+    token = f"{entity}:{scope_id}:{version}:{extra}:{query_string}"
+    return hashlib.blake2b(token.encode(), digest_size=12).hexdigest()
+
+def body_etag(body):
+    """ETag for a response served from an in-process cache, validated by its bytes instead of a
+    version token; workers holding the same data produce the same ETag"""
+    return hashlib.blake2b(body, digest_size=12).hexdigest()
+
+def is_not_modified(if_none_match, if_modified_since, etag, last_modified):
+    """Whether the request validators (a werkzeug ETags and a datetime or None) still match"""
+    if if_none_match:
+        return if_none_match.contains_weak(etag)
+    # HTTP dates have one-second resolution, so only answer 304 once the
+    # last write is strictly older than the validator
+    return bool(if_modified_since and last_modified and last_modified.replace(microsecond=0) < if_modified_since)
+
+def conditional_get(entity, scope=None, extra=None):
+    """Decorator adding ETag / Last-Modified validators to a GET endpoint.
+
+    The ETag is derived from the entity's version token (see bump_entity_version in
+    routines_and_triggers.sql), the scope returned by `scope(args)` (e.g. the shelter filter),
+    `extra(args)` and the query string. A request whose If-None-Match (or, without one,
+    If-Modified-Since) still matches gets 304 before the view runs its queries.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            conn = get_db_connection()
+            if not conn:
+                return f(*args, **kwargs)
+            try:
+                scope_id = scope(request.args) if scope else None
+            except (ValueError, TypeError):
+                return f(*args, **kwargs)   # the view reports the bad parameter
+            try:
+                version, last_modified = get_entity_version(conn, entity, scope_id)
+                tag = extra(request.args) if extra else ''
+            except Error as e:
+                print(f"Version lookup failed for {entity}: {e}")
+                return f(*args, **kwargs)
+            g.entity_version = version
+            etag = entity_etag(entity, scope_id, version, tag, request.query_string.decode())
+
+            if is_not_modified(request.if_none_match, request.if_modified_since, etag, last_modified):
+                response = make_response('', 304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            if last_modified:
+                response.last_modified = last_modified
+            response.cache_control.no_cache = True   # always revalidate
+            return response
+        return decorated_function
+    return decorator
+
+# ============= IDEMPOTENCY KEYS =============
+# Clients may send `Idempotency-Key: <unique string>` on order, top-up and adoption requests.
+# The first request with a key runs and its 2xx response is stored in IdempotencyKey for
+# IDEMPOTENCY_TTL seconds; retries get the stored response without touching wallet or stock rows.
+
+IDEMPOTENCY_TTL = int(os.getenv('IDEMPOTENCY_TTL', 24 * 3600))
+# Seconds a concurrent duplicate waits for the first request with the same key to finish
+IDEMPOTENCY_WAIT = int(os.getenv('IDEMPOTENCY_WAIT', 10))
+# Leaves room for the 'order:' / 'topup:' prefix in WalletTransaction.idempotency_key (64); UUIDs fit
+IDEMPOTENCY_KEY_MAX = 56
+IDEMPOTENCY_PURGE_INTERVAL = 300
+_idempotency_purge = {'next': 0.0}
+_idempotency_purge_lock = threading.Lock()
+
+def get_idempotency_key():
+    """The request's Idempotency-Key header, or None; raises ValueError if it is malformed"""
+    key = request.headers.get('Idempotency-Key')
+    if key is None:
+        return None
+    key = key.strip()
+    if not key or len(key) > IDEMPOTENCY_KEY_MAX or not key.isprintable():
+        raise ValueError(f'Idempotency-Key must be 1-{IDEMPOTENCY_KEY_MAX} printable characters')
+    return key
+
+def _purge_expired_idempotency_keys(cursor):
+    """Delete a batch of expired keys, at most once per IDEMPOTENCY_PURGE_INTERVAL per process"""
+    now = time.monotonic()
+    with _idempotency_purge_lock:
+        if now < _idempotency_purge['next']:
+            return
+        _idempotency_purge['next'] = now + IDEMPOTENCY_PURGE_INTERVAL
+    cursor.execute("DELETE FROM IdempotencyKey WHERE expires_at < NOW() LIMIT 1000")
+
+def idempotent(f):
+    """Decorator making a logged-in POST endpoint safe to retry with an Idempotency-Key header.
+
+    A named lock per (user, key) makes concurrent duplicates wait (up to IDEMPOTENCY_WAIT
+    seconds) for the first request, then replay its stored response. The key is claimed in
+    IdempotencyKey before the view runs. A 2xx response is stored with it; any other response
+    releases the key, since a failed request changed nothing. A request that dies after the
+    view committed leaves the claim without a response, and retries get 409 instead of charging
+    twice. Reusing a key for a different request body is a 422. The key is available to the view
+    as g.idempotency_key.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        try:
+            key = get_idempotency_key()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if key is None:
+            return f(*args, **kwargs)
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({'error': 'Database connection failed'}), 500
+        user_id = session['user_id']
+        request_hash = hashlib.sha256(b'\n'.join([request.method.encode(), request.path.encode(),
+                                                   request.get_data()])).hexdigest()
+        lock_name = 'idempotency:' + hashlib.sha256(f"{user_id}:{key}".encode()).hexdigest()[:40]
+        g.idempotency_key = key
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT GET_LOCK(%s, %s)", (lock_name, IDEMPOTENCY_WAIT))
+            if not cursor.fetchone()[0]:
+                return jsonify({'error': 'A request with this Idempotency-Key is still in progress'}), 409
+            try:
+                cursor.execute(
+                    "SELECT request_hash, response_status, response_body, content_type, expires_at > NOW() "
+                    "FROM IdempotencyKey WHERE user_id = %s AND idempotency_key = %s",
+                    (user_id, key)
+                )
+                row = cursor.fetchone()
+                if row and row[4]:
+                    conn.rollback()
+                    if row[0] != request_hash:
+                        return jsonify({'error': 'Idempotency-Key was already used for a different request'}), 422
+                    if row[1] is None:
+                        return jsonify({'error': 'An earlier request with this Idempotency-Key did not finish; '
+                                                 'check its outcome before retrying with a new key'}), 409
+                    response = Response(row[2], status=row[1], content_type=row[3])
+                    response.headers['Idempotent-Replayed'] = 'true'
+                    return response
+                if row:
+                    cursor.execute("DELETE FROM IdempotencyKey WHERE user_id = %s AND idempotency_key = %s",
+                                   (user_id, key))
+                _purge_expired_idempotency_keys(cursor)
+                cursor.execute(
+                    "INSERT INTO IdempotencyKey (user_id, idempotency_key, request_hash, expires_at) "
+                    "VALUES (%s, %s, %s, NOW() + INTERVAL %s SECOND)",
+                    (user_id, key, request_hash, IDEMPOTENCY_TTL)
+                )
+                conn.commit()
+
+                response = make_response(f(*args, **kwargs))
+                if 200 <= response.status_code < 300:
+                    cursor.execute(
+                        "UPDATE IdempotencyKey SET response_status = %s, response_body = %s, content_type = %s, "
+                        "expires_at = NOW() + INTERVAL %s SECOND WHERE user_id = %s AND idempotency_key = %s",
+                        (response.status_code, response.get_data(as_text=True), response.content_type,
+                         IDEMPOTENCY_TTL, user_id, key)
+                    )
+                else:
+                    conn.rollback()
+                    cursor.execute("DELETE FROM IdempotencyKey WHERE user_id = %s AND idempotency_key = %s",
+                                   (user_id, key))
+                conn.commit()
+                return response
+            finally:
+                cursor.execute("SELECT RELEASE_LOCK(%s)", (lock_name,))
+                cursor.fetchone()
+        except Error as e:
+            return jsonify({'error': str(e)}), 500
+        finally:
+            cursor.close()
+    return decorated_function
+
+def shelter_scope(args):
+    """Scope of list endpoints filtered by ?shelter_id= (None means every shelter)"""
+    shelter_id = args.get('shelter_id')
+    return int(shelter_id) if shelter_id else None
+
+def search_generation(index):
+    """extra() for endpoints answering ?q= from a search index: ties the ETag to the index contents.
+    The index is built or refreshed first, so the ETag describes the index the view then searches."""
+    def extra(args):
+        q = args.get('q')
+        if not (q and is_plain_search(q)):
+            return ''
+        index.ensure_built(get_db_connection())
+        return index.generation
+    return extra
+
+# ============= PAGINATION HELPERS =============
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def encode_cursor(values):
+    """Encode the keyset values of the last row on a page as an opaque cursor string"""
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor; raises ValueError if it is malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list):
+        raise ValueError('Invalid cursor')
+    return values
+
+def get_page_args(args=None):
+    """Read `limit` and `after` from the query string (request.args unless another mapping
+    is given); returns (limit, decoded cursor or None)"""
+    args = request.args if args is None else args
+    try:
+        limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+    except (TypeError, ValueError):
+        limit = DEFAULT_PAGE_SIZE
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    after = args.get('after')
+    return limit, (decode_cursor(after) if after else None)
+
+def paginate(rows, limit, cursor_values):
+    """Trim the look-ahead row (queries fetch limit + 1) and build next_cursor from the last row kept"""
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(cursor_values(rows[-1]))
+    return rows, None
+
+# ============= SEARCH INDEX =============
+
+# Seconds before a search index is rebuilt from the database to pick up writes made outside this process
+SEARCH_INDEX_REFRESH = float(os.environ.get('SEARCH_INDEX_REFRESH', 300))
+
+def normalize_search_text(value):
+    """Case-fold and strip accents so matching follows MySQL's default accent/case-insensitive collation"""
+    text = unicodedata.normalize('NFKD', str(value))
+    return ''.join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+
+@lru_cache(maxsize=65536)
+def search_grams(text):
+    """All 1-, 2- and 3-character substrings of text (memoized: species and breeds repeat a lot)"""
+    return frozenset(text[i:i + n] for n in (1, 2, 3) for i in range(len(text) - n + 1))
+
+def is_plain_search(q):
+    """LIKE wildcards in the query keep their SQL meaning, so those searches bypass the index"""
+    return '%' not in q and '_' not in q and '\\' not in q
+
+class SearchIndex:
+    """In-memory n-gram index answering the same matches as `field LIKE '%q%'` on a few columns.
+
+    Every 1-, 2- and 3-character gram of each indexed field maps to the ids containing it.
+    A lookup intersects the postings of the query's grams and confirms the substring on the
+    few remaining candidates. Only rows returned by `loader` (e.g. Available pets) are indexed.
+    """
+
+    def __init__(self, id_field, fields, loader, id_order=1, refresh_interval=SEARCH_INDEX_REFRESH):
+        self.id_field = id_field
+        self.fields = fields                # [(column, weight)] used for matching and ranking
+        self.loader = loader                # loader(cursor, ids=None) -> eligible rows
+        self.id_order = id_order            # tie-break on id: 1 ascending, -1 descending
+        self.refresh_interval = refresh_interval
+        self._docs = {}                     # id -> (shelter_id, [normalized field values])
+        self._postings = defaultdict(set)   # gram -> set of ids
+        self._shelters = defaultdict(set)   # shelter_id -> set of ids
+        self._results = {}                  # (query, shelter_id) -> ranked ids, valid for one generation
+        self._generation = 0
+        self._digest = 0                    # XOR of _doc_digest() over the indexed documents
+        self._built_at = None
+        self._stale = False                 # invalidate() was called; rebuild on the next search
+        self._building = False
+        self._pending = []                  # refreshes that arrived while a rebuild was running
+        self._lock = threading.RLock()
+        self._build_lock = threading.Lock()
+
+    def _doc_from_row(self, row):
+        values = [normalize_search_text(row[col]) if row.get(col) is not None else '' for col, _ in self.fields]
+        return row.get('shelter_id'), values
+
+    @staticmethod
+    def _add(docs, postings, shelters, doc_id, doc):
+        docs[doc_id] = doc
+        shelters[doc[0]].add(doc_id)
+        for value in doc[1]:
+            for gram in search_grams(value):
+                postings[gram].add(doc_id)
+
+    @staticmethod
+    def _remove(docs, postings, shelters, doc_id):
+        doc = docs.pop(doc_id, None)
+        if doc is None:
+            return None
+        shelters[doc[0]].discard(doc_id)
+        for value in doc[1]:
+            for gram in search_grams(value):
+                ids = postings.get(gram)
+                if ids is not None:
+                    ids.discard(doc_id)
+                    if not ids:
+                        del postings[gram]
+        return doc
+
+    @staticmethod
+    def _doc_digest(doc_id, doc):
+        """64-bit hash of one document; the same in every process (unlike hash())"""
+        if doc is None:
+            return 0
+        return int.from_bytes(hashlib.blake2b(repr((doc_id, doc)).encode(), digest_size=8).digest(), 'big')
+
+    def _apply(self, docs, postings, shelters, ids, rows):
+        """Re-index the given ids from their re-read rows; returns the change to the digest"""
+        delta, found = 0, set()
+        for row in rows:
+            doc_id = row[self.id_field]
+            found.add(doc_id)
+            doc = self._doc_from_row(row)
+            delta ^= self._doc_digest(doc_id, self._remove(docs, postings, shelters, doc_id))
+            self._add(docs, postings, shelters, doc_id, doc)
+            delta ^= self._doc_digest(doc_id, doc)
+        for doc_id in ids:
+            if doc_id not in found:
+                delta ^= self._doc_digest(doc_id, self._remove(docs, postings, shelters, doc_id))
+        return delta
+
+    @property
+    def generation(self):
+        """Fingerprint of the indexed contents. It changes whenever they do, and processes
+        holding the same rows report the same value, so ETags agree across workers."""
+        return f"{self._digest:016x}"
+
+    def invalidate(self):
+        """Rebuild on the next search; searches keep using the current index until it is replaced"""
+        with self._lock:
+            self._stale = True
+
+    def is_fresh(self):
+        """True while the index is built, not invalidated and younger than refresh_interval"""
+        return (self._built_at is not None and not self._stale
+                and time.monotonic() - self._built_at < self.refresh_interval)
+
+    def ensure_built(self, conn):
+        """Build the index on first use and rebuild it once it is stale. Only the first build
+        blocks: while a rebuild runs other threads keep searching the previous index."""
+        if self.is_fresh():
+            return
+        if not self._build_lock.acquire(blocking=self._built_at is None):
+            return
+        try:
+            if self.is_fresh():
+                return
+            with self._lock:
+                self._building = True
+                self._stale = False     # an invalidate() from here on schedules another rebuild
+                self._pending = []
+            cursor = conn.cursor(dictionary=True)
+            try:
+                rows = self.loader(cursor)
+            finally:
+                cursor.close()
+            docs, postings, shelters = {}, defaultdict(set), defaultdict(set)
+            for row in rows:
+                self._add(docs, postings, shelters, row[self.id_field], self._doc_from_row(row))
+            with self._lock:
+                for ids, fresh_rows in self._pending:
+                    self._apply(docs, postings, shelters, ids, fresh_rows)
+                digest = 0
+                for doc_id, doc in docs.items():
+                    digest ^= self._doc_digest(doc_id, doc)
+                self._docs, self._postings, self._shelters = docs, postings, shelters
+                self._digest = digest
+                self._results = {}
+                self._generation += 1
+                self._built_at = time.monotonic()
+        except Exception:
+            with self._lock:
+                self._stale = self._built_at is not None
+            raise
+        finally:
+            with self._lock:
+                self._building = False
+                self._pending = []
+            self._build_lock.release()
+
+    def refresh(self, conn, ids):
+        """Re-read the given ids after a write and add, update or drop them from the index"""
+        ids = [int(i) for i in ids if i is not None]
+        if not ids or (self._built_at is None and not self._building):
+            return
+        try:
+            cursor = conn.cursor(dictionary=True)
+            try:
+                rows = self.loader(cursor, ids)
+            finally:
+                cursor.close()
+        except Error as e:
+            print(f"Search index refresh failed, scheduling rebuild: {e}")
+            self.invalidate()
+            return
+        with self._lock:
+            if self._building:
+                self._pending.append((ids, rows))
+            if self._built_at is not None:
+                self._digest ^= self._apply(self._docs, self._postings, self._shelters, ids, rows)
+                self._results = {}
+                self._generation += 1
+
+    def _score(self, query, values):
+        score = 0
+        for (col, weight), value in zip(self.fields, values):
+            pos = value.find(query)
+            if pos < 0:
+                continue
+            if value == query:
+                quality = 8
+            elif pos == 0:
+                quality = 4
+            elif not value[pos - 1].isalnum():
+                quality = 2
+            else:
+                quality = 1
+            score += quality * weight
+        return score
+
+    def search(self, q, shelter_id=None):
+        """Return [(sort_key, id)] for every indexed row matching q, best matches first.
+        Results are cached until the next write so paging and repeated keystrokes are cheap."""
+        query = normalize_search_text(q)
+        key = (query, shelter_id)
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None:
+                return cached
+            generation = self._generation
+            if not query:
+                candidates = set(self._docs)
+            elif len(query) <= 3:
+                candidates = self._postings.get(query, set())
+            else:
+                postings = sorted((self._postings.get(g, set()) for g in search_grams(query) if len(g) == 3), key=len)
+                candidates = set(postings[0]) if postings else set()
+                for ids in postings[1:]:
+                    if not candidates:
+                        break
+                    candidates &= ids
+            if shelter_id is not None:
+                candidates = candidates & self._shelters.get(shelter_id, set())
+            docs = self._docs
+            ranked = []
+            for doc_id in candidates:
+                score = self._score(query, docs[doc_id][1])
+                if score:
+                    ranked.append(((-score, self.id_order * doc_id), doc_id))
+        ranked.sort()
+        with self._lock:
+            if generation == self._generation:
+                if len(self._results) >= 256:
+                    self._results.pop(next(iter(self._results)))
+                self._results[key] = ranked
+        return ranked
+
+    def page(self, ranked, limit, after=None):
+        """Slice one keyset page from search() results; cursors carry [score, id]"""
+        start = 0
+        if after:
+            start = bisect.bisect_right(ranked, ((-int(after[0]), self.id_order * int(after[1])), float('inf')))
+        window = ranked[start:start + limit + 1]
+        next_cursor = None
+        if len(window) > limit:
+            window = window[:limit]
+            (neg_score, _), last_id = window[-1]
+            next_cursor = encode_cursor([-neg_score, last_id])
+        return [doc_id for _, doc_id in window], next_cursor
+
+    def stats(self):
+        with self._lock:
+            return {'documents': len(self._docs), 'grams': len(self._postings),
+                    'age_seconds': round(time.monotonic() - self._built_at, 1) if self._built_at else None}
 
 
-# Development helper: set a session quickly for testing (only when debug=True)
-@app.route('/dev/login-as', methods=['POST'])
-def dev_login_as():
-    """Dev-only: create a session for a given username and admin flag. Only enabled when app.debug is True."""
-    if not app.debug:
-        return jsonify({'error': 'Not available'}), 404
-    data = request.json or {}
-    username = data.get('username', 'devuser')
-    is_admin = bool(data.get('is_admin', False))
-    # Set a fake user id for dev testing
-    session['user_id'] = -999
-    session['username'] = username
-    session['is_admin'] = is_admin
-    print(f"[DEV] created session for {username} is_admin={is_admin}")
-    return jsonify({'message': 'dev session created', 'user': {'username': username, 'is_admin': is_admin}}), 200
+def _load_searchable_pets(cursor, ids=None):
+    sql = "SELECT pet_id, shelter_id, name, species, breed FROM Pet WHERE status = 'Available'"
+    if ids:
+        sql += f" AND pet_id IN ({', '.join(['%s'] * len(ids))})"
+    cursor.execute(sql, tuple(ids or ()))
+    return cursor.fetchall()
 
+def _load_searchable_shop_items(cursor, ids=None):
+    sql = "SELECT item_id, shelter_id, name, description FROM ShopItem WHERE stock_quantity > 0"
+    if ids:
+        sql += f" AND item_id IN ({', '.join(['%s'] * len(ids))})"
+    cursor.execute(sql, tuple(ids or ()))
+    return cursor.fetchall()
 
-@app.route('/dev/session-check', methods=['GET'])
-def dev_session_check():
-    """Dev-only: show current session state for debugging."""
-    if not app.debug:
-        return jsonify({'error': 'Not available'}), 404
-    return jsonify({'session': dict(session), 'session_keys': list(session.keys())}), 200
+pet_search_index = SearchIndex('pet_id', [('name', 4), ('species', 2), ('breed', 1)], _load_searchable_pets)
+shop_search_index = SearchIndex('item_id', [('name', 2), ('description', 1)], _load_searchable_shop_items, id_order=-1)
 
 # ============= PET ROUTES =============
 
+def get_listing_args(args):
+    """Parse ?q=, ?shelter_id=, ?limit= and ?after= for the public list endpoints.
+
+    Returns (q, use_index, shelter_id, limit, after) where `after` is a [score, id] cursor when
+    the search index answers the query and a plain id otherwise. Raises ValueError with the
+    message to send back to the client.
+    """
+    q = args.get('q') or None
+    use_index = bool(q) and is_plain_search(q)
+    try:
+        limit, after = get_page_args(args)
+        if use_index:
+            after = [int(after[0]), int(after[1])] if after else None
+        else:
+            after = int(after[0]) if after else None
+    except (ValueError, TypeError, IndexError):
+        raise ValueError('Invalid cursor')
+    shelter_id = args.get('shelter_id')
+    try:
+        shelter_id = int(shelter_id) if shelter_id else None
+    except ValueError:
+        raise ValueError('Invalid shelter_id')
+    return q, use_index, shelter_id, limit, after
+
+def pets_page_plan(q, use_index, shelter_id, limit, after):
+    """Query plan for one page of GET /api/pets; returns {'pets', 'next_cursor'}.
+    With use_index the caller must have called pet_search_index.ensure_built() first."""
+    if use_index:
+        # Ranked match on name/species/breed from the index, then load the page's rows by primary key
+        ranked = pet_search_index.search(q, shelter_id)
+        page_ids, next_cursor = pet_search_index.page(ranked, limit, after)
+        pets = []
+        if page_ids:
+            rows = yield (
+                "SELECT pet_id, name, species, breed, age, health_status, price, shelter_id, status "
+                f"FROM Pet WHERE status = 'Available' AND pet_id IN ({', '.join(['%s'] * len(page_ids))})",
+                tuple(page_ids)
+            )
+            by_id = {row['pet_id']: row for row in rows}
+            pets = [by_id[i] for i in page_ids if i in by_id]
+        return {'pets': pets, 'next_cursor': next_cursor}
+    if q:
+        # Searches containing LIKE wildcards keep their SQL semantics
+        like = f"%{q}%"
+        sql = """
+            SELECT pet_id, name, species, breed, age, health_status, price, shelter_id, status
+            FROM Pet
+            WHERE status = 'Available' AND (name LIKE %s OR species LIKE %s OR breed LIKE %s)
+        """
+        params = [like, like, like]
+        if shelter_id is not None:
+            sql += " AND shelter_id = %s"
+            params.append(shelter_id)
+        if after is not None:
+            sql += " AND pet_id > %s"
+            params.append(after)
+        sql += " ORDER BY pet_id LIMIT %s"
+        params.append(limit + 1)
+        pets = yield (sql, tuple(params))
+    else:
+        # Default behavior via stored procedure
+        pets = yield ("CALL list_available_pets_page(%s, %s, %s)", (shelter_id, after, limit + 1))
+    pets, next_cursor = paginate(pets, limit, lambda p: [p['pet_id']])
+    return {'pets': pets, 'next_cursor': next_cursor}
+
 @app.route('/api/pets', methods=['GET'])
+@conditional_get('pets', scope=shelter_scope, extra=search_generation(pet_search_index))
 def get_pets():
-    """Get all available pets (optionally filter by shelter)"""
-    shelter_id = request.args.get('shelter_id', None)
-    q = request.args.get('q', None)
+    """Get available pets (optionally filter by shelter), one keyset page at a time.
+    Text searches are answered from the in-memory search index and ranked by relevance;
+    otherwise pets are ordered by pet_id."""
+    try:
+        q, use_index, shelter_id, limit, after = get_listing_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     conn = get_db_connection()
     if not conn:
@@ -203,45 +1783,104 @@ def get_pets():
     
     try:
         cursor = conn.cursor(dictionary=True)
-        if q:
-            # Text search on name/species/breed, only Available pets
-            like = f"%{q}%"
-            if shelter_id:
-                cursor.execute(
-                    """
-                    SELECT pet_id, name, species, breed, age, health_status, price, shelter_id, status
-                    FROM Pet
-                    WHERE status = 'Available'
-                      AND shelter_id = %s
-                      AND (name LIKE %s OR species LIKE %s OR breed LIKE %s)
-                    ORDER BY pet_id
-                    """,
-                    (shelter_id, like, like, like)
-                )
-            else:
-                cursor.execute(
-                    """
-                    SELECT pet_id, name, species, breed, age, health_status, price, shelter_id, status
-                    FROM Pet
-                    WHERE status = 'Available' AND (name LIKE %s OR species LIKE %s OR breed LIKE %s)
-                    ORDER BY pet_id
-                    """,
-                    (like, like, like)
-                )
-            pets = cursor.fetchall()
-            return jsonify(pets), 200
-        else:
-            # Default behavior via stored procedure
-            cursor.callproc('list_available_pets', [shelter_id])
-            for result in cursor.stored_results():
-                pets = result.fetchall()
-            return jsonify(pets), 200
+        if use_index:
+            pet_search_index.ensure_built(conn)
+        page = run_query_plan(cursor, pets_page_plan(q, use_index, shelter_id, limit, after))
+        return jsonify(page), 200
     except Error as e:
         return jsonify({'error': str(e)}), 500
     finally:
         cursor.close()
         conn.close()
 
+def pet_details_plan(pet_ids, vet_limit=None):
+    """Query plan loading pets with shelter/caretaker names, vet records and eligibility in two
+    set-based queries.
+
+    Eligibility follows check_pet_eligibility(): 'Not Available' unless the pet is Available,
+    'No Vet Record' without any checkup, otherwise 'Eligible'. `vet_limit` keeps only the most
+    recent N vet records per pet (uses a window function, MySQL 8.0+).
+    Returns {pet_id: pet} for the pets that exist.
+    """
+    if not pet_ids:
+        return {}
+    placeholders = ', '.join(['%s'] * len(pet_ids))
+    rows = yield (f"""
+        SELECT p.*, s.name as shelter_name, c.name as caretaker_name
+        FROM Pet p
+        LEFT JOIN Shelter s ON p.shelter_id = s.shelter_id
+        LEFT JOIN Caretaker c ON p.caretaker_id = c.caretaker_id
+        WHERE p.pet_id IN ({placeholders})
+    """, tuple(pet_ids))
+    pets = {row['pet_id']: row for row in rows}
+    if not pets:
+        return {}
+
+    found = list(pets)
+    placeholders = ', '.join(['%s'] * len(found))
+    if vet_limit is None:
+        records = yield (f"""
+            SELECT * FROM VetRecord
+            WHERE pet_id IN ({placeholders})
+            ORDER BY pet_id, checkup_date DESC, vet_record_id DESC
+        """, tuple(found))
+    else:
+        records = yield (f"""
+            SELECT vet_record_id, pet_id, checkup_date, remarks, treatment, total_records
+            FROM (
+                SELECT v.*,
+                       ROW_NUMBER() OVER (PARTITION BY pet_id ORDER BY checkup_date DESC, vet_record_id DESC) AS rn,
+                       COUNT(*) OVER (PARTITION BY pet_id) AS total_records
+                FROM VetRecord v
+                WHERE v.pet_id IN ({placeholders})
+            ) ranked
+            WHERE rn <= %s
+            ORDER BY pet_id, rn
+        """, tuple(found) + (vet_limit,))
+
+    for pet in pets.values():
+        pet['vet_records'] = []
+        pet['vet_record_count'] = 0
+    for record in records:
+        pet = pets[record['pet_id']]
+        total = record.pop('total_records', None)
+        pet['vet_record_count'] = total if total is not None else pet['vet_record_count'] + 1
+        pet['vet_records'].append(record)
+
+    for pet in pets.values():
+        if pet['status'] != 'Available':
+            pet['eligibility'] = 'Not Available'
+        elif pet['vet_record_count'] == 0:
+            pet['eligibility'] = 'No Vet Record'
+        else:
+            pet['eligibility'] = 'Eligible'
+    return pets
+
+def load_pet_details(cursor, pet_ids, vet_limit=None):
+    """Load {pet_id: pet} with vet records and eligibility, see pet_details_plan"""
+    return run_query_plan(cursor, pet_details_plan(pet_ids, vet_limit))
+
+def get_details_args(args):
+    """Parse ?ids= and ?vet_limit= for GET /api/pets/details; returns (pet_ids, vet_limit).
+    Raises ValueError with the message to send back to the client."""
+    try:
+        pet_ids = list(dict.fromkeys(int(i) for i in args.get('ids', '').split(',') if i.strip()))
+    except ValueError:
+        raise ValueError('ids must be a comma-separated list of integers')
+    if not pet_ids:
+        raise ValueError('ids required')
+    if len(pet_ids) > MAX_PAGE_SIZE:
+        raise ValueError(f'At most {MAX_PAGE_SIZE} ids per request')
+    vet_limit = None
+    if 'vet_limit' in args:
+        try:
+            vet_limit = int(args['vet_limit'])
+        except ValueError:
+            vet_limit = 0
+        if vet_limit < 1:
+            raise ValueError('vet_limit must be a positive integer')
+    return pet_ids, vet_limit
+
 @app.route('/api/pets/<int:pet_id>', methods=['GET'])
 def get_pet_details(pet_id):
     """Get details of a specific pet"""
@@ -251,33 +1890,10 @@ def get_pet_details(pet_id):
     
     try:
         cursor = conn.cursor(dictionary=True)
-        
-        # Get pet details
-        cursor.execute("""
-            SELECT p.*, s.name as shelter_name, c.name as caretaker_name
-            FROM Pet p
-            LEFT JOIN Shelter s ON p.shelter_id = s.shelter_id
-            LEFT JOIN Caretaker c ON p.caretaker_id = c.caretaker_id
-            WHERE p.pet_id = %s
-        """, (pet_id,))
-        pet = cursor.fetchone()
-        
+        pet = load_pet_details(cursor, [pet_id]).get(pet_id)
         if not pet:
             return jsonify({'error': 'Pet not found'}), 404
         
-        # Get vet records
-        cursor.execute("""
-            SELECT * FROM VetRecord WHERE pet_id = %s ORDER BY checkup_date DESC
-        """, (pet_id,))
-        vet_records = cursor.fetchall()
-        
-        # Check eligibility
-        cursor.execute("SELECT check_pet_eligibility(%s) as eligibility", (pet_id,))
-        eligibility = cursor.fetchone()['eligibility']
-        
-        pet['vet_records'] = vet_records
-        pet['eligibility'] = eligibility
-        
         return jsonify(pet), 200
     except Error as e:
         return jsonify({'error': str(e)}), 500
@@ -285,10 +1901,37 @@ def get_pet_details(pet_id):
         cursor.close()
         conn.close()
 
+@app.route('/api/pets/details', methods=['GET'])
+def get_pets_details():
+    """Get details for several pets at once: ?ids=1,2,3 (max MAX_PAGE_SIZE), optional ?vet_limit=N
+    to keep only the N most recent vet records per pet. Pets are returned in the requested order."""
+    try:
+        pet_ids, vet_limit = get_details_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 500
+    
+    try:
+        cursor = conn.cursor(dictionary=True)
+        pets = load_pet_details(cursor, pet_ids, vet_limit)
+        return jsonify({
+            'pets': [pets[i] for i in pet_ids if i in pets],
+            'missing': [i for i in pet_ids if i not in pets]
+        }), 200
+    except Error as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
 # ============= ADOPTION ROUTES =============
 
 @app.route('/api/adoptions/apply', methods=['POST'])
 @login_required
+@idempotent
 def apply_for_adoption():
     """Apply for pet adoption"""
     data = request.json
@@ -339,6 +1982,57 @@ def get_my_applications():
         cursor.close()
         conn.close()
 
+# MYSQL_ERRNO values signalled by the approve_adoption procedure
+APPROVAL_ERROR_CODES = {
+    5001: 'application_not_found',
+    5002: 'application_not_pending',
+    5003: 'pet_not_found',
+    5004: 'pet_not_available',
+    5005: 'donor_self_adoption',
+    5006: 'no_vet_record',
+    5007: 'user_not_found',
+    5008: 'insufficient_funds',
+}
+
+def approve_application(cursor, application_id):
+    """Approve an adoption application with a single CALL and return the adopted pet_id.
+
+    approve_adoption validates under row locks, commits, and signals MYSQL_ERRNO 5001-5008
+    with a readable message on failure, so no pre-validation queries are needed.
+    (callproc() would add SET/SELECT round trips for the argument variables.)
+    """
+    pet_id = None
+    for result in cursor.execute("CALL approve_adoption(%s)", (application_id,), multi=True):
+        if result.with_rows:
+            pet_id = result.fetchone()[0]
+    return pet_id
+
+def approval_error(conn, application_id, e):
+    """JSON body for a failed approval: the procedure's message plus its error code"""
+    code = APPROVAL_ERROR_CODES.get(e.errno)
+    if code is None:
+        return {'error': str(e)}
+    body = {'error': e.msg, 'code': code}
+    if code == 'insufficient_funds':
+        # Rare path: one diagnostic query for the amounts shown to the admin
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f"""
+                SELECT p.price, {WALLET_BALANCE_SQL}
+                FROM AdopterApplication aa
+                JOIN Pet p ON aa.pet_id = p.pet_id
+                JOIN User u ON aa.user_id = u.user_id
+                WHERE aa.application_id = %s
+            """, (application_id,))
+            row = cursor.fetchone()
+            if row:
+                body['required'], body['balance'] = float(row[0] or 0), float(row[1] or 0)
+        except Error:
+            pass
+        finally:
+            cursor.close()
+    return body
+
 @app.route('/api/adoptions/<int:application_id>/approve', methods=['POST'])
 @admin_required
 def approve_adoption_application(application_id):
@@ -347,66 +2041,19 @@ def approve_adoption_application(application_id):
     if not conn:
         return jsonify({'error': 'Database connection failed'}), 500
     try:
-        # Pre-validate to provide clearer error messages, actual enforcement remains in SP
-        c = conn.cursor(dictionary=True)
-        c.execute("SELECT user_id, pet_id, status FROM AdopterApplication WHERE application_id = %s", (application_id,))
-        app_row = c.fetchone()
-        if not app_row:
-            return jsonify({'error': 'Application not found'}), 400
-        if app_row['status'] != 'pending':
-            return jsonify({'error': 'Application is not pending'}), 400
-
-        pet_id = app_row['pet_id']
-        user_id = app_row['user_id']
-
-        c.execute("SELECT status, price, shelter_id FROM Pet WHERE pet_id = %s", (pet_id,))
-        pet_row = c.fetchone()
-        if not pet_row:
-            return jsonify({'error': 'Pet not found'}), 400
-        if pet_row['status'] != 'Available':
-            return jsonify({'error': 'Pet is not available for adoption'}), 400
-
-        # Donor self-adopt check
-        c.execute("SELECT 1 FROM DonorApplication WHERE pet_id = %s AND user_id = %s AND status = 'approved' LIMIT 1", (pet_id, user_id))
-        if c.fetchone():
-            return jsonify({'error': 'Donors cannot adopt their own donated pet'}), 400
-
-        # Vet record check
-        c.execute("SELECT COUNT(*) AS cnt FROM VetRecord WHERE pet_id = %s", (pet_id,))
-        if (c.fetchone() or {}).get('cnt', 0) == 0:
-            return jsonify({'error': 'Pet must have at least one veterinary checkup before adoption'}), 400
-
-        # Wallet check if needed
-        price = float(pet_row.get('price') or 0)
-        if price > 0:
-            c.execute("SELECT wallet FROM User WHERE user_id = %s", (user_id,))
-            u = c.fetchone()
-            if not u:
-                return jsonify({'error': 'User not found'}), 400
-            wallet = float(u.get('wallet') or 0)
-            if wallet < price:
-                return jsonify({'error': 'Insufficient funds in user wallet', 'required': price, 'balance': wallet}), 400
-
-        # Call stored procedure to perform atomic update
-        c2 = conn.cursor()
-        c2.callproc('approve_adoption', [application_id])
-        conn.commit()
+        cursor = conn.cursor()
+        # approve_adoption commits its own transaction
+        pet_id = approve_application(cursor, application_id)
+        pet_search_index.refresh(conn, [pet_id])
         return jsonify({'message': 'Application approved successfully'}), 200
     except Error as e:
         try:
             conn.rollback()
         except Exception:
             pass
-        return jsonify({'error': str(e)}), 400
+        return jsonify(approval_error(conn, application_id, e)), 400
     finally:
-        try:
-            c.close()
-        except Exception:
-            pass
-        try:
-            c2.close()
-        except Exception:
-            pass
+        cursor.close()
         conn.close()
 
 @app.route('/api/adoptions/<int:application_id>/reject', methods=['POST'])
@@ -483,6 +2130,10 @@ def accept_donor_application_route(donor_app_id):
         cursor = conn.cursor()
         cursor.callproc('accept_donor_application', [donor_app_id, shelter_id])
         conn.commit()
+        cursor.execute("SELECT pet_id FROM DonorApplication WHERE donor_app_id = %s", (donor_app_id,))
+        row = cursor.fetchone()
+        if row:
+            pet_search_index.refresh(conn, [row[0]])
         
         return jsonify({'message': 'Donor application accepted successfully'}), 200
     except Error as e:
@@ -514,13 +2165,229 @@ def reject_donor_application(donor_app_id):
         cursor.close()
         conn.close()
 
+# ============= ADMIN: BULK APPLICATION DECISIONS =============
+
+BULK_BATCH_SIZE = int(os.environ.get('BULK_BATCH_SIZE', 100))
+MAX_BULK_ACTIONS = 5000
+BULK_ACTIONS = {('adoption', 'approve'), ('adoption', 'reject'), ('donor', 'approve'), ('donor', 'reject')}
+
+def _bulk_reject(cursor, table, id_column, ids, results, procedure=None):
+    """Reject the pending applications among ids; the others fail as not found / not pending.
+
+    Statuses are read under FOR UPDATE first, so only rows this call changes count as rejected.
+    With `procedure` (reject_adoption) each application goes through the same procedure as the
+    single-reject route; otherwise one UPDATE rejects them all."""
+    placeholders = ', '.join(['%s'] * len(ids))
+    cursor.execute(
+        f"SELECT {id_column}, status FROM {table} WHERE {id_column} IN ({placeholders}) "
+        f"ORDER BY {id_column} FOR UPDATE",
+        tuple(ids)
+    )
+    statuses = dict(cursor.fetchall())
+    pending = [app_id for app_id in ids if statuses.get(app_id) == 'pending']
+    if procedure:
+        for app_id in pending:
+            cursor.execute(f"CALL {procedure}(%s, %s)", (app_id, results[app_id]['reason'] or 'Not specified'))
+    elif pending:
+        cursor.execute(
+            f"UPDATE {table} SET status = 'rejected' "
+            f"WHERE {id_column} IN ({', '.join(['%s'] * len(pending))}) AND status = 'pending'",
+            tuple(pending)
+        )
+    for app_id in ids:
+        status = statuses.get(app_id)
+        if status == 'pending':
+            results[app_id].update(ok=True)
+        else:
+            results[app_id].update(ok=False, error='Application not found' if status is None else 'Application is not pending')
+
+@app.route('/api/admin/applications/bulk', methods=['POST'])
+@admin_required
+def bulk_application_decisions():
+    """Approve or reject many adoption/donor applications in one request.
+
+    Request JSON: {actions: [{type: 'adoption'|'donor', id: int, action: 'approve'|'reject',
+    shelter_id?: int (donor approvals), reason?: str (adoption rejections)}]}. Actions are
+    processed in (type, id) order, so rows are locked in a consistent order, in chunks of
+    BULK_BATCH_SIZE. Rejections and donor approvals share one transaction per chunk (a savepoint
+    per donor approval); adoption rejections call reject_adoption like the single-reject route.
+    Adoption approvals call approve_adoption, which commits each approval on its own.
+    If several approvals target the same pet they are tried in the order listed until one
+    succeeds; the rest then fail with code 'competing_application' (approve_adoption has
+    rejected them). Failures never stop the batch; the response has one result per action,
+    in request order.
+    """
+    data = request.json or {}
+    actions = data.get('actions')
+    if not isinstance(actions, list) or not actions:
+        return jsonify({'error': 'actions array required'}), 400
+    if len(actions) > MAX_BULK_ACTIONS:
+        return jsonify({'error': f'At most {MAX_BULK_ACTIONS} actions per request'}), 400
+
+    results = []                 # one per action, request order
+    by_key = {}                  # (type, id) -> result
+    for position, a in enumerate(actions):
+        result = {'type': a.get('type') if isinstance(a, dict) else None,
+                  'id': a.get('id') if isinstance(a, dict) else None,
+                  'action': a.get('action') if isinstance(a, dict) else None}
+        results.append(result)
+        try:
+            key = (result['type'], int(result['id']))
+        except (TypeError, ValueError):
+            result.update(ok=False, error='Invalid id')
+            continue
+        if (result['type'], result['action']) not in BULK_ACTIONS:
+            result.update(ok=False, error='Invalid type or action')
+        elif key in by_key:
+            result.update(ok=False, error='Duplicate application in batch')
+        else:
+            result['id'] = key[1]
+            result['shelter_id'] = a.get('shelter_id')
+            result['reason'] = a.get('reason')
+            by_key[key] = result
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 500
+    cursor = conn.cursor()
+    try:
+        # Competing approvals: only the first approval listed for a pet is scheduled; the later
+        # ones wait behind it and run, in the order listed, only while none has succeeded
+        approve_ids = [k[1] for k, r in by_key.items() if k[0] == 'adoption' and r['action'] == 'approve']
+        pets = _lookup(cursor, "SELECT application_id, pet_id FROM AdopterApplication WHERE application_id IN ({})",
+                       approve_ids)
+        first_for_pet = {}
+        runners_up = defaultdict(list)      # first application listed -> later results for the pet
+        for app_id in approve_ids:
+            pet_id = pets.get(app_id)
+            if pet_id is not None and first_for_pet.setdefault(pet_id, app_id) != app_id:
+                runners_up[first_for_pet[pet_id]].append(by_key.pop(('adoption', app_id)))
+
+        ordered = sorted(by_key)
+        touched_pets = []
+        for start in range(0, len(ordered), BULK_BATCH_SIZE):
+            chunk = ordered[start:start + BULK_BATCH_SIZE]
+            group = defaultdict(list)
+            for key in chunk:
+                group[(key[0], by_key[key]['action'])].append(key[1])
+
+            # Rejections and donor approvals: one bounded transaction for the chunk
+            # (autocommit is off, so it runs from the first statement to the commit below)
+            try:
+                if group[('adoption', 'reject')]:
+                    _bulk_reject(cursor, 'AdopterApplication', 'application_id', group[('adoption', 'reject')],
+                                 {i: by_key[('adoption', i)] for i in group[('adoption', 'reject')]},
+                                 procedure='reject_adoption')
+                if group[('donor', 'reject')]:
+                    _bulk_reject(cursor, 'DonorApplication', 'donor_app_id', group[('donor', 'reject')],
+                                 {i: by_key[('donor', i)] for i in group[('donor', 'reject')]})
+                accepted = []
+                for donor_app_id in group[('donor', 'approve')]:
+                    result = by_key[('donor', donor_app_id)]
+                    cursor.execute("SAVEPOINT bulk_item")
+                    try:
+                        cursor.execute("CALL accept_donor_application(%s, %s)", (donor_app_id, result['shelter_id']))
+                        result.update(ok=True)
+                        accepted.append(donor_app_id)
+                    except Error as e:
+                        if e.errno == 1213:
+                            raise
+                        cursor.execute("ROLLBACK TO SAVEPOINT bulk_item")
+                        result.update(ok=False, error=e.msg if e.sqlstate == '45000' else str(e))
+                donated_pets = _lookup(
+                    cursor, "SELECT donor_app_id, pet_id FROM DonorApplication WHERE donor_app_id IN ({})", accepted)
+                conn.commit()
+                touched_pets += donated_pets.values()
+            except Error as e:
+                # e.g. a deadlock: the whole chunk transaction is gone, so none of it applied
+                conn.rollback()
+                for key in chunk:
+                    if key[0] == 'donor' or by_key[key]['action'] == 'reject':
+                        by_key[key].update(ok=False, error=str(e))
+
+            # Adoption approvals: approve_adoption runs and commits its own transaction
+            for app_id in group[('adoption', 'approve')]:
+                winner = None
+                for result in [by_key[('adoption', app_id)]] + runners_up.get(app_id, []):
+                    if winner is not None:
+                        result.update(ok=False, code='competing_application',
+                                      error=f'Application {winner} for the same pet is approved in this batch')
+                        continue
+                    try:
+                        touched_pets.append(approve_application(cursor, result['id']))
+                        result.update(ok=True)
+                        winner = result['id']
+                    except Error as e:
+                        try:
+                            conn.rollback()
+                        except Error:
+                            pass
+                        result.update(ok=False, **approval_error(conn, result['id'], e))
+
+        if touched_pets:
+            pet_search_index.refresh(conn, [p for p in touched_pets if p is not None])
+    except Error as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        cursor.close(); conn.close()
+
+    for result in results:
+        result.pop('shelter_id', None)
+        result.pop('reason', None)
+    succeeded = sum(1 for r in results if r.get('ok'))
+    return jsonify({'results': results, 'succeeded': succeeded, 'failed': len(results) - succeeded}), 200
+
 # ============= SHOP ROUTES =============
 
+def shop_items_page_plan(q, use_index, shelter_id, limit, after):
+    """Query plan for one page of GET /api/shop/items; returns {'items', 'next_cursor'}.
+    With use_index the caller must have called shop_search_index.ensure_built() first."""
+    base_sql = (
+        "SELECT si.*, s.name as shelter_name "
+        "FROM ShopItem si JOIN Shelter s ON si.shelter_id = s.shelter_id "
+        "WHERE si.stock_quantity > 0"
+    )
+    if use_index:
+        # Ranked match on name/description from the index, then load the page's rows by primary key
+        ranked = shop_search_index.search(q, shelter_id)
+        page_ids, next_cursor = shop_search_index.page(ranked, limit, after)
+        items = []
+        if page_ids:
+            rows = yield (
+                base_sql + f" AND si.item_id IN ({', '.join(['%s'] * len(page_ids))})",
+                tuple(page_ids)
+            )
+            by_id = {row['item_id']: row for row in rows}
+            items = [by_id[i] for i in page_ids if i in by_id]
+        return {'items': items, 'next_cursor': next_cursor}
+    params = []
+    if shelter_id is not None:
+        base_sql += " AND si.shelter_id = %s"
+        params.append(shelter_id)
+    if q:
+        # Searches containing LIKE wildcards keep their SQL semantics
+        base_sql += " AND (si.name LIKE %s OR si.description LIKE %s)"
+        like = f"%{q}%"
+        params.extend([like, like])
+    if after is not None:
+        base_sql += " AND si.item_id < %s"
+        params.append(after)
+    base_sql += " ORDER BY si.item_id DESC LIMIT %s"
+    params.append(limit + 1)
+    rows = yield (base_sql, tuple(params))
+    items, next_cursor = paginate(rows, limit, lambda i: [i['item_id']])
+    return {'items': items, 'next_cursor': next_cursor}
+
 @app.route('/api/shop/items', methods=['GET'])
+@conditional_get('shop_items', scope=shelter_scope, extra=search_generation(shop_search_index))
 def get_shop_items():
-    """Get all shop items"""
-    shelter_id = request.args.get('shelter_id', None)
-    q = request.args.get('q', None)
+    """Get in-stock shop items, one keyset page at a time.
+    Text searches are answered from the in-memory search index and ranked by relevance;
+    otherwise items are ordered by item_id descending."""
+    try:
+        q, use_index, shelter_id, limit, after = get_listing_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     conn = get_db_connection()
     if not conn:
@@ -528,24 +2395,10 @@ def get_shop_items():
     
     try:
         cursor = conn.cursor(dictionary=True)
-        base_sql = (
-            "SELECT si.*, s.name as shelter_name "
-            "FROM ShopItem si JOIN Shelter s ON si.shelter_id = s.shelter_id "
-            "WHERE si.stock_quantity > 0"
-        )
-        params = []
-        if shelter_id:
-            base_sql += " AND si.shelter_id = %s"
-            params.append(shelter_id)
-        if q:
-            base_sql += " AND (si.name LIKE %s OR si.description LIKE %s)"
-            like = f"%{q}%"
-            params.extend([like, like])
-        base_sql += " ORDER BY si.item_id DESC"
-        cursor.execute(base_sql, tuple(params))
-        items = cursor.fetchall()
-        
-        return jsonify(items), 200
+        if use_index:
+            shop_search_index.ensure_built(conn)
+        page = run_query_plan(cursor, shop_items_page_plan(q, use_index, shelter_id, limit, after))
+        return jsonify(page), 200
     except Error as e:
         return jsonify({'error': str(e)}), 500
     finally:
@@ -554,6 +2407,7 @@ def get_shop_items():
 
 @app.route('/api/shop/order', methods=['POST'])
 @login_required
+@idempotent
 def place_order():
     """Place a shop order"""
     data = request.json
@@ -571,6 +2425,7 @@ def place_order():
         cursor = conn.cursor()
         cursor.callproc('place_shop_order', [session['user_id'], item_id, quantity])
         conn.commit()
+        shop_search_index.refresh(conn, [item_id])
         
         return jsonify({'message': 'Order placed successfully'}), 201
     except Error as e:
@@ -654,7 +2509,9 @@ def admin_create_shop_item():
             (shelter_id, name, description, price, stock_quantity)
         )
         conn.commit()
-        return jsonify({'message': 'Item created', 'item_id': cursor.lastrowid}), 201
+        item_id = cursor.lastrowid
+        shop_search_index.refresh(conn, [item_id])
+        return jsonify({'message': 'Item created', 'item_id': item_id}), 201
     except Error as e:
         return jsonify({'error': str(e)}), 400
     finally:
@@ -681,6 +2538,7 @@ def admin_update_shop_item(item_id):
         cursor = conn.cursor()
         cursor.execute(sql, tuple(values))
         conn.commit()
+        shop_search_index.refresh(conn, [item_id])
         return jsonify({'message': 'Item updated'}), 200
     except Error as e:
         return jsonify({'error': str(e)}), 400
@@ -697,105 +2555,434 @@ def admin_delete_shop_item(item_id):
         cursor = conn.cursor()
         cursor.execute("DELETE FROM ShopItem WHERE item_id = %s", (item_id,))
         conn.commit()
+        shop_search_index.refresh(conn, [item_id])
         return jsonify({'message': 'Item deleted'}), 200
     except Error as e:
         return jsonify({'error': str(e)}), 400
     finally:
         cursor.close(); conn.close()
 
+class InsufficientFundsError(Error):
+    """Raised by place_batch_order when the wallet cannot cover the order total"""
+
+    def __init__(self, required, balance):
+        super().__init__(msg='Insufficient funds in wallet')
+        self.required = required
+        self.balance = balance
+
+
+def place_batch_order(conn, user_id, quantities, idempotency_key=None):
+    """Charge `user_id` for {item_id: quantity} in one transaction; the caller commits.
+
+    Locks are always taken in the same order: the wallet (wallet_lock), then every item in a single
+    `IN (...) ORDER BY item_id FOR UPDATE`, then this connection's revenue shards by shelter_id.
+    Carts holding the same items in a different order therefore queue instead of deadlocking.
+    Revenue is added with one upsert into ShelterRevenueShard (see add_shelter_revenue) and the
+    orders are inserted with one multi-row INSERT. The ShopOrder
+    triggers still check and decrement stock, but only on rows that are already locked. The
+    charge is one debit row in the wallet ledger, keyed by idempotency_key if given, so the same
+    order can never be charged twice.
+    Returns (total, lines). Raises Error on failure.
+    """
+    cursor = conn.cursor(dictionary=True)
+    try:
+        conn.start_transaction()
+        wallet = lock_wallet(cursor, user_id)
+        if wallet is None:
+            raise Error(msg="User not found")
+
+        item_ids = sorted(quantities)
+        cursor.execute(
+            "SELECT item_id, price, shelter_id, stock_quantity FROM ShopItem "
+            f"WHERE item_id IN ({', '.join(['%s'] * len(item_ids))}) ORDER BY item_id FOR UPDATE",
+            tuple(item_ids)
+        )
+        items = {item['item_id']: item for item in cursor.fetchall()}
+
+        for item_id in item_ids:
+            if item_id in items and (items[item_id]['stock_quantity'] or 0) < quantities[item_id]:
+                raise Error(msg=f"Insufficient stock for item {item_id}")
+        total, lines = price_order_lines(items, quantities)
+        if wallet < total:
+            raise InsufficientFundsError(total, wallet)
+        record_orders(cursor, user_id, total, lines, idempotency_key)
+        return total, lines
+    finally:
+        cursor.close()
+
+
+def price_order_lines(items, quantities):
+    """Price {item_id: quantity} against `items` ({item_id: row with price and shelter_id}).
+    Returns (total, lines) with lines as (shelter_id, item_id, quantity, line_total) in item_id
+    order; raises Error for an item that is missing from `items`."""
+    total = Decimal('0')
+    lines = []
+    for item_id in sorted(quantities):
+        item = items.get(item_id)
+        if not item:
+            raise Error(msg=f"Item {item_id} not found")
+        quantity = quantities[item_id]
+        line_total = (item['price'] or Decimal('0')) * quantity
+        total += line_total
+        lines.append((item['shelter_id'], item_id, quantity, line_total))
+    return total, lines
+
+
+def record_orders(cursor, user_id, total, lines, idempotency_key=None):
+    """Insert the ShopOrder rows for priced `lines` (see price_order_lines), add their revenue to
+    this connection's shelter revenue shards and debit `total` from the wallet ledger.
+    The caller holds the wallet and item row locks; the revenue shards are locked next, in
+    shelter_id order.
+    """
+    per_shelter = defaultdict(Decimal)  # shelter_id -> revenue sum
+    for shelter_id, _, _, line_total in lines:
+        if shelter_id is not None:
+            per_shelter[shelter_id] += line_total
+    if per_shelter:
+        shelter_ids = sorted(per_shelter)
+        cursor.execute(
+            "INSERT INTO ShelterRevenueShard (shelter_id, shard, amount, version, updated_at) VALUES "
+            + ", ".join(["(%s, revenue_shard(), %s, 1, CURRENT_TIMESTAMP(6))"] * len(shelter_ids))
+            + " ON DUPLICATE KEY UPDATE amount = amount + VALUES(amount), version = version + 1,"
+            " updated_at = CURRENT_TIMESTAMP(6)",
+            tuple(v for sid in shelter_ids for v in (sid, per_shelter[sid]))
+        )
+    # Shelter-ordered so the per-shelter rows bumped by the triggers are also locked in order
+    lines.sort(key=lambda line: (line[0] is None, line[0] or 0, line[1]))
+    cursor.execute(
+        "INSERT INTO ShopOrder (user_id, shelter_id, item_id, quantity, price, order_date) VALUES "
+        + ", ".join(["(%s, %s, %s, %s, %s, CURDATE())"] * len(lines)),
+        tuple(v for line in lines for v in (user_id,) + line)
+    )
+    first_order = cursor.lastrowid
+    post_wallet_transaction(cursor, user_id, -total, 'order',
+                            f"order:{first_order}" if len(lines) == 1
+                            else f"orders:{first_order}-{first_order + len(lines) - 1}",
+                            f"order:{idempotency_key}" if idempotency_key else None)
+
+
 @app.route('/api/shop/order/batch', methods=['POST'])
 @login_required
+@idempotent
 def place_order_batch():
     """Place a batch shop order with multiple items and quantities in a single transaction.
     Request JSON: { items: [{item_id: int, quantity: int}, ...] }
-    Ensures: sufficient wallet for total, sufficient stock for each item, updates per-shelter revenue.
+    Lines for the same item are merged. Ensures: sufficient wallet for total, sufficient stock
+    for each item, updates per-shelter revenue (see place_batch_order).
     """
     data = request.json or {}
     items = data.get('items') or []
     if not isinstance(items, list) or not items:
         return jsonify({'error': 'items array required'}), 400
-    # Normalize and validate
+    # Normalize, validate and merge duplicate lines
+    try:
+        quantities = defaultdict(int)
+        for it in items:
+            item_id = int(it.get('item_id'))
+            qty = int(it.get('quantity'))
+            if item_id <= 0 or qty <= 0:
+                return jsonify({'error': 'Invalid item_id or quantity'}), 400
+            quantities[item_id] += qty
+    except Exception:
+        return jsonify({'error': 'Invalid items format'}), 400
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 500
+    try:
+        total, lines = place_batch_order(conn, session['user_id'], quantities, g.get('idempotency_key'))
+        conn.commit()
+        shop_search_index.refresh(conn, [line[1] for line in lines])
+        return jsonify({'message': 'Order placed successfully', 'total_charged': round(float(total), 2), 'items_count': len(lines)}), 201
+    except InsufficientFundsError as e:
+        conn.rollback()
+        return jsonify({'error': e.msg, 'required': float(e.required), 'balance': float(e.balance)}), 400
+    except Error as e:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        if e.errno == DUPLICATE_KEY_ERROR and g.get('idempotency_key'):
+            # The ledger already has this key's debit: the order went through on an earlier attempt
+            return jsonify({'error': 'This order was already placed with the same Idempotency-Key'}), 409
+        return jsonify({'error': str(e)}), 400
+    finally:
+        conn.close()
+
+# ============= SHOPPING CART =============
+# Adding an item to the cart reserves it: the units leave ShopItem.stock_quantity at once, in a
+# transaction that locks the item row for a single UPDATE, and are held in CartItem until checkout
+# or expiry. Checkout only converts reservations, so buyers of a popular item no longer queue
+# behind each other's whole checkout.
+
+CART_RESERVATION_TTL = int(os.getenv('CART_RESERVATION_TTL', 15 * 60))
+CART_SWEEP_INTERVAL = 60
+CART_SWEEP_BATCH = 500
+_cart_sweep = {'next': 0.0}
+_cart_sweep_lock = threading.Lock()
+
+def sweep_expired_reservations(conn, item_id=None, batch=CART_SWEEP_BATCH):
+    """Put the stock of up to `batch` expired reservations (of one item, if given) back into
+    ShopItem and delete them, in one transaction. The expired rows are found through the
+    expires_at indexes, and each restocked item gets a single UPDATE.
+    Returns the ids of the restocked items."""
+    cursor = conn.cursor()
+    try:
+        conn.start_transaction()
+        sql = "SELECT user_id, item_id, quantity FROM CartItem WHERE expires_at < NOW()"
+        params = ()
+        if item_id is not None:
+            sql += " AND item_id = %s"
+            params = (item_id,)
+        cursor.execute(sql + " ORDER BY expires_at LIMIT %s FOR UPDATE", params + (batch,))
+        rows = cursor.fetchall()
+        if not rows:
+            conn.rollback()
+            return []
+        restock = defaultdict(int)
+        for _, reserved_item, quantity in rows:
+            restock[reserved_item] += quantity
+        item_ids = sorted(restock)
+        cursor.execute(
+            "UPDATE ShopItem SET stock_quantity = stock_quantity + CASE item_id "
+            + " ".join(["WHEN %s THEN %s"] * len(item_ids))
+            + f" END WHERE item_id IN ({', '.join(['%s'] * len(item_ids))})",
+            tuple(v for i in item_ids for v in (i, restock[i])) + tuple(item_ids)
+        )
+        cursor.execute(
+            f"DELETE FROM CartItem WHERE (user_id, item_id) IN ({', '.join(['(%s, %s)'] * len(rows))})",
+            tuple(v for row in rows for v in row[:2])
+        )
+        conn.commit()
+        return item_ids
+    except Error:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+def maybe_sweep_reservations(conn):
+    """Run one sweeper batch at most once per CART_SWEEP_INTERVAL per process"""
+    now = time.monotonic()
+    with _cart_sweep_lock:
+        if now < _cart_sweep['next']:
+            return
+        _cart_sweep['next'] = now + CART_SWEEP_INTERVAL
+    restocked = sweep_expired_reservations(conn)
+    if restocked:
+        shop_search_index.refresh(conn, restocked)
+
+def reserve_cart_item(conn, user_id, item_id, quantity, add=False):
+    """Set (or with add=True, increase) the user's reservation of item_id to `quantity` units,
+    0 removing the line, and push the whole cart's expiry CART_RESERVATION_TTL seconds out.
+
+    Locks the user's cart rows, then the item row, the same order as checkout and the sweeper.
+    The stock moves with one conditional UPDATE. Returns False if there is not enough
+    unreserved stock.
+    """
+    cursor = conn.cursor()
+    try:
+        conn.start_transaction()
+        cursor.execute("SELECT item_id, quantity FROM CartItem WHERE user_id = %s ORDER BY item_id FOR UPDATE",
+                       (user_id,))
+        current = dict(cursor.fetchall()).get(item_id, 0)
+        if add:
+            quantity += current
+        delta = quantity - current
+        if delta:
+            cursor.execute(
+                "UPDATE ShopItem SET stock_quantity = stock_quantity - %s WHERE item_id = %s AND stock_quantity >= %s",
+                (delta, item_id, delta)
+            )
+            if not cursor.rowcount:
+                conn.rollback()
+                return False
+        if quantity:
+            cursor.execute(
+                "INSERT INTO CartItem (user_id, item_id, quantity, expires_at) "
+                "VALUES (%s, %s, %s, NOW() + INTERVAL %s SECOND) "
+                "ON DUPLICATE KEY UPDATE quantity = VALUES(quantity)",
+                (user_id, item_id, quantity, CART_RESERVATION_TTL)
+            )
+        elif current:
+            cursor.execute("DELETE FROM CartItem WHERE user_id = %s AND item_id = %s", (user_id, item_id))
+        cursor.execute("UPDATE CartItem SET expires_at = NOW() + INTERVAL %s SECOND WHERE user_id = %s",
+                       (CART_RESERVATION_TTL, user_id))
+        conn.commit()
+        return True
+    except Error:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+def checkout_cart(conn, user_id, idempotency_key=None):
+    """Turn the user's reservations into orders in one transaction; the caller commits.
+
+    Locks the wallet, then the user's cart rows, then the items, then the revenue shards (see
+    record_orders). The reserved units already left stock when they were reserved, so prices
+    are read without locking and the item rows are locked only for the last statements: the
+    reserved quantities go back into stock, and the ShopOrder triggers take them out again.
+    Lines are honoured until the sweeper has reclaimed them, even past expires_at.
+    Returns (total, lines). Raises Error on failure.
+    """
+    cursor = conn.cursor(dictionary=True)
+    try:
+        conn.start_transaction()
+        wallet = lock_wallet(cursor, user_id)
+        if wallet is None:
+            raise Error(msg="User not found")
+        cursor.execute("SELECT item_id, quantity FROM CartItem WHERE user_id = %s ORDER BY item_id FOR UPDATE",
+                       (user_id,))
+        quantities = {row['item_id']: row['quantity'] for row in cursor.fetchall()}
+        if not quantities:
+            raise Error(msg="Your cart is empty")
+        item_ids = sorted(quantities)
+        placeholders = ', '.join(['%s'] * len(item_ids))
+        cursor.execute(f"SELECT item_id, price, shelter_id FROM ShopItem WHERE item_id IN ({placeholders})",
+                       tuple(item_ids))
+        total, lines = price_order_lines({item['item_id']: item for item in cursor.fetchall()}, quantities)
+        if wallet < total:
+            raise InsufficientFundsError(total, wallet)
+
+        cursor.execute(
+            "UPDATE ShopItem SET stock_quantity = stock_quantity + CASE item_id "
+            + " ".join(["WHEN %s THEN %s"] * len(item_ids))
+            + f" END WHERE item_id IN ({placeholders})",
+            tuple(v for i in item_ids for v in (i, quantities[i])) + tuple(item_ids)
+        )
+        record_orders(cursor, user_id, total, lines, idempotency_key)
+        cursor.execute("DELETE FROM CartItem WHERE user_id = %s", (user_id,))
+        return total, lines
+    finally:
+        cursor.close()
+
+def load_cart(cursor, user_id):
+    """The user's cart as returned by the cart endpoints (`cursor` must be a dictionary cursor)"""
+    cursor.execute("""
+        SELECT c.item_id, si.name, si.price, si.shelter_id, c.quantity, c.expires_at
+        FROM CartItem c JOIN ShopItem si ON si.item_id = c.item_id
+        WHERE c.user_id = %s
+        ORDER BY c.item_id
+    """, (user_id,))
+    items = cursor.fetchall()
+    total = Decimal('0')
+    for item in items:
+        line_total = (item['price'] or Decimal('0')) * item['quantity']
+        total += line_total
+        item['price'] = float(item['price'] or 0)
+        item['line_total'] = float(line_total)
+    return {
+        'items': items,
+        'total': float(total),
+        'expires_at': min((item['expires_at'] for item in items), default=None),
+    }
+
+def _update_cart(item_id, quantity, add=False):
+    """Shared body of the cart write endpoints"""
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 500
+    cursor = conn.cursor(dictionary=True)
+    try:
+        maybe_sweep_reservations(conn)
+        cursor.execute("SELECT item_id FROM ShopItem WHERE item_id = %s", (item_id,))
+        if not cursor.fetchone():
+            conn.rollback()
+            return jsonify({'error': 'Item not found'}), 404
+        conn.rollback()
+        reserved = reserve_cart_item(conn, session['user_id'], item_id, quantity, add)
+        if not reserved and sweep_expired_reservations(conn, item_id):
+            # Expired holds on this item were reclaimed; try again
+            reserved = reserve_cart_item(conn, session['user_id'], item_id, quantity, add)
+        if not reserved:
+            return jsonify({'error': f'Insufficient stock for item {item_id}'}), 400
+        shop_search_index.refresh(conn, [item_id])
+        cart = load_cart(cursor, session['user_id'])
+        conn.rollback()
+        return jsonify(cart), 200
+    except Error as e:
+        return jsonify({'error': str(e)}), 400
+    finally:
+        cursor.close()
+        conn.close()
+
+def _cart_quantity(data, minimum):
+    quantity = (data or {}).get('quantity')
+    if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity < minimum:
+        raise ValueError(f'quantity must be an integer >= {minimum}')
+    return quantity
+
+@app.route('/api/cart', methods=['GET'])
+@login_required
+def get_cart():
+    """The user's cart: reserved items, total and when the reservations expire"""
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 500
+    try:
+        cursor = conn.cursor(dictionary=True)
+        return jsonify(load_cart(cursor, session['user_id'])), 200
+    except Error as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+@app.route('/api/cart/items', methods=['POST'])
+@login_required
+def add_cart_item():
+    """Reserve `quantity` more units of `item_id`. Request JSON: { item_id: int, quantity: int }"""
+    data = request.json or {}
+    item_id = data.get('item_id')
+    if not isinstance(item_id, int) or isinstance(item_id, bool):
+        return jsonify({'error': 'item_id must be an integer'}), 400
+    try:
+        quantity = _cart_quantity(data, 1)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return _update_cart(item_id, quantity, add=True)
+
+@app.route('/api/cart/items/<int:item_id>', methods=['PUT'])
+@login_required
+def set_cart_item(item_id):
+    """Change the reserved quantity of a cart line (0 removes it). Request JSON: { quantity: int }"""
     try:
-        normalized = []
-        for it in items:
-            item_id = int(it.get('item_id'))
-            qty = int(it.get('quantity'))
-            if item_id <= 0 or qty <= 0:
-                return jsonify({'error': 'Invalid item_id or quantity'}), 400
-            normalized.append({'item_id': item_id, 'quantity': qty})
-    except Exception:
-        return jsonify({'error': 'Invalid items format'}), 400
+        quantity = _cart_quantity(request.json, 0)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return _update_cart(item_id, quantity)
+
+@app.route('/api/cart/items/<int:item_id>', methods=['DELETE'])
+@login_required
+def remove_cart_item(item_id):
+    """Remove a cart line and release its reservation"""
+    return _update_cart(item_id, 0)
 
+@app.route('/api/cart/checkout', methods=['POST'])
+@login_required
+@idempotent
+def checkout():
+    """Place orders for everything in the cart and charge the wallet (see checkout_cart)"""
     conn = get_db_connection()
     if not conn:
         return jsonify({'error': 'Database connection failed'}), 500
     try:
-        cursor = conn.cursor(dictionary=True)
-        # Start explicit transaction
-        conn.start_transaction()
-
-        # Lock user wallet row
-        cursor.execute("SELECT wallet FROM User WHERE user_id = %s FOR UPDATE", (session['user_id'],))
-        row = cursor.fetchone()
-        if not row:
-            raise Error("User not found")
-        wallet = float(row['wallet'] or 0)
-
-        # Validate items, lock each item, accumulate totals
-        total = 0.0
-        per_shelter = {}  # shelter_id -> revenue sum
-        item_rows = []     # cache item info to avoid requery
-        for it in normalized:
-            cursor.execute(
-                "SELECT item_id, price, shelter_id, stock_quantity FROM ShopItem WHERE item_id = %s FOR UPDATE",
-                (it['item_id'],)
-            )
-            item = cursor.fetchone()
-            if not item:
-                raise Error(f"Item {it['item_id']} not found")
-            stock = int(item['stock_quantity'] or 0)
-            if stock < it['quantity']:
-                raise Error(f"Insufficient stock for item {it['item_id']}")
-            price = float(item['price'] or 0)
-            line_total = price * it['quantity']
-            total += line_total
-            sid = int(item['shelter_id'])
-            per_shelter[sid] = per_shelter.get(sid, 0.0) + line_total
-            item_rows.append({'shelter_id': sid, 'item_id': item['item_id'], 'quantity': it['quantity'], 'line_total': line_total})
-
-        if wallet < total:
-            return jsonify({'error': 'Insufficient funds in wallet', 'required': total, 'balance': wallet}), 400
-
-        # Deduct wallet once
-        cursor.execute("UPDATE User SET wallet = wallet - %s WHERE user_id = %s", (total, session['user_id']))
-
-        # Update shelter revenues per shelter
-        for sid, amount in per_shelter.items():
-            cursor.execute("UPDATE Shelter SET revenue = revenue + %s WHERE shelter_id = %s", (amount, sid))
-
-        # Insert orders (triggers will adjust stock)
-        for it in item_rows:
-            cursor.execute(
-                """
-                INSERT INTO ShopOrder (user_id, shelter_id, item_id, quantity, price, order_date)
-                VALUES (%s, %s, %s, %s, %s, CURDATE())
-                """,
-                (session['user_id'], it['shelter_id'], it['item_id'], it['quantity'], it['line_total'])
-            )
-
+        total, lines = checkout_cart(conn, session['user_id'], g.get('idempotency_key'))
         conn.commit()
-        return jsonify({'message': 'Order placed successfully', 'total_charged': round(total, 2), 'items_count': len(item_rows)}), 201
+        return jsonify({'message': 'Order placed successfully', 'total_charged': round(float(total), 2), 'items_count': len(lines)}), 201
+    except InsufficientFundsError as e:
+        conn.rollback()
+        return jsonify({'error': e.msg, 'required': float(e.required), 'balance': float(e.balance)}), 400
     except Error as e:
         try:
             conn.rollback()
         except Exception:
             pass
+        if e.errno == DUPLICATE_KEY_ERROR and g.get('idempotency_key'):
+            return jsonify({'error': 'This order was already placed with the same Idempotency-Key'}), 409
         return jsonify({'error': str(e)}), 400
     finally:
-        try:
-            cursor.close()
-        except Exception:
-            pass
         conn.close()
 
 # ============= VET ROUTES =============
@@ -829,28 +3016,55 @@ def add_vet_record_route():
 
 # ============= SHELTER ROUTES =============
 
+# Shelter revenue: Shelter.revenue plus the ShelterRevenueShard rows that sales add to
+SHELTER_REVENUE_SQL = "s.revenue + COALESCE(rs.amount, 0)"
+SHELTER_REVENUE_JOIN = ("LEFT JOIN (SELECT shelter_id, SUM(amount) AS amount FROM ShelterRevenueShard "
+                        "GROUP BY shelter_id) rs ON rs.shelter_id = s.shelter_id")
+
+def shelters_plan(shelter_id=None):
+    """Query plan returning every shelter, or just the one with shelter_id"""
+    sql = ("SELECT s.shelter_id, s.name, s.address, s.registration_number, "
+           f"{SHELTER_REVENUE_SQL} AS revenue FROM Shelter s {SHELTER_REVENUE_JOIN}")
+    if shelter_id:
+        return (yield (sql + " WHERE s.shelter_id = %s", (shelter_id,)))
+    return (yield (sql + " ORDER BY s.shelter_id", ()))
+
+def cached_shelters(shelter_id=None):
+    """Shelters (or one shelter) from the reference cache.
+
+    Shelter writes in this process invalidate it; otherwise entries live for CACHE_TTL, so
+    revenue from recent sales and writes made by other processes show up within that time."""
+    def load():
+        conn = get_db_connection()
+        if not conn:
+            raise Error(msg='Database connection failed')
+        cursor = conn.cursor(dictionary=True)
+        try:
+            return run_query_plan(cursor, shelters_plan(shelter_id))
+        finally:
+            cursor.close()
+    return shelter_cache.get_or_load(('shelter_id', shelter_id), load)
+
 @app.route('/api/shelters', methods=['GET'])
 def get_shelters():
-    """Get all shelters"""
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({'error': 'Database connection failed'}), 500
-    
+    """Get all shelters (optionally a single one via ?shelter_id=), served from the reference cache.
+    A cache hit needs no database round trip; the ETag is derived from the body (see body_etag)."""
     try:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM Shelter")
-        shelters = cursor.fetchall()
-        
-        return jsonify(shelters), 200
+        shelters = cached_shelters(request.args.get('shelter_id'))
     except Error as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        cursor.close()
-        conn.close()
+    response = jsonify(shelters)
+    etag = body_etag(response.get_data())
+    if is_not_modified(request.if_none_match, None, etag, None):
+        response = make_response('', 304)
+    response.set_etag(etag, weak=True)
+    response.cache_control.no_cache = True
+    return response
 
 
 @app.route('/api/admin/applications', methods=['GET'])
 @admin_required
+@conditional_get('applications')
 def get_all_applications():
     """Get all adoption and donor applications for admin dashboard"""
     conn = get_db_connection()
@@ -912,6 +3126,7 @@ def create_shelter():
         cursor = conn.cursor()
         cursor.execute("INSERT INTO Shelter (name, address, registration_number) VALUES (%s, %s, %s)", (name, location, registration_number))
         conn.commit()
+        shelter_cache.invalidate()
         return jsonify({'message': 'Shelter created', 'shelter_id': cursor.lastrowid}), 201
     except Error as e:
         return jsonify({'error': str(e)}), 400
@@ -936,6 +3151,7 @@ def update_shelter(shelter_id):
         cursor = conn.cursor()
         cursor.execute("UPDATE Shelter SET name = %s, address = %s, registration_number = %s WHERE shelter_id = %s", (name, location, registration_number, shelter_id))
         conn.commit()
+        shelter_cache.invalidate()
         return jsonify({'message': 'Shelter updated'}), 200
     except Error as e:
         return jsonify({'error': str(e)}), 400
@@ -954,6 +3170,8 @@ def delete_shelter(shelter_id):
         cursor = conn.cursor()
         cursor.execute("DELETE FROM Shelter WHERE shelter_id = %s", (shelter_id,))
         conn.commit()
+        shelter_cache.invalidate()
+        caretaker_cache.invalidate()
         return jsonify({'message': 'Shelter deleted'}), 200
     except Error as e:
         return jsonify({'error': str(e)}), 400
@@ -1001,7 +3219,9 @@ def create_pet():
             (name, species, breed, age, price, shelter_id, health_status, caretaker_id, status)
         )
         conn.commit()
-        return jsonify({'message': 'Pet created', 'pet_id': cursor.lastrowid}), 201
+        pet_id = cursor.lastrowid
+        pet_search_index.refresh(conn, [pet_id])
+        return jsonify({'message': 'Pet created', 'pet_id': pet_id}), 201
     except Error as e:
         return jsonify({'error': str(e)}), 400
     finally:
@@ -1060,6 +3280,7 @@ def update_pet(pet_id):
         cursor = conn.cursor()
         cursor.execute(sql, tuple(values))
         conn.commit()
+        pet_search_index.refresh(conn, [pet_id])
         return jsonify({'message':'Pet updated'}), 200
     except Error as e:
         return jsonify({'error': str(e)}), 400
@@ -1085,6 +3306,7 @@ def delete_pet(pet_id):
         cursor = conn.cursor()
         cursor.execute("DELETE FROM Pet WHERE pet_id = %s", (pet_id,))
         conn.commit()
+        pet_search_index.refresh(conn, [pet_id])
         return jsonify({'message': 'Pet deleted'}), 200
     except Error as e:
         return jsonify({'error': str(e)}), 400
@@ -1093,29 +3315,35 @@ def delete_pet(pet_id):
         conn.close()
 
 
+def cached_caretakers(shelter_id=None):
+    """Caretakers (of one shelter, if given) from the reference cache"""
+    def load():
+        conn = get_db_connection()
+        if not conn:
+            raise Error(msg='Database connection failed')
+        cursor = conn.cursor(dictionary=True)
+        try:
+            if shelter_id:
+                cursor.execute(
+                    "SELECT caretaker_id, name, contact, shelter_id FROM Caretaker WHERE shelter_id = %s ORDER BY name",
+                    (shelter_id,)
+                )
+            else:
+                cursor.execute("SELECT caretaker_id, name, contact, shelter_id FROM Caretaker ORDER BY name")
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+    return caretaker_cache.get_or_load(('shelter_id', shelter_id), load)
+
 @app.route('/api/caretakers', methods=['GET'])
 @admin_required
 def get_caretakers():
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({'error': 'Database connection failed'}), 500
+    """List caretakers (optionally filtered by ?shelter_id=), served from the reference cache"""
     try:
-        cursor = conn.cursor(dictionary=True)
-        shelter_id = request.args.get('shelter_id')
-        if shelter_id:
-            cursor.execute(
-                "SELECT caretaker_id, name, contact, shelter_id FROM Caretaker WHERE shelter_id = %s ORDER BY name",
-                (shelter_id,)
-            )
-        else:
-            cursor.execute("SELECT caretaker_id, name, contact, shelter_id FROM Caretaker ORDER BY name")
-        caretakers = cursor.fetchall()
+        caretakers = cached_caretakers(request.args.get('shelter_id'))
         return jsonify(caretakers), 200
     except Error as e:
         return jsonify({'error': str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @app.route('/api/admin/caretakers', methods=['POST'])
@@ -1134,6 +3362,7 @@ def create_caretaker():
         cursor = conn.cursor()
         cursor.execute("INSERT INTO Caretaker (name, contact, shelter_id) VALUES (%s, %s, %s)", (name, contact, shelter_id))
         conn.commit()
+        caretaker_cache.invalidate()
         return jsonify({'message':'Caretaker created', 'caretaker_id': cursor.lastrowid}), 201
     except Error as e:
         return jsonify({'error': str(e)}), 400
@@ -1155,6 +3384,7 @@ def update_caretaker(caretaker_id):
         cursor = conn.cursor()
         cursor.execute("UPDATE Caretaker SET name = %s, contact = %s, shelter_id = %s WHERE caretaker_id = %s", (name, contact, shelter_id, caretaker_id))
         conn.commit()
+        caretaker_cache.invalidate()
         return jsonify({'message':'Caretaker updated'}), 200
     except Error as e:
         return jsonify({'error': str(e)}), 400
@@ -1172,6 +3402,7 @@ def delete_caretaker(caretaker_id):
         cursor = conn.cursor()
         cursor.execute("DELETE FROM Caretaker WHERE caretaker_id = %s", (caretaker_id,))
         conn.commit()
+        caretaker_cache.invalidate()
         return jsonify({'message':'Caretaker deleted'}), 200
     except Error as e:
         return jsonify({'error': str(e)}), 400
@@ -1249,6 +3480,7 @@ def assign_shelter(pet_id):
         cursor = conn.cursor()
         cursor.execute("UPDATE Pet SET shelter_id = %s WHERE pet_id = %s", (shelter_id, pet_id))
         conn.commit()
+        pet_search_index.refresh(conn, [pet_id])
         return jsonify({'message':'Pet assigned to shelter'}), 200
     except Error as e:
         return jsonify({'error': str(e)}), 400
@@ -1259,10 +3491,263 @@ def assign_shelter(pet_id):
             pass
         cursor.close(); conn.close()
 
+# ============= ADMIN: BULK IMPORT =============
+
+IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE', 500))
+PET_STATUSES = ('Available', 'Adopted')
+
+def _import_rows():
+    """Rows of a bulk import: a JSON array of objects, a CSV upload (multipart field `file`)
+    or a text/csv body. Raises ValueError when the payload is neither."""
+    upload = request.files.get('file')
+    if upload is not None:
+        return list(csv.DictReader(io.TextIOWrapper(upload.stream, encoding='utf-8-sig')))
+    if request.mimetype == 'text/csv':
+        return list(csv.DictReader(io.StringIO(request.get_data(as_text=True))))
+    rows = request.get_json(silent=True)
+    if not isinstance(rows, list) or not all(isinstance(r, dict) for r in rows):
+        raise ValueError('Expected a JSON array of objects or a CSV upload')
+    return rows
+
+def _parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+IMPORT_KIND_NAMES = {int: 'an integer', Decimal: 'a number', _parse_date: 'a YYYY-MM-DD date'}
+
+def _field(row, name, kind=str, required=True, minimum=None, max_length=None):
+    """Read and coerce one import field; CSV blanks count as missing"""
+    value = row.get(name)
+    if isinstance(value, str):
+        value = value.strip()
+    if value is None or value == '':
+        if required:
+            raise ValueError(f'{name} is required')
+        return None
+    try:
+        # JSON true/false would coerce to 1/0 and int(2.7) would truncate to 2
+        if kind in (int, Decimal) and isinstance(value, bool):
+            raise ValueError(value)
+        if kind is int and isinstance(value, float) and not value.is_integer():
+            raise ValueError(value)
+        value = kind(value)
+    except (TypeError, ValueError, ArithmeticError):
+        raise ValueError(f"{name} must be {IMPORT_KIND_NAMES.get(kind, 'text')}")
+    if minimum is not None and value < minimum:
+        raise ValueError(f'{name} must be at least {minimum}')
+    if max_length is not None and len(value) > max_length:
+        raise ValueError(f'{name} must be at most {max_length} characters')
+    return value
+
+def _lookup(cursor, sql, ids):
+    """Run `sql` (ending in `IN ({})`) over ids in chunks; returns {first column: second column or True}"""
+    found = {}
+    ids = list(ids)
+    for start in range(0, len(ids), IMPORT_CHUNK_SIZE):
+        chunk = ids[start:start + IMPORT_CHUNK_SIZE]
+        cursor.execute(sql.format(', '.join(['%s'] * len(chunk))), tuple(chunk))
+        for row in cursor.fetchall():
+            found[row[0]] = row[1] if len(row) > 1 else True
+    return found
+
+def _run_import(conn, insert_sql, rows, errors):
+    """Insert validated (row_number, params) pairs with executemany, one transaction per chunk.
+
+    When a chunk fails (e.g. a trigger rejects a row) it is retried row by row inside the
+    same transaction: InnoDB rolls back only the failing statement, so the good rows of the
+    chunk still commit together and the bad ones are reported in `errors`.
+    Returns the number of rows inserted.
+    """
+    inserted = 0
+    cursor = conn.cursor()
+    try:
+        for start in range(0, len(rows), IMPORT_CHUNK_SIZE):
+            chunk = rows[start:start + IMPORT_CHUNK_SIZE]
+            try:
+                cursor.executemany(insert_sql, [params for _, params in chunk])
+                conn.commit()
+                inserted += len(chunk)
+                continue
+            except Error:
+                conn.rollback()
+            chunk_inserted, chunk_errors = 0, []
+            for number, params in chunk:
+                try:
+                    cursor.execute(insert_sql, params)
+                    chunk_inserted += 1
+                except Error as e:
+                    if e.errno == 1213:
+                        # A deadlock rolls back the whole transaction, not just the statement
+                        conn.rollback()
+                        chunk_inserted = 0
+                        failed = {n for n, _ in chunk_errors}
+                        chunk_errors += [{'row': n, 'error': 'Deadlock, please retry'}
+                                         for n, _ in chunk if n not in failed]
+                        break
+                    chunk_errors.append({'row': number, 'error': getattr(e, 'msg', None) or str(e)})
+            else:
+                conn.commit()
+            inserted += chunk_inserted
+            errors.extend(chunk_errors)
+    finally:
+        cursor.close()
+    errors.sort(key=lambda err: err['row'])
+    return inserted
+
+@app.route('/api/admin/import/pets', methods=['POST'])
+@admin_required
+def import_pets():
+    """Bulk-create pets from a JSON array or CSV (name, species, breed, age, price, shelter_id,
+    health_status, optional caretaker_id and status). Rows are validated in Python first;
+    invalid rows are reported by their 1-based position and the rest are inserted."""
+    try:
+        raw_rows = _import_rows()
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        return jsonify({'error': str(e)}), 400
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 500
+    try:
+        cursor = conn.cursor()
+        errors, parsed = [], []
+        for number, row in enumerate(raw_rows, start=1):
+            try:
+                parsed.append((number, {
+                    'name': _field(row, 'name', max_length=100),
+                    'species': _field(row, 'species', max_length=50),
+                    'breed': _field(row, 'breed', max_length=50),
+                    'age': _field(row, 'age', int, minimum=0),
+                    'price': _field(row, 'price', Decimal, minimum=0),
+                    'shelter_id': _field(row, 'shelter_id', int),
+                    'health_status': _field(row, 'health_status', max_length=100),
+                    'caretaker_id': _field(row, 'caretaker_id', int, required=False),
+                    'status': _field(row, 'status', required=False) or 'Available',
+                }))
+            except (ValueError, ArithmeticError) as e:
+                errors.append({'row': number, 'error': str(e)})
+
+        # Resolve every referenced shelter and caretaker with a few IN queries
+        shelters = _lookup(cursor, "SELECT shelter_id FROM Shelter WHERE shelter_id IN ({})",
+                           {p['shelter_id'] for _, p in parsed})
+        caretakers = _lookup(cursor, "SELECT caretaker_id, shelter_id FROM Caretaker WHERE caretaker_id IN ({})",
+                             {p['caretaker_id'] for _, p in parsed if p['caretaker_id'] is not None})
+        rows = []
+        for number, p in parsed:
+            if p['status'] not in PET_STATUSES:
+                error = 'status must be Available or Adopted'
+            elif p['shelter_id'] not in shelters:
+                error = 'Shelter not found'
+            elif p['caretaker_id'] is not None and p['caretaker_id'] not in caretakers:
+                error = 'Caretaker not found'
+            elif p['caretaker_id'] is not None and caretakers[p['caretaker_id']] != p['shelter_id']:
+                error = 'Caretaker must belong to the same shelter as the pet'
+            else:
+                rows.append((number, (p['name'], p['species'], p['breed'], p['age'], p['price'],
+                                      p['shelter_id'], p['health_status'], p['caretaker_id'], p['status'])))
+                continue
+            errors.append({'row': number, 'error': error})
+
+        inserted = _run_import(
+            conn,
+            "INSERT INTO Pet (name, species, breed, age, price, shelter_id, health_status, caretaker_id, status) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)",
+            rows, errors
+        )
+        if inserted:
+            pet_search_index.invalidate()
+        return jsonify({'inserted': inserted, 'failed': len(errors), 'errors': errors}), 200
+    except Error as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        cursor.close(); conn.close()
+
+@app.route('/api/admin/import/vet-records', methods=['POST'])
+@admin_required
+def import_vet_records():
+    """Bulk-add vet records from a JSON array or CSV (pet_id, optional checkup_date YYYY-MM-DD
+    defaulting to today, remarks, treatment), with the same checks as add_vet_record."""
+    try:
+        raw_rows = _import_rows()
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        return jsonify({'error': str(e)}), 400
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 500
+    try:
+        cursor = conn.cursor()
+        today = datetime.now().date()
+        errors, parsed = [], []
+        for number, row in enumerate(raw_rows, start=1):
+            try:
+                parsed.append((number, (
+                    _field(row, 'pet_id', int),
+                    _field(row, 'checkup_date', _parse_date, required=False) or today,
+                    _field(row, 'remarks', required=False, max_length=255),
+                    _field(row, 'treatment', required=False, max_length=255),
+                )))
+            except ValueError as e:
+                errors.append({'row': number, 'error': str(e)})
+
+        pets = _lookup(cursor, "SELECT pet_id FROM Pet WHERE pet_id IN ({})", {p[0] for _, p in parsed})
+        rows = []
+        for number, params in parsed:
+            if params[0] in pets:
+                rows.append((number, params))
+            else:
+                errors.append({'row': number, 'error': 'Pet not found'})
+
+        inserted = _run_import(
+            conn,
+            "INSERT INTO VetRecord (pet_id, checkup_date, remarks, treatment) VALUES (%s, %s, %s, %s)",
+            rows, errors
+        )
+        return jsonify({'inserted': inserted, 'failed': len(errors), 'errors': errors}), 200
+    except Error as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        cursor.close(); conn.close()
+
 # ============= USER WALLET ROUTES =============
+# Wallets are an append-only ledger (WalletTransaction) plus a snapshot (WalletBalance) that
+# wallet_lock compacts incrementally; see section 14 of routines_and_triggers.sql.
+
+# Pending rows a debit folds into the snapshot while it holds the wallet lock anyway
+# (the procedures pass the same value to wallet_lock)
+WALLET_FOLD_AFTER = 32
+DUPLICATE_KEY_ERROR = 1062
+
+# Balance of user `u`: the snapshot plus the ledger rows after it. A single statement, so it
+# reads a consistent snapshot even while a compaction moves rows into the balance.
+WALLET_BALANCE_SQL = """(
+    SELECT b.balance + COALESCE((SELECT SUM(t.amount) FROM WalletTransaction t
+                                 WHERE t.user_id = b.user_id AND t.txn_id > b.last_txn_id), 0)
+    FROM WalletBalance b WHERE b.user_id = u.user_id
+)"""
+
+def lock_wallet(cursor, user_id, fold_after=None):
+    """Lock the user's wallet for a debit (until commit) and return its balance, or None if
+    the user has no wallet. Must run inside the debit's transaction."""
+    fold_after = WALLET_FOLD_AFTER if fold_after is None else fold_after
+    for _ in cursor.execute("CALL wallet_lock(%s, %s, @wallet_balance)", (user_id, fold_after), multi=True):
+        pass
+    cursor.execute("SELECT CAST(@wallet_balance AS DECIMAL(12,2)) AS balance")
+    row = cursor.fetchone()
+    return row['balance'] if isinstance(row, dict) else row[0]
+
+def post_wallet_transaction(cursor, user_id, amount, kind, reference=None, idempotency_key=None):
+    """Append a ledger row (positive amount credits, negative debits); returns its txn_id.
+    Raises Error 1062 if idempotency_key was already used by this user."""
+    cursor.execute(
+        "INSERT INTO WalletTransaction (user_id, amount, kind, reference, idempotency_key) "
+        "VALUES (%s, %s, %s, %s, %s)",
+        (user_id, amount, kind, reference, idempotency_key)
+    )
+    return cursor.lastrowid
 
 @app.route('/api/wallet/balance', methods=['GET'])
 @login_required
+@conditional_get('wallet', scope=lambda args: session['user_id'])
 def get_wallet_balance():
     """Get user's wallet balance"""
     conn = get_db_connection()
@@ -1271,10 +3756,11 @@ def get_wallet_balance():
     
     try:
         cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT wallet FROM User WHERE user_id = %s", (session['user_id'],))
+        cursor.execute(f"SELECT {WALLET_BALANCE_SQL} AS balance FROM User u WHERE u.user_id = %s",
+                       (session['user_id'],))
         result = cursor.fetchone()
         
-        return jsonify({'balance': float(result['wallet']) if result else 0}), 200
+        return jsonify({'balance': float(result['balance'] or 0) if result else 0}), 200
     except Error as e:
         return jsonify({'error': str(e)}), 500
     finally:
@@ -1283,13 +3769,20 @@ def get_wallet_balance():
 
 @app.route('/api/wallet/add-funds', methods=['POST'])
 @login_required
+@idempotent
 def add_funds():
-    """Add funds to user wallet"""
+    """Add funds to user wallet.
+    An `Idempotency-Key` header makes retries safe (see idempotent()); `idempotency_key` in the
+    body is still accepted and only guards the ledger: a repeated key is acknowledged without
+    crediting the wallet again."""
     data = request.json
     amount = data.get('amount')
     
     if not amount or amount <= 0:
         return jsonify({'error': 'Invalid amount'}), 400
+    idempotency_key = g.get('idempotency_key') or data.get('idempotency_key')
+    if idempotency_key is not None and not (isinstance(idempotency_key, str) and 0 < len(idempotency_key) <= IDEMPOTENCY_KEY_MAX):
+        return jsonify({'error': 'Invalid idempotency key'}), 400
     
     conn = get_db_connection()
     if not conn:
@@ -1297,10 +3790,20 @@ def add_funds():
     
     try:
         cursor = conn.cursor()
-        cursor.execute(
-            "UPDATE User SET wallet = wallet + %s WHERE user_id = %s",
-            (amount, session['user_id'])
-        )
+        # Shared lock: concurrent top-ups proceed together, a compaction waits for them
+        cursor.execute("SELECT user_id FROM WalletBalance WHERE user_id = %s LOCK IN SHARE MODE",
+                       (session['user_id'],))
+        if not cursor.fetchone():
+            conn.rollback()
+            return jsonify({'error': 'Wallet not found'}), 404
+        try:
+            post_wallet_transaction(cursor, session['user_id'], amount, 'topup',
+                                    idempotency_key=f"topup:{idempotency_key}" if idempotency_key else None)
+        except Error as e:
+            conn.rollback()
+            if e.errno == DUPLICATE_KEY_ERROR and idempotency_key:
+                return jsonify({'message': 'Funds added successfully', 'replayed': True}), 200
+            raise
         conn.commit()
         
         return jsonify({'message': 'Funds added successfully'}), 200
@@ -1310,6 +3813,75 @@ def add_funds():
         cursor.close()
         conn.close()
 
+@app.route('/api/wallet/transactions', methods=['GET'])
+@login_required
+@conditional_get('wallet', scope=lambda args: session['user_id'])
+def get_wallet_transactions():
+    """The user's wallet ledger, newest first, keyset-paginated by txn_id"""
+    try:
+        limit, after = get_page_args()
+        after_id = int(after[0]) if after else None
+    except (ValueError, TypeError, IndexError):
+        return jsonify({'error': 'Invalid cursor'}), 400
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 500
+    try:
+        cursor = conn.cursor(dictionary=True)
+        sql = ("SELECT txn_id, amount, kind, reference, created_at FROM WalletTransaction "
+               "WHERE user_id = %s")
+        params = [session['user_id']]
+        if after_id is not None:
+            sql += " AND txn_id < %s"
+            params.append(after_id)
+        sql += " ORDER BY txn_id DESC LIMIT %s"
+        params.append(limit + 1)
+        cursor.execute(sql, tuple(params))
+        transactions, next_cursor = paginate(cursor.fetchall(), limit, lambda r: [r['txn_id']])
+        for row in transactions:
+            row['amount'] = float(row['amount'])
+        return jsonify({'transactions': transactions, 'next_cursor': next_cursor}), 200
+    except Error as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+
+# ============= PAGE BOOTSTRAP =============
+
+@app.route('/api/bootstrap', methods=['GET'])
+def bootstrap():
+    """Everything the page needs on load in one request: the session user (null when logged out),
+    their wallet balance, the shelters and, for admins, the caretakers.
+    Shelters and caretakers come from the same caches as /api/shelters and /api/caretakers."""
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 500
+    cursor = conn.cursor(dictionary=True)
+    try:
+        user = None
+        if 'user_id' in session:
+            user = current_identity()
+            if user is None:
+                session.clear()
+        wallet = None
+        if user and not user['is_admin']:
+            cursor.execute(f"SELECT {WALLET_BALANCE_SQL} AS balance FROM User u WHERE u.user_id = %s",
+                           (user['user_id'],))
+            row = cursor.fetchone()
+            wallet = {'balance': float(row['balance'] or 0) if row else 0}
+        return jsonify({
+            'user': user,
+            'wallet': wallet,
+            'shelters': cached_shelters(),
+            'caretakers': cached_caretakers() if user and user['is_admin'] else None,
+        }), 200
+    except Error as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
 
 # ============= USER MANAGEMENT ROUTES (ADMIN) =============
 
@@ -1343,6 +3915,7 @@ def promote_user(user_id):
         cursor = conn.cursor()
         cursor.execute("UPDATE User SET is_admin = 1 WHERE user_id = %s", (user_id,))
         conn.commit()
+        identity_cache.discard(user_id)
         return jsonify({'message': 'User promoted to admin'}), 200
     except Error as e:
         return jsonify({'error': str(e)}), 400
@@ -1366,6 +3939,7 @@ def demote_user(user_id):
         cursor = conn.cursor()
         cursor.execute("UPDATE User SET is_admin = 0 WHERE user_id = %s", (user_id,))
         conn.commit()
+        identity_cache.discard(user_id)
         return jsonify({'message': 'User demoted from admin'}), 200
     except Error as e:
         return jsonify({'error': str(e)}), 400
@@ -1378,39 +3952,109 @@ def demote_user(user_id):
 @app.route('/api/admin/shelters/revenue', methods=['GET'])
 @admin_required
 def get_shelter_revenue_metrics():
-    """Return revenue and pet counts per shelter for admin dashboard."""
+    """Return revenue and pet/caretaker/item/order counts per shelter for admin dashboard.
+    Counts and revenue add up the ShelterStats and ShelterRevenueShard shards that triggers and
+    sales write."""
     conn = get_db_connection()
     if not conn:
         return jsonify({'error': 'Database connection failed'}), 500
     try:
         cursor = conn.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT s.shelter_id, s.name, s.address, s.registration_number, s.revenue,
-                   (SELECT COUNT(*) FROM Pet p WHERE p.shelter_id = s.shelter_id AND p.status = 'Adopted') AS adopted_count,
-                   (SELECT COUNT(*) FROM Pet p WHERE p.shelter_id = s.shelter_id AND p.status = 'Available') AS available_count
+        cursor.execute(f"""
+            SELECT s.shelter_id, s.name, s.address, s.registration_number,
+                   {SHELTER_REVENUE_SQL} AS revenue,
+                   COALESCE(st.adopted_count, 0) AS adopted_count,
+                   COALESCE(st.available_count, 0) AS available_count,
+                   COALESCE(st.caretaker_count, 0) AS caretaker_count,
+                   COALESCE(st.item_count, 0) AS item_count,
+                   COALESCE(st.order_count, 0) AS order_count
             FROM Shelter s
+            {SHELTER_REVENUE_JOIN}
+            LEFT JOIN (SELECT shelter_id, SUM(adopted_count) AS adopted_count,
+                              SUM(available_count) AS available_count,
+                              SUM(caretaker_count) AS caretaker_count,
+                              SUM(item_count) AS item_count, SUM(order_count) AS order_count
+                       FROM ShelterStats GROUP BY shelter_id) st ON st.shelter_id = s.shelter_id
             ORDER BY s.shelter_id
         """)
         shelters = cursor.fetchall()
-        # Ensure numeric types serialized correctly
+        # Ensure numeric types serialized correctly (SUM() of the shards returns Decimal)
         for row in shelters:
             row['revenue'] = float(row.get('revenue', 0) or 0)
+            for column in ('adopted_count', 'available_count', 'caretaker_count', 'item_count', 'order_count'):
+                row[column] = int(row[column])
         return jsonify({'shelters': shelters}), 200
     except Error as e:
         return jsonify({'error': str(e)}), 500
     finally:
         cursor.close(); conn.close()
 
+@app.route('/api/admin/db/pool', methods=['GET'])
+@admin_required
+def get_db_pool_stats():
+    """Return connection pool usage (in use, idle, waits, timeouts) for sizing the pool."""
+    return jsonify({'pool': db_pool.stats()}), 200
+
+@app.route('/api/admin/metrics', methods=['GET'])
+def get_metrics():
+    """Route and query metrics as JSON, or Prometheus text with ?format=prometheus.
+    Admins use their session; a scraper may send `Authorization: Bearer <METRICS_TOKEN>` instead."""
+    token = request.headers.get('Authorization', '').removeprefix('Bearer ')
+    if not (METRICS_TOKEN and hmac.compare_digest(token, METRICS_TOKEN)):
+        if 'user_id' not in session:
+            return jsonify({'error': 'Login required'}), 401
+        try:
+            identity = current_identity()
+        except Error as e:
+            return jsonify({'error': str(e)}), 500
+        if not (identity and identity['is_admin']):
+            return jsonify({'error': 'Admin privilege required'}), 403
+    if request.args.get('format') == 'prometheus':
+        return Response(metrics.prometheus(), mimetype='text/plain; version=0.0.4')
+    return jsonify(dict(metrics.snapshot(), enabled=METRICS_ENABLED)), 200
+
+@app.route('/api/admin/metrics/reset', methods=['POST'])
+@admin_required
+def reset_metrics():
+    metrics.reset()
+    return jsonify({'message': 'Metrics reset'}), 200
+
+@app.route('/api/admin/slow-queries', methods=['GET'])
+@admin_required
+def get_slow_queries():
+    """Recent statements slower than SLOW_QUERY_MS with their EXPLAIN FORMAT=JSON plans"""
+    return jsonify(dict(slow_queries.snapshot(), enabled=slow_queries.enabled)), 200
+
+@app.route('/api/admin/slow-queries', methods=['DELETE'])
+@admin_required
+def clear_slow_queries():
+    slow_queries.clear()
+    return jsonify({'message': 'Slow query log cleared'}), 200
+
+@app.route('/api/admin/cache', methods=['GET'])
+@admin_required
+def get_cache_stats():
+    """Return hit/miss counters for the shelter, caretaker and identity caches."""
+    return jsonify({'caches': {c.name: c.stats() for c in (shelter_cache, caretaker_cache, identity_cache)}}), 200
+
 @app.route('/api/admin/adoptions/history', methods=['GET'])
 @admin_required
 def get_adoption_history():
-    """Return adoption history (approved applications) with pet & user details."""
+    """Return adoption history (approved applications) with pet & user details, newest first.
+    Keyset-paginated on (date, application_id); applications without a date come last."""
+    try:
+        limit, after = get_page_args()
+        if after:
+            after_date = None if after[0] is None else str(after[0])
+            after_id = int(after[1])
+    except (ValueError, TypeError, IndexError):
+        return jsonify({'error': 'Invalid cursor'}), 400
     conn = get_db_connection()
     if not conn:
         return jsonify({'error': 'Database connection failed'}), 500
     try:
         cursor = conn.cursor(dictionary=True)
-        cursor.execute("""
+        sql = """
             SELECT aa.application_id, aa.date AS adoption_date, u.username, u.user_id,
                    p.pet_id, p.name AS pet_name, p.species, p.breed, p.price, p.shelter_id,
                    s.name AS shelter_name
@@ -1419,12 +4063,25 @@ def get_adoption_history():
             JOIN Pet p ON aa.pet_id = p.pet_id
             LEFT JOIN Shelter s ON p.shelter_id = s.shelter_id
             WHERE aa.status = 'approved'
-            ORDER BY aa.date DESC, aa.application_id DESC
-        """)
-        history = cursor.fetchall()
+        """
+        params = []
+        # Descending order puts applications without a date last
+        if after and after_date is None:
+            sql += " AND aa.date IS NULL AND aa.application_id < %s"
+            params.append(after_id)
+        elif after:
+            sql += " AND (aa.date < %s OR (aa.date = %s AND aa.application_id < %s) OR aa.date IS NULL)"
+            params.extend([after_date, after_date, after_id])
+        sql += " ORDER BY aa.date DESC, aa.application_id DESC LIMIT %s"
+        params.append(limit + 1)
+        cursor.execute(sql, tuple(params))
+        history, next_cursor = paginate(
+            cursor.fetchall(), limit,
+            lambda r: [r['adoption_date'] and r['adoption_date'].isoformat(), r['application_id']]
+        )
         for row in history:
             row['price'] = float(row.get('price', 0) or 0)
-        return jsonify({'adoptions': history}), 200
+        return jsonify({'adoptions': history, 'next_cursor': next_cursor}), 200
     except Error as e:
         return jsonify({'error': str(e)}), 500
     finally:
@@ -1434,29 +4091,413 @@ def get_adoption_history():
 @app.route('/api/admin/pets', methods=['GET'])
 @admin_required
 def admin_list_all_pets():
-    """Return all pets regardless of status for admin management."""
+    """Return all pets regardless of status for admin management, keyset-paginated by pet_id descending."""
+    try:
+        limit, after = get_page_args()
+        after_id = int(after[0]) if after else None
+    except (ValueError, TypeError, IndexError):
+        return jsonify({'error': 'Invalid cursor'}), 400
     conn = get_db_connection()
     if not conn:
         return jsonify({'error': 'Database connection failed'}), 500
     try:
         cursor = conn.cursor(dictionary=True)
-        cursor.execute("""
+        sql = """
             SELECT pet_id, name, species, breed, age, health_status, price, status, shelter_id, caretaker_id
             FROM Pet
-            ORDER BY pet_id DESC
-        """)
-        pets = cursor.fetchall()
+        """
+        params = []
+        if after_id is not None:
+            sql += " WHERE pet_id < %s"
+            params.append(after_id)
+        sql += " ORDER BY pet_id DESC LIMIT %s"
+        params.append(limit + 1)
+        cursor.execute(sql, tuple(params))
+        pets, next_cursor = paginate(cursor.fetchall(), limit, lambda p: [p['pet_id']])
         # normalize numeric
         for p in pets:
             p['price'] = float(p.get('price', 0) or 0)
-        return jsonify(pets), 200
+        return jsonify({'pets': pets, 'next_cursor': next_cursor}), 200
     except Error as e:
         return jsonify({'error': str(e)}), 500
     finally:
         cursor.close(); conn.close()
 
+# ============= ADMIN EXPORTS =============
+
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 1000))
+
+# Each export streams `sql` in ascending `key` order; `key` is [(column, result alias)].
+# Every exported row carries a `cursor` value: pass the last one received as ?after= to resume.
+EXPORTS = {
+    'adoptions': {
+        'sql': """
+            SELECT aa.application_id, aa.date AS adoption_date, u.user_id, u.username,
+                   p.pet_id, p.name AS pet_name, p.species, p.breed, p.price, p.shelter_id,
+                   s.name AS shelter_name
+            FROM AdopterApplication aa
+            JOIN User u ON aa.user_id = u.user_id
+            JOIN Pet p ON aa.pet_id = p.pet_id
+            LEFT JOIN Shelter s ON p.shelter_id = s.shelter_id
+        """,
+        'where': ["aa.status = 'approved'"],
+        'date_column': 'aa.date',
+        'key': [('aa.date', 'adoption_date'), ('aa.application_id', 'application_id')],
+    },
+    'orders': {
+        'sql': """
+            SELECT so.order_id, so.order_date, so.user_id, u.username, so.shelter_id,
+                   s.name AS shelter_name, so.item_id, si.name AS item_name, so.quantity, so.price
+            FROM ShopOrder so
+            JOIN User u ON so.user_id = u.user_id
+            LEFT JOIN ShopItem si ON so.item_id = si.item_id
+            LEFT JOIN Shelter s ON so.shelter_id = s.shelter_id
+        """,
+        'where': [],
+        'date_column': 'so.order_date',
+        'key': [('so.order_id', 'order_id')],
+    },
+    'vet-records': {
+        'sql': """
+            SELECT vr.vet_record_id, vr.checkup_date, vr.pet_id, p.name AS pet_name, p.species,
+                   p.shelter_id, vr.remarks, vr.treatment
+            FROM VetRecord vr
+            LEFT JOIN Pet p ON vr.pet_id = p.pet_id
+        """,
+        'where': [],
+        'date_column': 'vr.checkup_date',
+        'key': [('vr.vet_record_id', 'vet_record_id')],
+    },
+}
+
+def _export_value(value):
+    if isinstance(value, date):   # also datetime
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+def _keyset_after(columns, values):
+    """(WHERE clause, params) for rows strictly after a cursor on `columns` in ascending order.
+
+    Ascending order puts NULLs first, so after a NULL value come the remaining NULLs (ordered
+    by the rest of the key) and then every non-NULL value.
+    """
+    first, value = columns[0], values[0]
+    if len(columns) == 1:
+        return (f"{first} IS NOT NULL", []) if value is None else (f"{first} > %s", [value])
+    rest, rest_params = _keyset_after(columns[1:], values[1:])
+    if value is None:
+        return f"({first} IS NOT NULL OR ({first} IS NULL AND {rest}))", rest_params
+    return f"({first} > %s OR ({first} = %s AND {rest}))", [value, value] + rest_params
+
+@app.route('/api/admin/export/<export_name>', methods=['GET'])
+@admin_required
+def export_table(export_name):
+    """Stream an export as NDJSON (default) or CSV (?format=csv) from an unbuffered cursor.
+
+    Optional ?from=YYYY-MM-DD / ?to=YYYY-MM-DD restrict the date range (inclusive) and
+    ?after=<cursor> resumes after the last row of an interrupted export. Rows are fetched
+    EXPORT_CHUNK_SIZE at a time, so memory stays flat regardless of table size.
+    """
+    spec = EXPORTS.get(export_name)
+    if spec is None:
+        return jsonify({'error': f"Unknown export '{export_name}'", 'exports': sorted(EXPORTS)}), 404
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in ('ndjson', 'csv'):
+        return jsonify({'error': 'format must be ndjson or csv'}), 400
+
+    where = list(spec['where'])
+    params = []
+    try:
+        for arg, op in (('from', '>='), ('to', '<=')):
+            if request.args.get(arg):
+                params.append(datetime.strptime(request.args[arg], '%Y-%m-%d').date())
+                where.append(f"{spec['date_column']} {op} %s")
+    except ValueError:
+        return jsonify({'error': 'Dates must be YYYY-MM-DD'}), 400
+    key_columns = [column for column, _ in spec['key']]
+    if request.args.get('after'):
+        try:
+            after = decode_cursor(request.args['after'])
+            if not isinstance(after, list) or len(after) != len(key_columns):
+                raise ValueError('cursor does not match this export')
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        clause, clause_params = _keyset_after(key_columns, after)
+        where.append(clause)
+        params.extend(clause_params)
+    sql = spec['sql']
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY " + ", ".join(key_columns)
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 500
+    cursor = conn.cursor(buffered=False)
+    try:
+        cursor.execute(sql, tuple(params))
+    except Error as e:
+        cursor.close()
+        return jsonify({'error': str(e)}), 500
+
+    columns = list(cursor.column_names)
+    key_positions = [columns.index(alias) for _, alias in spec['key']]
+
+    def generate():
+        finished = False
+        try:
+            buf = io.StringIO()
+            writer = csv.writer(buf)
+            if fmt == 'csv':
+                writer.writerow(columns + ['cursor'])
+            while True:
+                rows = cursor.fetchmany(EXPORT_CHUNK_SIZE)
+                if not rows:
+                    break
+                for row in rows:
+                    values = [_export_value(v) for v in row]
+                    row_cursor = encode_cursor([values[i] for i in key_positions])
+                    if fmt == 'csv':
+                        writer.writerow(values + [row_cursor])
+                    else:
+                        buf.write(json.dumps(dict(zip(columns, values), cursor=row_cursor)))
+                        buf.write("\n")
+                # One write per chunk; the buffer is reused so only a chunk is held at a time
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+            if buf.tell():
+                yield buf.getvalue()   # CSV header of an empty export
+            finished = True
+        except Error as e:
+            # Headers are already sent; report in-band so clients know to resume
+            print(f"Export {export_name} failed: {e}")
+            if fmt == 'ndjson':
+                yield json.dumps({'error': str(e)}) + "\n"
+        finally:
+            if finished:
+                cursor.close()
+            else:
+                # Aborted download (or a failed fetch): rows are still streaming, and closing the
+                # cursor or rolling back on teardown would read all of them from the server.
+                # Take the connection off the request and have the pool kill and drop it instead.
+                print(f"Export {export_name} ended early")
+                pooled = g.pop('db_conn', None)
+                if pooled is not None:
+                    db_pool.discard(pooled._conn)
+
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    filename = f"{export_name}.{'csv' if fmt == 'csv' else 'ndjson'}"
+    return Response(stream_with_context(generate()), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename="{filename}"',
+        'X-Accel-Buffering': 'no',
+    })
+
+# ============= SCHEMA MIGRATIONS =============
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+# Seconds a DDL statement waits for the table's metadata lock. Queries arriving meanwhile queue
+# behind the waiting ALTER, so keep this short and retry instead of stalling the app.
+MIGRATION_LOCK_WAIT_TIMEOUT = int(os.getenv('MIGRATION_LOCK_WAIT_TIMEOUT', 5))
+MIGRATION_RETRIES = 5
+MIGRATION_LOCK_NAME = 'pet_center_migrations'
+# The statement already took effect (a run interrupted part-way through a migration, or the change
+# was made by hand): table exists, duplicate column, duplicate key name, can't drop missing key/column
+ALREADY_APPLIED_ERRORS = {1050, 1060, 1061, 1091}
+LOCK_WAIT_TIMEOUT_ERROR = 1205
+
+SCHEMA_MIGRATION_DDL = """
+    CREATE TABLE IF NOT EXISTS SchemaMigration (
+        version INT PRIMARY KEY,
+        name VARCHAR(100) NOT NULL,
+        checksum CHAR(64) NOT NULL,
+        applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        duration_ms INT NOT NULL
+    )
+"""
+
+
+def sql_statements(text):
+    """Split a mysql client script into statements, honouring DELIMITER lines"""
+    delimiter, lines = ';', []
+    for line in text.splitlines():
+        stripped = line.strip()
+        if stripped.upper().startswith('DELIMITER '):
+            delimiter = stripped.split(None, 1)[1]
+            continue
+        lines.append(line)
+        # A comment line ending in the delimiter ("-- see below;") does not end the statement
+        if stripped.endswith(delimiter) and not stripped.startswith(('--', '#')):
+            statement = '\n'.join(lines).rstrip()[:-len(delimiter)].strip()
+            lines = []
+            if any(l.strip() and not l.strip().startswith('--') for l in statement.splitlines()):
+                yield statement
+
+
+def load_migrations(directory=MIGRATIONS_DIR):
+    """(version, name, checksum, sql) for every NNNN_name.sql file in migrations/, in version order"""
+    migrations = {}
+    for filename in os.listdir(directory):
+        match = re.fullmatch(r'(\d+)_(\w+)\.sql', filename)
+        if not match:
+            continue
+        version = int(match.group(1))
+        if version in migrations:
+            raise ValueError(f"Duplicate migration version {version}: {filename}")
+        with open(os.path.join(directory, filename), encoding='utf-8') as f:
+            text = f.read()
+        migrations[version] = (version, match.group(2), hashlib.sha256(text.encode('utf-8')).hexdigest(), text)
+    return [migrations[version] for version in sorted(migrations)]
+
+
+def _execute_migration_statement(cursor, statement, log):
+    for attempt in range(MIGRATION_RETRIES):
+        try:
+            cursor.execute(statement)
+            if cursor.with_rows:
+                cursor.fetchall()
+            return
+        except Error as e:
+            if e.errno in ALREADY_APPLIED_ERRORS:
+                log(f"  already applied, skipping: {e.msg}")
+                return
+            if e.errno != LOCK_WAIT_TIMEOUT_ERROR or attempt == MIGRATION_RETRIES - 1:
+                raise
+            log(f"  table busy (metadata lock), retrying in {2 ** attempt}s")
+            time.sleep(2 ** attempt)
+
+
+def run_migrations(conn, dry_run=False, log=print):
+    """Apply pending migrations in version order, recording each one in SchemaMigration.
+
+    Safe to rerun: applied versions are skipped, and a migration interrupted part-way is resumed
+    because statements that already took effect are skipped. A named lock keeps two runs (e.g. two
+    app hosts deploying at once) from racing. Returns the versions applied (or pending, on dry_run)."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT GET_LOCK(%s, 0)", (MIGRATION_LOCK_NAME,))
+        if not cursor.fetchone()[0]:
+            raise RuntimeError('Another migration run is in progress')
+        cursor.execute("SELECT @@SESSION.lock_wait_timeout")
+        previous_timeout = cursor.fetchone()[0]
+        try:
+            cursor.execute(SCHEMA_MIGRATION_DDL)
+            cursor.execute("SELECT version, checksum FROM SchemaMigration")
+            applied = dict(cursor.fetchall())
+            cursor.execute("SET SESSION lock_wait_timeout = %s", (MIGRATION_LOCK_WAIT_TIMEOUT,))
+            done = []
+            for version, name, checksum, text in load_migrations():
+                label = f"{version:04d}_{name}"
+                if version in applied:
+                    if applied[version] != checksum:
+                        log(f"Warning: {label} was edited after it was applied; add a new migration instead")
+                    continue
+                done.append(version)
+                if dry_run:
+                    log(f"Pending {label}")
+                    continue
+                log(f"Applying {label}")
+                started = time.perf_counter()
+                for statement in sql_statements(text):
+                    _execute_migration_statement(cursor, statement, log)
+                cursor.execute(
+                    "INSERT INTO SchemaMigration (version, name, checksum, duration_ms) VALUES (%s, %s, %s, %s)",
+                    (version, name, checksum, int((time.perf_counter() - started) * 1000))
+                )
+                conn.commit()
+            return done
+        finally:
+            cursor.execute("SET SESSION lock_wait_timeout = %s", (previous_timeout,))
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (MIGRATION_LOCK_NAME,))
+            cursor.fetchone()
+    finally:
+        cursor.close()
+
+# ============= CLI COMMANDS =============
+
+@app.cli.command('rebuild-shelter-stats')
+def rebuild_shelter_stats_command():
+    """Recompute the ShelterStats counters from Pet, Caretaker, ShopItem and ShopOrder."""
+    conn = get_db_connection()
+    if not conn:
+        raise SystemExit('Database connection failed')
+    cursor = conn.cursor()
+    try:
+        cursor.callproc('rebuild_shelter_stats')
+        conn.commit()
+        cursor.execute("SELECT COUNT(DISTINCT shelter_id) FROM ShelterStats")
+        print(f"Rebuilt counters for {cursor.fetchone()[0]} shelters")
+    finally:
+        cursor.close()
+
+@app.cli.command('compact-wallets')
+@click.option('--min-pending', default=1, show_default=True, help='Only wallets with at least this many uncompacted rows.')
+@click.option('--rebuild', is_flag=True, help='Recompute every snapshot from the whole ledger and report mismatches.')
+def compact_wallets_command(min_pending, rebuild):
+    """Fold pending wallet ledger rows into the WalletBalance snapshots, one short transaction per user."""
+    conn = get_db_connection()
+    if not conn:
+        raise SystemExit('Database connection failed')
+    cursor = conn.cursor(dictionary=True)
+    try:
+        if rebuild:
+            cursor.execute("SELECT user_id FROM WalletBalance ORDER BY user_id")
+        else:
+            cursor.execute("""
+                SELECT b.user_id FROM WalletBalance b
+                JOIN WalletTransaction t ON t.user_id = b.user_id AND t.txn_id > b.last_txn_id
+                GROUP BY b.user_id HAVING COUNT(*) >= %s ORDER BY b.user_id
+            """, (max(1, min_pending),))
+        user_ids = [row['user_id'] for row in cursor.fetchall()]
+        conn.commit()
+        mismatches = 0
+        for user_id in user_ids:
+            conn.start_transaction()
+            before = lock_wallet(cursor, user_id, fold_after=1)
+            if rebuild:
+                cursor.execute("UPDATE WalletBalance SET balance = 0, last_txn_id = 0 WHERE user_id = %s", (user_id,))
+                after = lock_wallet(cursor, user_id, fold_after=1)
+                if before != after:
+                    mismatches += 1
+                    print(f"User {user_id}: snapshot balance {before}, ledger balance {after}")
+            conn.commit()
+        print(f"{'Rebuilt' if rebuild else 'Compacted'} {len(user_ids)} wallet(s)"
+              + (f", {mismatches} mismatch(es) corrected" if rebuild else ''))
+    finally:
+        cursor.close()
+
+@app.cli.command('sweep-reservations')
+def sweep_reservations_command():
+    """Return the stock of every expired cart reservation, CART_SWEEP_BATCH rows per transaction."""
+    conn = get_db_connection()
+    if not conn:
+        raise SystemExit('Database connection failed')
+    items = set()
+    while True:
+        restocked = sweep_expired_reservations(conn)
+        if not restocked:
+            break
+        items.update(restocked)
+    print(f"Restocked {len(items)} item(s) from expired reservations")
+
+@app.cli.command('migrate')
+@click.option('--dry-run', is_flag=True, help='List pending migrations without applying them.')
+def migrate_command(dry_run):
+    """Apply pending schema migrations from migrations/ in order."""
+    conn = get_db_connection()
+    if not conn:
+        raise SystemExit('Database connection failed')
+    versions = run_migrations(conn, dry_run=dry_run)
+    if not versions:
+        print('Schema is up to date')
+    elif not dry_run:
+        print(f"Applied {len(versions)} migration(s)")
+
 # NOTE: Wallet & revenue adjustments on adoption are handled inside stored procedure
-# approve_adoption in routines_and_triggers.sql (atomic transaction updating User.wallet & Shelter.revenue).
+# approve_adoption in routines_and_triggers.sql (one transaction posting the debit to the wallet
+# ledger through wallet_post & adding to the shelter's revenue shard).
 
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
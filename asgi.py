@@ -0,0 +1,312 @@
+"""
+Pet Adoption & Inventory Management System - ASGI entry point
+
+Serves the read-heavy public browse endpoints natively async and hands every other request
+to the Flask app:
+
+    uvicorn asgi:app --workers 4
+
+GET /api/pets, /api/pets/<id>, /api/pets/details, /api/shop/items and /api/shelters run the
+same query plans as the Flask views (see run_query_plan in app.py) on an aiomysql pool, so
+their SQL, stored procedure calls, JSON bodies and ETag/304 handling are identical; a request
+waiting on MySQL costs a coroutine instead of a thread. Login, the session cookie and all
+write and admin routes go through Flask unchanged.
+"""
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from functools import wraps
+
+import aiomysql
+from asgiref.wsgi import WsgiToAsgi
+from pymysql.err import MySQLError
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+from werkzeug.http import http_date, parse_date, parse_etags, quote_etag
+
+import app as backend
+
+ASYNC_DB_POOL_SIZE = int(os.environ.get('ASYNC_DB_POOL_SIZE', 20))
+
+db_pool = None
+
+
+class DatabaseUnavailable(Exception):
+    """No pooled connection could be borrowed within DB_POOL_TIMEOUT"""
+
+
+@asynccontextmanager
+async def lifespan(_app):
+    global db_pool
+    config = backend.DB_CONFIG
+    # autocommit so every read sees the latest committed rows instead of a snapshot
+    # left open on a pooled connection
+    db_pool = await aiomysql.create_pool(
+        host=config['host'], port=config['port'], user=config['user'],
+        password=config['password'], db=config['database'], charset='utf8mb4',
+        minsize=1, maxsize=ASYNC_DB_POOL_SIZE, autocommit=True,
+        pool_recycle=int(backend.POOL_CONFIG['recycle'])
+    )
+    try:
+        yield
+    finally:
+        db_pool.close()
+        await db_pool.wait_closed()
+
+
+@asynccontextmanager
+async def connection(request):
+    """Borrow one pooled connection per request; the version lookup and the view share it"""
+    conn = getattr(request.state, 'db_conn', None)
+    if conn is not None:
+        yield conn
+        return
+    try:
+        conn = await asyncio.wait_for(db_pool.acquire(), backend.POOL_CONFIG['timeout'])
+    except (asyncio.TimeoutError, MySQLError, OSError) as e:
+        print(f"Database connection error: {e!r}")
+        raise DatabaseUnavailable() from e
+    request.state.db_conn = conn
+    try:
+        yield conn
+    finally:
+        request.state.db_conn = None
+        db_pool.release(conn)
+
+
+async def run_query_plan(cursor, plan, route=None):
+    """Run a query plan from app.py on an aiomysql DictCursor and return its result.
+    Statements are recorded in app.metrics and, when slow, in app.slow_queries."""
+    try:
+        sql, params = next(plan)
+        while True:
+            started = time.perf_counter()
+            try:
+                await cursor.execute(sql, params)
+                rows = list(await cursor.fetchall())
+                if sql.startswith('CALL '):
+                    # Drain the procedure's status result so the connection can be reused
+                    while await cursor.nextset():
+                        pass
+            except MySQLError:
+                if backend.METRICS_ENABLED:
+                    backend.metrics.record_query(backend.sql_fingerprint(sql), time.perf_counter() - started, error=True)
+                raise
+            elapsed = time.perf_counter() - started
+            if backend.METRICS_ENABLED:
+                backend.metrics.record_query(backend.sql_fingerprint(sql), elapsed, len(rows))
+            if backend.slow_queries.enabled and elapsed >= backend.slow_queries.threshold:
+                backend.slow_queries.capture(backend.sql_fingerprint(sql), sql, params, elapsed, route)
+            sql, params = plan.send(rows)
+    except StopIteration as done:
+        return done.value
+
+
+async def query(request, plan):
+    async with connection(request) as conn:
+        async with conn.cursor(aiomysql.DictCursor) as cursor:
+            return await run_query_plan(cursor, plan, f'{request.method} {request.url.path}')
+
+
+def _build_index(index):
+    conn = backend.db_pool.acquire()
+    try:
+        index.ensure_built(conn)
+    finally:
+        backend.db_pool.release(conn)
+
+async def ensure_index(index):
+    """Build or refresh a search index on a worker thread; a no-op while it is fresh"""
+    if not index.is_fresh():
+        await run_in_threadpool(_build_index, index)
+
+def search_generation(index):
+    """Async counterpart of app.search_generation: refreshes the index before reading its generation"""
+    async def extra(args):
+        q = args.get('q')
+        if not (q and backend.is_plain_search(q)):
+            return ''
+        await ensure_index(index)
+        return index.generation
+    return extra
+
+
+def json_response(payload, status_code=200):
+    """Serialize with Flask's JSON provider so both servers return byte-identical bodies"""
+    return Response(backend.app.json.response(payload).get_data(), status_code=status_code,
+                    media_type='application/json')
+
+DB_ERRORS = (DatabaseUnavailable, MySQLError, backend.Error)
+
+def error_response(e):
+    """Map a DB_ERRORS exception to the response the Flask views give"""
+    if isinstance(e, DatabaseUnavailable):
+        return json_response({'error': 'Database connection failed'}, 500)
+    return json_response({'error': str(e)}, 500)
+
+
+def conditional_get(entity, scope=None, extra=None):
+    """Async counterpart of app.conditional_get, sharing its ETag and 304 rules"""
+    def decorator(view):
+        @wraps(view)
+        async def endpoint(request):
+            args = request.query_params
+            try:
+                scope_id = scope(args) if scope else None
+            except (ValueError, TypeError):
+                return await view(request)   # the view reports the bad parameter
+            try:
+                async with connection(request):
+                    try:
+                        version, last_modified = await query(request, backend.entity_version_plan(entity, scope_id))
+                        tag = await extra(args) if extra else ''
+                    except (MySQLError, backend.Error) as e:
+                        print(f"Version lookup failed for {entity}: {e}")
+                        return await view(request)
+                    request.state.entity_version = version
+                    etag = backend.entity_etag(entity, scope_id, version, tag, request.url.query)
+                    headers = {'ETag': quote_etag(etag, weak=True), 'Cache-Control': 'no-cache'}
+                    if last_modified:
+                        headers['Last-Modified'] = http_date(last_modified)
+                    if backend.is_not_modified(parse_etags(request.headers.get('if-none-match')),
+                                               parse_date(request.headers.get('if-modified-since')),
+                                               etag, last_modified):
+                        return Response(status_code=304, headers=headers)
+                    response = await view(request)
+                    if response.status_code == 200:
+                        response.headers.update(headers)
+                    return response
+            except DatabaseUnavailable:
+                return await view(request)
+        return endpoint
+    return decorator
+
+
+# ============= PET ROUTES =============
+
+@conditional_get('pets', scope=backend.shelter_scope, extra=search_generation(backend.pet_search_index))
+async def get_pets(request):
+    try:
+        q, use_index, shelter_id, limit, after = backend.get_listing_args(request.query_params)
+    except ValueError as e:
+        return json_response({'error': str(e)}, 400)
+    try:
+        if use_index:
+            await ensure_index(backend.pet_search_index)
+        page = await query(request, backend.pets_page_plan(q, use_index, shelter_id, limit, after))
+    except DB_ERRORS as e:
+        return error_response(e)
+    return json_response(page)
+
+async def get_pet_details(request):
+    pet_id = request.path_params['pet_id']
+    try:
+        pets = await query(request, backend.pet_details_plan([pet_id]))
+    except DB_ERRORS as e:
+        return error_response(e)
+    if pet_id not in pets:
+        return json_response({'error': 'Pet not found'}, 404)
+    return json_response(pets[pet_id])
+
+async def get_pets_details(request):
+    try:
+        pet_ids, vet_limit = backend.get_details_args(request.query_params)
+    except ValueError as e:
+        return json_response({'error': str(e)}, 400)
+    try:
+        pets = await query(request, backend.pet_details_plan(pet_ids, vet_limit))
+    except DB_ERRORS as e:
+        return error_response(e)
+    return json_response({
+        'pets': [pets[i] for i in pet_ids if i in pets],
+        'missing': [i for i in pet_ids if i not in pets]
+    })
+
+# ============= SHOP ROUTES =============
+
+@conditional_get('shop_items', scope=backend.shelter_scope, extra=search_generation(backend.shop_search_index))
+async def get_shop_items(request):
+    try:
+        q, use_index, shelter_id, limit, after = backend.get_listing_args(request.query_params)
+    except ValueError as e:
+        return json_response({'error': str(e)}, 400)
+    try:
+        if use_index:
+            await ensure_index(backend.shop_search_index)
+        page = await query(request, backend.shop_items_page_plan(q, use_index, shelter_id, limit, after))
+    except DB_ERRORS as e:
+        return error_response(e)
+    return json_response(page)
+
+# ============= SHELTER ROUTES =============
+
+async def get_shelters(request):
+    shelter_id = request.query_params.get('shelter_id')
+    # Same key as app.cached_shelters, so both servers share the in-process reference cache
+    key = ('shelter_id', shelter_id)
+    hit, shelters, generation = backend.shelter_cache.get(key)
+    if not hit:
+        try:
+            shelters = await query(request, backend.shelters_plan(shelter_id))
+        except DB_ERRORS as e:
+            return error_response(e)
+        backend.shelter_cache.put(key, shelters, generation)
+    response = json_response(shelters)
+    etag = backend.body_etag(response.body)
+    headers = {'ETag': quote_etag(etag, weak=True), 'Cache-Control': 'no-cache'}
+    if backend.is_not_modified(parse_etags(request.headers.get('if-none-match')), None, etag, None):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return response
+
+
+def compress(request, response):
+    """Counterpart of app.compress_response: same size threshold, types and encodings"""
+    if (not 200 <= response.status_code < 300 or 'content-encoding' in response.headers
+            or not backend.is_compressible(response.media_type) or len(response.body) < backend.COMPRESS_MIN_SIZE):
+        return response
+    response.headers.append('Vary', 'Accept-Encoding')
+    encoding = backend.choose_encoding(request.headers.get('accept-encoding'))
+    if encoding:
+        response.body = backend.compress_bytes(response.body, encoding)
+        response.headers['content-length'] = str(len(response.body))
+        response.headers['content-encoding'] = encoding
+    return response
+
+
+def get_route(path, endpoint):
+    """GET route recorded in app.metrics like the Flask routes (which record themselves).
+    The label is the rule of the Flask view with the same name (/api/pets/<int:pet_id>), so
+    both servers report one series per endpoint."""
+    label = next(backend.app.url_map.iter_rules(endpoint.__name__)).rule
+
+    @wraps(endpoint)
+    async def timed(request):
+        started = time.perf_counter()
+        response = compress(request, await endpoint(request))
+        if backend.METRICS_ENABLED:
+            backend.metrics.record_request(request.method, label, response.status_code,
+                                           time.perf_counter() - started, len(response.body))
+        return response
+    return Route(path, timed, methods=['GET'])
+
+
+app = Starlette(
+    routes=[
+        get_route('/api/pets', get_pets),
+        get_route('/api/pets/details', get_pets_details),
+        get_route('/api/pets/{pet_id:int}', get_pet_details),
+        get_route('/api/shop/items', get_shop_items),
+        get_route('/api/shelters', get_shelters),
+        Mount('/', app=WsgiToAsgi(backend.app)),
+    ],
+    # Mirrors CORS(app, supports_credentials=True) for the async routes
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'],
+                           allow_headers=['*'], allow_credentials=True)],
+    lifespan=lifespan,
+)
@@ -0,0 +1,201 @@
+"""
+Benchmark: admin adoption approval, Python pre-validation + callproc (previous implementation)
+vs a single CALL (app.approve_application).
+
+Seeds --applications pending applications (each for its own pet with a vet record, from a
+funded bench user) into the database configured in .env, approves them with each strategy
+and reports latency percentiles and the number of statements sent per approval.
+
+Usage:
+    python benchmarks/approve_adoption.py --applications 500
+    python benchmarks/approve_adoption.py --cleanup
+"""
+import argparse
+import time
+
+from common import error_kind, latency_summary, write_json
+
+import mysql.connector
+from mysql.connector import Error
+
+from app import DB_CONFIG, approve_application
+
+BENCH_PREFIX = 'bench-approve-'
+
+
+def legacy_approve(conn, application_id):
+    """The previous route body: five or six validation queries, then callproc + commit"""
+    c = conn.cursor(dictionary=True)
+    try:
+        c.execute("SELECT user_id, pet_id, status FROM AdopterApplication WHERE application_id = %s", (application_id,))
+        app_row = c.fetchone()
+        if not app_row or app_row['status'] != 'pending':
+            raise Error(msg='Application is not pending')
+        pet_id, user_id = app_row['pet_id'], app_row['user_id']
+        c.execute("SELECT status, price, shelter_id FROM Pet WHERE pet_id = %s", (pet_id,))
+        pet_row = c.fetchone()
+        if not pet_row or pet_row['status'] != 'Available':
+            raise Error(msg='Pet is not available for adoption')
+        c.execute("SELECT 1 FROM DonorApplication WHERE pet_id = %s AND user_id = %s AND status = 'approved' LIMIT 1", (pet_id, user_id))
+        if c.fetchone():
+            raise Error(msg='Donors cannot adopt their own donated pet')
+        c.execute("SELECT COUNT(*) AS cnt FROM VetRecord WHERE pet_id = %s", (pet_id,))
+        if c.fetchone()['cnt'] == 0:
+            raise Error(msg='Pet must have at least one veterinary checkup before adoption')
+        if float(pet_row['price'] or 0) > 0:
+            c.execute("SELECT wallet FROM User WHERE user_id = %s", (user_id,))
+            if float(c.fetchone()['wallet'] or 0) < float(pet_row['price']):
+                raise Error(msg='Insufficient funds in user wallet')
+        c2 = conn.cursor()
+        c2.callproc('approve_adoption', [application_id])
+        for result in c2.stored_results():
+            result.fetchall()
+        c2.close()
+        conn.commit()
+    finally:
+        c.close()
+
+
+def single_call_approve(conn, application_id):
+    cursor = conn.cursor()
+    try:
+        approve_application(cursor, application_id)
+    finally:
+        cursor.close()
+
+
+STRATEGIES = {'pre-validate': legacy_approve, 'single-call': single_call_approve}
+
+
+def seed(conn, count):
+    """Create `count` pending applications, each for its own Available pet with a vet record"""
+    cursor = conn.cursor()
+    cursor.execute(
+        "INSERT IGNORE INTO Shelter (name, address, registration_number) VALUES (%s, 'bench', %s)",
+        (BENCH_PREFIX + 'shelter', BENCH_PREFIX + 'shelter')
+    )
+    cursor.execute("SELECT shelter_id FROM Shelter WHERE registration_number = %s", (BENCH_PREFIX + 'shelter',))
+    shelter_id = cursor.fetchone()[0]
+    cursor.execute(
+        "INSERT IGNORE INTO User (username, password_hash, name, wallet) VALUES (%s, 'bench', 'Bench User', 90000000)",
+        (BENCH_PREFIX + 'user',)
+    )
+    created = cursor.rowcount == 1
+    cursor.execute("SELECT user_id FROM User WHERE username = %s", (BENCH_PREFIX + 'user',))
+    user_id = cursor.fetchone()[0]
+    # User.wallet for the pre-validation check. approve_adoption debits the ledger, which a new
+    # user's insert trigger already credited with the opening wallet; top up a user from an
+    # earlier run instead
+    cursor.execute("UPDATE User SET wallet = 90000000 WHERE user_id = %s", (user_id,))
+    if not created:
+        cursor.execute("INSERT INTO WalletTransaction (user_id, amount, kind, reference) "
+                       "VALUES (%s, 90000000, 'adjustment', 'bench')", (user_id,))
+
+    for start in range(0, count, 500):
+        n = min(500, count - start)
+        cursor.executemany(
+            "INSERT INTO Pet (name, species, breed, age, price, shelter_id, health_status, status) "
+            "VALUES (%s, 'Dog', 'Mixed', 2, 10.00, %s, 'Healthy', 'Available')",
+            [(f'{BENCH_PREFIX}pet', shelter_id)] * n
+        )
+        first_pet = cursor.lastrowid
+        cursor.execute(
+            "SELECT pet_id FROM Pet WHERE name = %s AND pet_id >= %s ORDER BY pet_id LIMIT %s",
+            (BENCH_PREFIX + 'pet', first_pet, n)
+        )
+        pet_ids = [row[0] for row in cursor.fetchall()]
+        cursor.executemany(
+            "INSERT INTO VetRecord (pet_id, checkup_date, remarks) VALUES (%s, CURDATE(), 'bench')",
+            [(pet_id,) for pet_id in pet_ids]
+        )
+        cursor.executemany(
+            "INSERT INTO AdopterApplication (user_id, pet_id, status, date) VALUES (%s, %s, 'pending', CURDATE())",
+            [(user_id, pet_id) for pet_id in pet_ids]
+        )
+    cursor.execute(
+        "SELECT application_id FROM AdopterApplication WHERE user_id = %s AND status = 'pending' ORDER BY application_id",
+        (user_id,)
+    )
+    application_ids = [row[0] for row in cursor.fetchall()]
+    conn.commit()
+    cursor.close()
+    return application_ids
+
+
+def cleanup(conn):
+    cursor = conn.cursor()
+    cursor.execute("SELECT user_id FROM User WHERE username = %s", (BENCH_PREFIX + 'user',))
+    row = cursor.fetchone()
+    if row:
+        cursor.execute("DELETE FROM AdopterApplication WHERE user_id = %s", (row[0],))
+        cursor.execute("DELETE FROM WalletTransaction WHERE user_id = %s", (row[0],))
+        cursor.execute("DELETE FROM WalletBalance WHERE user_id = %s", (row[0],))
+    cursor.execute("DELETE vr FROM VetRecord vr JOIN Pet p ON vr.pet_id = p.pet_id WHERE p.name = %s", (BENCH_PREFIX + 'pet',))
+    cursor.execute("DELETE FROM Pet WHERE name = %s", (BENCH_PREFIX + 'pet',))
+    cursor.execute("DELETE FROM User WHERE username = %s", (BENCH_PREFIX + 'user',))
+    cursor.execute("DELETE r FROM ShelterRevenueShard r JOIN Shelter s ON r.shelter_id = s.shelter_id "
+                   "WHERE s.registration_number = %s", (BENCH_PREFIX + 'shelter',))
+    cursor.execute("DELETE FROM Shelter WHERE registration_number = %s", (BENCH_PREFIX + 'shelter',))
+    conn.commit()
+    cursor.close()
+
+
+def statements_sent(conn):
+    cursor = conn.cursor()
+    cursor.execute("SHOW SESSION STATUS LIKE 'Questions'")
+    value = int(cursor.fetchone()[1])
+    cursor.close()
+    return value
+
+
+def run(strategy, conn, application_ids):
+    approve = STRATEGIES[strategy]
+    latencies, errors = [], {'deadlock': 0, 'lock_wait_timeout': 0, 'other': 0}
+    questions_before = statements_sent(conn)
+    started = time.perf_counter()
+    for application_id in application_ids:
+        t0 = time.perf_counter()
+        try:
+            approve(conn, application_id)
+            latencies.append(time.perf_counter() - t0)
+        except Error as e:
+            conn.rollback()
+            errors[error_kind(e)] += 1
+    elapsed = time.perf_counter() - started
+    # Minus the SHOW STATUS statement itself
+    statements = statements_sent(conn) - questions_before - 1
+    return dict(strategy=strategy, errors=errors,
+                statements_per_approval=round(statements / max(len(application_ids), 1), 2),
+                **latency_summary(latencies, elapsed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--applications', type=int, default=500, help='approvals per strategy')
+    parser.add_argument('--strategy', choices=sorted(STRATEGIES), action='append',
+                        help='run only this strategy (repeatable); default runs both')
+    parser.add_argument('--json', help='also write the results to this file')
+    parser.add_argument('--cleanup', action='store_true', help='delete the bench rows and exit')
+    args = parser.parse_args()
+
+    conn = mysql.connector.connect(**DB_CONFIG)
+    try:
+        if args.cleanup:
+            cleanup(conn)
+            print('Bench rows removed')
+            return
+        results = []
+        for strategy in args.strategy or ['pre-validate', 'single-call']:
+            application_ids = seed(conn, args.applications)[-args.applications:]
+            result = run(strategy, conn, application_ids)
+            results.append(result)
+            print(f"{strategy:>12}: p50 {result['p50_ms']} ms  p95 {result['p95_ms']} ms  p99 {result['p99_ms']} ms  "
+                  f"{result['statements_per_approval']} statements/approval  errors {result['errors']}")
+        if args.json:
+            write_json(args.json, 'approve_adoption', args, results)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
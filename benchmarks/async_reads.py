@@ -0,0 +1,136 @@
+"""
+Benchmark: public browse endpoints served by the Flask app (WSGI, one thread per request)
+vs the async server in asgi.py (uvicorn + aiomysql).
+
+Start both servers against the same database, e.g.
+
+    gunicorn -w 4 --threads 32 -b 127.0.0.1:5000 app:app
+    uvicorn asgi:app --workers 4 --port 8000
+
+then drive each one with --clients concurrent keep-alive connections for --duration seconds.
+Every client loops over a mix of GET /api/pets (plain, searched, by shelter), /api/pets/<id>,
+/api/pets/details, /api/shop/items and /api/shelters. Reports requests/sec, p50/p95/p99
+latency and error counts per target.
+
+Usage:
+    python benchmarks/async_reads.py --clients 500 --duration 30
+    python benchmarks/async_reads.py --target async=http://127.0.0.1:8000 --json results.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from urllib.parse import urlsplit
+
+from common import HTTPConnection, latency_summary, write_json
+
+DEFAULT_TARGETS = ['sync=http://127.0.0.1:5000', 'async=http://127.0.0.1:8000']
+SEARCH_TERMS = ['dog', 'cat', 'ret', 'bo', 'food', 'toy']
+
+
+async def discover(host, port):
+    """Fetch pet and shelter ids to build request paths from"""
+    conn = HTTPConnection(host, port)
+    try:
+        _, body = await conn.get('/api/pets?limit=200')
+        pet_ids = [p['pet_id'] for p in json.loads(body)['pets']]
+        _, body = await conn.get('/api/shelters')
+        shelter_ids = [s['shelter_id'] for s in json.loads(body)]
+    finally:
+        await conn.close()
+    if not pet_ids or not shelter_ids:
+        raise SystemExit('The database needs at least one available pet and one shelter')
+    return pet_ids, shelter_ids
+
+
+def request_mix(rng, pet_ids, shelter_ids):
+    """Pick the next path; weights roughly follow the browse page's traffic"""
+    roll = rng.random()
+    if roll < 0.30:
+        return '/api/pets?limit=50'
+    if roll < 0.40:
+        return f'/api/pets?q={rng.choice(SEARCH_TERMS)}'
+    if roll < 0.50:
+        return f'/api/pets?shelter_id={rng.choice(shelter_ids)}'
+    if roll < 0.65:
+        return f'/api/pets/{rng.choice(pet_ids)}'
+    if roll < 0.75:
+        ids = ','.join(str(i) for i in rng.sample(pet_ids, min(10, len(pet_ids))))
+        return f'/api/pets/details?ids={ids}&vet_limit=3'
+    if roll < 0.90:
+        return '/api/shop/items?limit=50'
+    return '/api/shelters'
+
+
+async def run(label, url, args, pet_ids, shelter_ids):
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    latencies, errors = [], {'http': 0, 'connection': 0}
+
+    async def client(seed_value, deadline):
+        rng = random.Random(seed_value)
+        conn = HTTPConnection(host, port)
+        try:
+            while time.perf_counter() < deadline:
+                path = request_mix(rng, pet_ids, shelter_ids)
+                started = time.perf_counter()
+                try:
+                    status, _ = await conn.get(path)
+                except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+                    errors['connection'] += 1
+                    await conn.close()
+                    continue
+                if status == 200:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors['http'] += 1
+        finally:
+            await conn.close()
+
+    if args.warmup:
+        warmup_deadline = time.perf_counter() + args.warmup
+        await asyncio.gather(*(client(-i, warmup_deadline) for i in range(1, args.clients + 1)))
+        latencies.clear()
+        errors.update(http=0, connection=0)
+
+    started = time.perf_counter()
+    deadline = started + args.duration
+    await asyncio.gather(*(client(args.seed + i, deadline) for i in range(args.clients)))
+    elapsed = time.perf_counter() - started
+    return dict(target=label, url=url, errors=errors, **latency_summary(latencies, elapsed))
+
+
+async def main_async(args):
+    targets = [t.partition('=')[::2] for t in args.target or DEFAULT_TARGETS]
+    first = urlsplit(targets[0][1])
+    pet_ids, shelter_ids = await discover(first.hostname, first.port or 80)
+
+    results = []
+    for label, url in targets:
+        result = await run(label, url, args, pet_ids, shelter_ids)
+        results.append(result)
+        print(f"{label:>6}: {result['per_sec']:>8} req/s  "
+              f"p50 {result['p50_ms']} ms  p95 {result['p95_ms']} ms  p99 {result['p99_ms']} ms  "
+              f"errors {result['errors']}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', action='append', metavar='LABEL=URL',
+                        help='server to benchmark (repeatable); default: ' + ' '.join(DEFAULT_TARGETS))
+    parser.add_argument('--clients', type=int, default=500, help='concurrent keep-alive connections')
+    parser.add_argument('--duration', type=float, default=30, help='measured seconds per target')
+    parser.add_argument('--warmup', type=float, default=5, help='unmeasured seconds before each run')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    results = asyncio.run(main_async(args))
+    if args.json:
+        write_json(args.json, 'async_reads', args, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""Shared helpers for the scripts in benchmarks/"""
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, REPO_ROOT)
+
+DEADLOCK, LOCK_WAIT_TIMEOUT = 1213, 1205
+
+
+def error_kind(e):
+    """Bucket a mysql.connector Error for the error counters"""
+    return {DEADLOCK: 'deadlock', LOCK_WAIT_TIMEOUT: 'lock_wait_timeout'}.get(getattr(e, 'errno', None), 'other')
+
+
+def latency_summary(latencies, elapsed):
+    """Throughput and p50/p95/p99 (ms) for a list of per-operation latencies in seconds"""
+    latencies = sorted(latencies)
+
+    def pct(p):
+        if not latencies:
+            return None
+        return round(latencies[min(len(latencies) - 1, len(latencies) * p // 100)] * 1000, 2)
+
+    return {
+        'ok': len(latencies),
+        'per_sec': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'p50_ms': pct(50), 'p95_ms': pct(95), 'p99_ms': pct(99),
+        'elapsed_s': round(elapsed, 2),
+    }
+
+
+def git_commit():
+    """Short hash of the checked-out commit (with -dirty for local changes), or None"""
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=REPO_ROOT,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def write_json(path, benchmark, args, results):
+    """Save results with the commit and time of the run so runs can be compared (see compare.py)"""
+    with open(path, 'w') as f:
+        json.dump({'benchmark': benchmark, 'commit': git_commit(),
+                   'run_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                   'args': vars(args), 'results': results}, f, indent=2, default=str)
+
+
+class HTTPConnection:
+    """Minimal asyncio HTTP/1.1 keep-alive client that keeps the session cookie.
+    Reconnects when the server closes the connection."""
+
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+        self.cookies = {}
+
+    async def request(self, method, path, payload=None):
+        """Send a request (payload is sent as JSON); returns (status, body bytes)"""
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        body = json.dumps(payload).encode() if payload is not None else b''
+        headers = f"{method} {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+        if self.cookies:
+            headers += 'Cookie: ' + '; '.join(f'{k}={v}' for k, v in self.cookies.items()) + '\r\n'
+        if payload is not None:
+            headers += 'Content-Type: application/json\r\n'
+        if body or method != 'GET':
+            headers += f'Content-Length: {len(body)}\r\n'
+        self.writer.write(headers.encode() + b'\r\n' + body)
+        await self.writer.drain()
+
+        status = int((await self.reader.readline()).split()[1])
+        length, chunked, close = 0, False, False
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            name, value = name.strip().lower(), value.strip()
+            if name == 'content-length':
+                length = int(value)
+            elif name == 'transfer-encoding':
+                chunked = 'chunked' in value.lower()
+            elif name == 'connection':
+                close = value.lower() == 'close'
+            elif name == 'set-cookie':
+                cookie_name, _, cookie_value = value.split(';', 1)[0].partition('=')
+                self.cookies[cookie_name.strip()] = cookie_value.strip()
+        if chunked:
+            data = b''
+            while True:
+                size = int((await self.reader.readline()).split(b';')[0], 16)
+                data += (await self.reader.readexactly(size + 2))[:size]
+                if size == 0:
+                    break
+        else:
+            data = await self.reader.readexactly(length)
+        if close:
+            await self.close()
+        return status, data
+
+    async def get(self, path):
+        return await self.request('GET', path)
+
+    async def post(self, path, payload=None):
+        return await self.request('POST', path, {} if payload is None else payload)
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+        self.reader = self.writer = None
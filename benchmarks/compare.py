@@ -0,0 +1,55 @@
+"""
+Compare two JSON result files written by the benchmarks (--json), e.g. from two commits.
+
+Rows are matched by their journey / target / strategy name; for each one the throughput and
+p50/p99 of the baseline and the candidate are printed with the relative change.
+
+Usage:
+    python benchmarks/compare.py baseline.json candidate.json
+"""
+import argparse
+import json
+
+KEY_FIELDS = ('journey', 'target', 'strategy')
+
+
+def row_key(row):
+    return next((row[field] for field in KEY_FIELDS if field in row), None)
+
+
+def change(old, new):
+    if old in (None, 0) or new is None:
+        return '-'
+    return f'{(new - old) / old * 100:+.1f}%'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+    if baseline.get('benchmark') != candidate.get('benchmark'):
+        raise SystemExit(f"Different benchmarks: {baseline.get('benchmark')} vs {candidate.get('benchmark')}")
+
+    print(f"{baseline['benchmark']}: {baseline.get('commit')} ({baseline.get('run_at')}) -> "
+          f"{candidate.get('commit')} ({candidate.get('run_at')})")
+    old_rows = {row_key(r): r for r in baseline['results']}
+    print(f"{'':>13}  {'per_sec':>19} {'':>7}  {'p50_ms':>17} {'':>7}  {'p99_ms':>17} {'':>7}  errors")
+    for new in candidate['results']:
+        key = row_key(new)
+        old = old_rows.get(key, {})
+        cells = []
+        for metric in ('per_sec', 'p50_ms', 'p99_ms'):
+            cells.append(f"{str(old.get(metric, '-')):>9} -> {str(new.get(metric)):<8} {change(old.get(metric), new.get(metric)):>7}")
+        errors = sum((new.get('errors') or {}).values())
+        old_errors = sum((old.get('errors') or {}).values())
+        print(f"{str(key):>13}  " + '  '.join(cells) + f"  {old_errors} -> {errors}")
+
+
+if __name__ == '__main__':
+    main()
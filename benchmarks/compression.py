@@ -0,0 +1,84 @@
+"""
+Benchmark: compressed vs raw transfer size and compression CPU cost on the pet and shop lists.
+
+Fetches each --path from a running server (seed it with seed.py first) once per encoding the
+server offers (identity, gzip, and br when the brotli package is installed) and reports the
+bytes on the wire. Then compresses the raw body in-process --repeat times per gzip level / brotli
+quality and reports the median milliseconds per response, which is the CPU the server spends
+(responses use COMPRESS_LEVEL and brotli quality 4; the static assets use gzip 9 and brotli 11).
+
+Usage:
+    python benchmarks/compression.py --url http://127.0.0.1:5000 --json compression.json
+"""
+import argparse
+import gzip
+import http.client
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from common import write_json
+
+import app
+
+DEFAULT_PATHS = ['/api/pets?limit=200', '/api/shop/items?limit=200', '/api/pets?limit=50', '/api/shop/items?limit=50']
+
+
+def fetch(parts, path, encoding):
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+    try:
+        conn.request('GET', path, headers={'Accept-Encoding': encoding})
+        response = conn.getresponse()
+        body = response.read()
+        if response.status != 200:
+            raise SystemExit(f'GET {path} returned {response.status}: {body[:200]!r}')
+        return body, response.getheader('Content-Encoding')
+    finally:
+        conn.close()
+
+
+def cpu_ms(compress, data, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        compress(data)
+        timings.append(time.perf_counter() - started)
+    return round(statistics.median(timings) * 1000, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--path', action='append', help=f'list URL to measure (default: {DEFAULT_PATHS})')
+    parser.add_argument('--repeat', type=int, default=50, help='compressions timed per setting')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    parts = urlsplit(args.url)
+    settings = [(f'gzip-{level}', lambda d, level=level: gzip.compress(d, compresslevel=level, mtime=0))
+                for level in (1, 6, 9)]
+    if app.brotli:
+        settings += [(f'br-{quality}', lambda d, quality=quality: app.brotli.compress(d, quality=quality))
+                     for quality in (4, 11)]
+    results = []
+    for path in args.path or DEFAULT_PATHS:
+        raw, _ = fetch(parts, path, 'identity')
+        wire = {'identity': len(raw)}
+        for encoding in ('gzip', 'br'):
+            body, served = fetch(parts, path, encoding)
+            if served == encoding:
+                wire[encoding] = len(body)
+        cpu = {name: {'bytes': len(compress(raw)), 'ms': cpu_ms(compress, raw, args.repeat)}
+               for name, compress in settings}
+        results.append({'target': path, 'wire_bytes': wire, 'cpu': cpu})
+
+        print(f"{path}: {len(raw):,} bytes raw; on the wire: "
+              + ', '.join(f'{enc} {size:,} ({size / len(raw):.1%})' for enc, size in wire.items() if enc != 'identity'))
+        for name, row in cpu.items():
+            print(f"    {name:>8}: {row['bytes']:>9,} bytes  {row['ms']:>8} ms")
+    if args.json:
+        write_json(args.json, 'compression', args, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+"""
+Benchmark: the core user journeys against a running server, over HTTP.
+
+Seed a database with seed.py, start the app against it (python app.py, gunicorn or
+uvicorn asgi:app), then run:
+
+    python benchmarks/journeys.py --url http://127.0.0.1:5000 --clients 50 --duration 60 --json run.json
+
+--clients user clients each log in as a different bench user and loop over a weighted mix of
+journeys (--mix to change the weights):
+
+    browse        GET /api/pets or /api/shop/items, first page or by shelter
+    search        GET /api/pets?q= or /api/shop/items?q=
+    pet_details   GET /api/pets/<id>
+    apply         POST /api/adoptions/apply
+    order         POST /api/shop/order
+    batch_order   POST /api/shop/order/batch (--batch-lines lines)
+    wallet_topup  POST /api/wallet/add-funds
+
+--admin-clients admin clients log in as admin and approve the seeded pending applications
+(POST /api/adoptions/<id>/approve) until they run out.
+
+Reports throughput, p50/p95/p99 and client/server/deadlock/lock-wait error counts per journey.
+Use compare.py to compare the saved JSON across commits.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+from common import HTTPConnection, latency_summary, write_json
+
+import mysql.connector
+
+from app import DB_CONFIG
+
+DEFAULT_MIX = 'browse=30,search=10,pet_details=20,apply=5,order=15,batch_order=5,wallet_topup=5'
+SEARCH_TERMS = ['bud', 'luna', 'retriever', 'dog', 'cat', 'mixed', 'food', 'toy', 'collar', 'bed']
+ERROR_KINDS = ('client', 'server', 'deadlock', 'lock_wait_timeout', 'connection')
+
+
+def load_ids(args):
+    """Ids the journeys pick from: bench users, available pets, shelters, items, pending applications"""
+    conn = mysql.connector.connect(**DB_CONFIG)
+    cursor = conn.cursor()
+    result = {}
+    for key, sql in [
+        ('users', "SELECT username FROM User WHERE username LIKE 'bench-user-%%' ORDER BY user_id LIMIT %s"),
+        ('pets', "SELECT pet_id FROM Pet WHERE status = 'Available' ORDER BY RAND(1) LIMIT %s"),
+        ('shelters', "SELECT shelter_id FROM Shelter LIMIT %s"),
+        ('items', "SELECT item_id FROM ShopItem WHERE stock_quantity > 1000 LIMIT %s"),
+        ('applications', "SELECT application_id FROM AdopterApplication WHERE status = 'pending' "
+                         "ORDER BY application_id LIMIT %s"),
+    ]:
+        cursor.execute(sql, (args.max_ids,))
+        result[key] = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+    conn.close()
+    for key in ('users', 'pets', 'shelters', 'items'):
+        if not result[key]:
+            raise SystemExit(f'No {key} found; seed the database with seed.py first')
+    return result
+
+
+def journeys(rng, ids, args):
+    """Request builders per journey: each returns (method, path, payload)"""
+    def browse():
+        if rng.random() < 0.5:
+            path = '/api/pets' if rng.random() < 0.7 else '/api/shop/items'
+            return 'GET', f'{path}?limit=50', None
+        return 'GET', f'/api/pets?shelter_id={rng.choice(ids["shelters"])}&limit=50', None
+
+    def search():
+        path = '/api/pets' if rng.random() < 0.7 else '/api/shop/items'
+        return 'GET', f'{path}?q={rng.choice(SEARCH_TERMS)}&limit=50', None
+
+    def pet_details():
+        return 'GET', f'/api/pets/{rng.choice(ids["pets"])}', None
+
+    def apply():
+        return 'POST', '/api/adoptions/apply', {'pet_id': rng.choice(ids['pets'])}
+
+    def order():
+        return 'POST', '/api/shop/order', {'item_id': rng.choice(ids['items']), 'quantity': rng.randint(1, 3)}
+
+    def batch_order():
+        lines = [{'item_id': rng.choice(ids['items']), 'quantity': rng.randint(1, 3)} for _ in range(args.batch_lines)]
+        return 'POST', '/api/shop/order/batch', {'items': lines}
+
+    def wallet_topup():
+        return 'POST', '/api/wallet/add-funds', {'amount': rng.choice([10, 25, 50, 100])}
+
+    return {f.__name__: f for f in (browse, search, pet_details, apply, order, batch_order, wallet_topup)}
+
+
+def classify(status, body):
+    """Bucket a failed response; deadlocks and lock timeouts come back as 4xx/5xx with the MySQL message"""
+    text = body.decode('utf-8', 'replace')
+    if 'Deadlock found' in text:
+        return 'deadlock'
+    if 'Lock wait timeout' in text:
+        return 'lock_wait_timeout'
+    return 'server' if status >= 500 else 'client'
+
+
+async def run(args, ids):
+    parts = urlsplit(args.url)
+    host, port = parts.hostname, parts.port or 80
+    mix = dict((name, float(weight)) for name, weight in (item.split('=') for item in args.mix.split(',')))
+    stats = {name: {'latencies': [], 'errors': dict.fromkeys(ERROR_KINDS, 0)}
+             for name in list(mix) + ['approve']}
+    pending = deque(ids['applications'])
+    measuring = [False]
+
+    def record(name, started, status=None, body=b'', error=None):
+        if not measuring[0]:
+            return
+        entry = stats[name]
+        if error:
+            entry['errors'][error] += 1
+        elif status < 300:
+            entry['latencies'].append(time.perf_counter() - started)
+        else:
+            entry['errors'][classify(status, body)] += 1
+
+    async def call(conn, name, method, path, payload):
+        started = time.perf_counter()
+        try:
+            status, body = await conn.request(method, path, payload)
+        except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+            await conn.close()
+            record(name, started, error='connection')
+            return
+        record(name, started, status, body)
+
+    async def login(conn, username, password):
+        status, body = await conn.post('/api/login', {'username': username, 'password': password})
+        if status != 200:
+            raise SystemExit(f'Login as {username} failed ({status}): {body[:200]!r}')
+
+    async def user_client(index, deadline):
+        rng = random.Random(args.seed + index)
+        builders = journeys(rng, ids, args)
+        names, weights = list(mix), list(mix.values())
+        conn = HTTPConnection(host, port)
+        try:
+            await login(conn, ids['users'][index % len(ids['users'])], args.user_password)
+            while time.perf_counter() < deadline:
+                name = rng.choices(names, weights)[0]
+                await call(conn, name, *builders[name]())
+        finally:
+            await conn.close()
+
+    async def admin_client(deadline):
+        conn = HTTPConnection(host, port)
+        try:
+            await login(conn, args.admin_user, args.admin_password)
+            while pending and time.perf_counter() < deadline:
+                await call(conn, 'approve', 'POST', f'/api/adoptions/{pending.popleft()}/approve', {})
+        finally:
+            await conn.close()
+
+    async def phase(seconds):
+        deadline = time.perf_counter() + seconds
+        await asyncio.gather(*[user_client(i, deadline) for i in range(args.clients)],
+                             *[admin_client(deadline) for _ in range(args.admin_clients)])
+
+    if args.warmup:
+        await phase(args.warmup)
+    measuring[0] = True
+    started = time.perf_counter()
+    await phase(args.duration)
+    elapsed = time.perf_counter() - started
+
+    results = []
+    for name, entry in stats.items():
+        if name == 'approve' and not args.admin_clients:
+            continue
+        attempts = len(entry['latencies']) + sum(entry['errors'].values())
+        results.append(dict(journey=name, errors=entry['errors'],
+                            error_rate=round(sum(entry['errors'].values()) / attempts, 4) if attempts else None,
+                            **latency_summary(entry['latencies'], elapsed)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--clients', type=int, default=50, help='concurrent logged-in users')
+    parser.add_argument('--admin-clients', type=int, default=2, help='concurrent admins approving applications')
+    parser.add_argument('--duration', type=float, default=60, help='measured seconds')
+    parser.add_argument('--warmup', type=float, default=10, help='unmeasured seconds first')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='journey=weight,... (default: %(default)s)')
+    parser.add_argument('--batch-lines', type=int, default=10, help='lines per batch order')
+    parser.add_argument('--user-password', default='bench')
+    parser.add_argument('--admin-user', default='admin')
+    parser.add_argument('--admin-password', default='admin123')
+    parser.add_argument('--max-ids', type=int, default=20000, help='ids loaded per kind to pick from')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    ids = load_ids(args)
+    results = asyncio.run(run(args, ids))
+    total_ok = sum(r['ok'] for r in results)
+    print(f"{'journey':>13}  {'req/s':>8}  {'p50 ms':>8}  {'p95 ms':>8}  {'p99 ms':>8}  errors")
+    for r in results:
+        errors = ', '.join(f'{k} {v}' for k, v in r['errors'].items() if v) or '-'
+        if r['error_rate']:
+            errors += f" ({r['error_rate']:.1%})"
+        print(f"{r['journey']:>13}  {r['per_sec']:>8}  {r['p50_ms'] or '-':>8}  {r['p95_ms'] or '-':>8}  "
+              f"{r['p99_ms'] or '-':>8}  {errors}")
+    print(f"{'total':>13}  {round(total_ok / args.duration, 1):>8}")
+    if args.json:
+        write_json(args.json, 'journeys', args, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+Benchmark: login throughput at a given password hashing cost.
+
+Without --url, measures the password worker pool in-process: for each --log-n (scrypt N = 2^n,
+with PASSWORD_SCRYPT_R / _P from .env), --clients threads call app.verify_password on a hash
+made at that cost for --duration seconds. Jobs beyond PASSWORD_HASH_WORKERS +
+PASSWORD_HASH_QUEUE are rejected, as a login would be with a 503, and counted as "busy".
+
+With --url, --clients keep-alive connections log in as the seeded bench users (seed.py) against
+a running server for --duration seconds; 503s are counted as "busy". The server's cost is
+whatever its .env sets.
+
+Usage:
+    python benchmarks/login.py --log-n 12 14 16 --clients 32
+    python benchmarks/login.py --url http://127.0.0.1:5000 --clients 200 --json login.json
+"""
+import argparse
+import asyncio
+import threading
+import time
+from urllib.parse import urlsplit
+
+from common import HTTPConnection, latency_summary, write_json
+
+import app
+from app import PasswordHasherBusy, verify_password
+
+
+def run_hasher(args, log_n):
+    stored = app._hash_password(args.password, log_n=log_n)
+    latencies, counts = [], {'busy': 0, 'wrong': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+
+    def client():
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                matches, _ = verify_password(args.password, stored)
+            except PasswordHasherBusy:
+                with lock:
+                    counts['busy'] += 1
+                time.sleep(0.001)
+                continue
+            with lock:
+                if matches:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    counts['wrong'] += 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(args.clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return dict(target=f'log_n={log_n}', errors=counts,
+                **latency_summary(latencies, time.perf_counter() - started))
+
+
+async def run_http(args):
+    import mysql.connector
+    from app import DB_CONFIG
+
+    conn = mysql.connector.connect(**DB_CONFIG)
+    cursor = conn.cursor()
+    cursor.execute("SELECT username FROM User WHERE username LIKE 'bench-user-%' ORDER BY user_id LIMIT %s",
+                   (args.clients,))
+    users = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+    conn.close()
+    if not users:
+        raise SystemExit('No bench users found; seed the database with seed.py first')
+
+    parts = urlsplit(args.url)
+    latencies, counts = [], {'busy': 0, 'failed': 0, 'connection': 0}
+    deadline = time.perf_counter() + args.duration
+
+    async def client(index):
+        http = HTTPConnection(parts.hostname, parts.port or 80)
+        try:
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    status, _ = await http.post('/api/login', {'username': users[index % len(users)],
+                                                               'password': args.password})
+                except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+                    await http.close()
+                    counts['connection'] += 1
+                    continue
+                if status == 200:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    counts['busy' if status == 503 else 'failed'] += 1
+        finally:
+            await http.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*[client(i) for i in range(args.clients)])
+    return dict(target=args.url, errors=counts, **latency_summary(latencies, time.perf_counter() - started))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='log in over HTTP against this server instead of hashing in-process')
+    parser.add_argument('--log-n', type=int, nargs='+', default=[app.PASSWORD_SCRYPT_LOG_N],
+                        help='scrypt costs to measure in-process (default: %(default)s)')
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10, help='seconds per cost / run')
+    parser.add_argument('--password', default='bench')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    if args.url:
+        results = [asyncio.run(run_http(args))]
+    else:
+        print(f"{app.PASSWORD_HASH_WORKERS} hash workers, queue {app.PASSWORD_HASH_QUEUE}, {args.clients} clients")
+        results = [run_hasher(args, log_n) for log_n in args.log_n]
+    print(f"{'target':>28}  {'logins/s':>8}  {'p50 ms':>8}  {'p95 ms':>8}  {'p99 ms':>8}  errors")
+    for r in results:
+        errors = ', '.join(f'{k} {v}' for k, v in r['errors'].items() if v) or '-'
+        print(f"{r['target']:>28}  {r['per_sec']:>8}  {r['p50_ms'] or '-':>8}  {r['p95_ms'] or '-':>8}  "
+              f"{r['p99_ms'] or '-':>8}  {errors}")
+    if args.json:
+        write_json(args.json, 'login', args, results)
+
+
+if __name__ == '__main__':
+    main()
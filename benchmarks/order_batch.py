@@ -0,0 +1,214 @@
+"""
+Benchmark: batch shop orders, per-line locking (previous implementation) vs set-based locking
+(app.place_batch_order).
+
+Seeds a few bench shelters, items and well-funded users into the database configured in .env,
+then places carts of --lines lines from --threads concurrent connections with each strategy.
+Carts draw from a small pool of hot items in random order, so the per-line strategy can
+deadlock. Reports orders/sec, p50/p95/p99 latency and deadlock/error counts.
+
+Usage:
+    python benchmarks/order_batch.py --threads 16 --orders 400 --lines 50
+    python benchmarks/order_batch.py --cleanup     # remove the bench rows afterwards
+"""
+import argparse
+import random
+import threading
+import time
+from decimal import Decimal
+
+from common import error_kind, latency_summary, write_json
+
+import mysql.connector
+from mysql.connector import Error
+
+from app import DB_CONFIG, place_batch_order
+
+BENCH_PREFIX = 'bench-order-'
+
+
+def legacy_place_batch_order(conn, user_id, lines):
+    """The per-line implementation place_batch_order replaced: one SELECT ... FOR UPDATE per
+    cart line in request order, one UPDATE per shelter and one INSERT per line."""
+    cursor = conn.cursor(dictionary=True)
+    try:
+        conn.start_transaction()
+        cursor.execute("SELECT wallet FROM User WHERE user_id = %s FOR UPDATE", (user_id,))
+        wallet = float(cursor.fetchone()['wallet'] or 0)
+        total = 0.0
+        per_shelter = {}
+        item_rows = []
+        for item_id, quantity in lines:
+            cursor.execute(
+                "SELECT item_id, price, shelter_id, stock_quantity FROM ShopItem WHERE item_id = %s FOR UPDATE",
+                (item_id,)
+            )
+            item = cursor.fetchone()
+            if int(item['stock_quantity'] or 0) < quantity:
+                raise Error(msg=f"Insufficient stock for item {item_id}")
+            line_total = float(item['price'] or 0) * quantity
+            total += line_total
+            sid = int(item['shelter_id'])
+            per_shelter[sid] = per_shelter.get(sid, 0.0) + line_total
+            item_rows.append((sid, item_id, quantity, line_total))
+        if wallet < total:
+            raise Error(msg='Insufficient funds in wallet')
+        cursor.execute("UPDATE User SET wallet = wallet - %s WHERE user_id = %s", (total, user_id))
+        for sid, amount in per_shelter.items():
+            cursor.execute("UPDATE Shelter SET revenue = revenue + %s WHERE shelter_id = %s", (amount, sid))
+        for sid, item_id, quantity, line_total in item_rows:
+            cursor.execute(
+                "INSERT INTO ShopOrder (user_id, shelter_id, item_id, quantity, price, order_date) "
+                "VALUES (%s, %s, %s, %s, %s, CURDATE())",
+                (user_id, sid, item_id, quantity, line_total)
+            )
+    finally:
+        cursor.close()
+
+
+def set_based_place_batch_order(conn, user_id, lines):
+    quantities = {}
+    for item_id, quantity in lines:
+        quantities[item_id] = quantities.get(item_id, 0) + quantity
+    place_batch_order(conn, user_id, quantities)
+
+
+STRATEGIES = {'per-line': legacy_place_batch_order, 'set-based': set_based_place_batch_order}
+
+
+def seed(conn, shelters, items, users):
+    """Create (or top up) the bench shelters, items and users; returns (item_ids, user_ids)"""
+    cursor = conn.cursor()
+    for i in range(shelters):
+        cursor.execute(
+            "INSERT IGNORE INTO Shelter (name, address, registration_number) VALUES (%s, 'bench', %s)",
+            (f'{BENCH_PREFIX}shelter-{i}', f'{BENCH_PREFIX}{i}')
+        )
+    cursor.execute("SELECT shelter_id FROM Shelter WHERE registration_number LIKE %s", (BENCH_PREFIX + '%',))
+    shelter_ids = [row[0] for row in cursor.fetchall()]
+
+    cursor.execute("SELECT COUNT(*) FROM ShopItem WHERE name LIKE %s", (BENCH_PREFIX + '%',))
+    existing = cursor.fetchone()[0]
+    if existing < items:
+        cursor.executemany(
+            "INSERT INTO ShopItem (shelter_id, name, description, price, stock_quantity) VALUES (%s, %s, 'bench', %s, 0)",
+            [(random.choice(shelter_ids), f'{BENCH_PREFIX}item-{i}', Decimal('1.00'))
+             for i in range(existing, items)]
+        )
+    cursor.execute("UPDATE ShopItem SET stock_quantity = 100000000 WHERE name LIKE %s", (BENCH_PREFIX + '%',))
+    cursor.execute("SELECT item_id FROM ShopItem WHERE name LIKE %s ORDER BY item_id LIMIT %s", (BENCH_PREFIX + '%', items))
+    item_ids = [row[0] for row in cursor.fetchall()]
+
+    cursor.executemany(
+        "INSERT IGNORE INTO User (username, password_hash, name, wallet) VALUES (%s, 'bench', 'Bench User', 0)",
+        [(f'{BENCH_PREFIX}user-{i}',) for i in range(users)]
+    )
+    # User.wallet for the per-line strategy, a ledger credit for place_batch_order
+    cursor.execute("UPDATE User SET wallet = 90000000 WHERE username LIKE %s", (BENCH_PREFIX + '%',))
+    cursor.execute(
+        "INSERT INTO WalletTransaction (user_id, amount, kind, reference) "
+        "SELECT user_id, 90000000, 'adjustment', 'bench' FROM User WHERE username LIKE %s",
+        (BENCH_PREFIX + '%',)
+    )
+    cursor.execute("SELECT user_id FROM User WHERE username LIKE %s LIMIT %s", (BENCH_PREFIX + '%', users))
+    user_ids = [row[0] for row in cursor.fetchall()]
+    conn.commit()
+    cursor.close()
+    return item_ids, user_ids
+
+
+def cleanup(conn):
+    cursor = conn.cursor()
+    like = BENCH_PREFIX + '%'
+    cursor.execute("DELETE so FROM ShopOrder so JOIN User u ON so.user_id = u.user_id WHERE u.username LIKE %s", (like,))
+    cursor.execute("DELETE FROM ShopItem WHERE name LIKE %s", (like,))
+    for table in ('WalletTransaction', 'WalletBalance'):
+        cursor.execute(f"DELETE w FROM {table} w JOIN User u ON w.user_id = u.user_id WHERE u.username LIKE %s", (like,))
+    cursor.execute("DELETE FROM User WHERE username LIKE %s", (like,))
+    cursor.execute("DELETE r FROM ShelterRevenueShard r JOIN Shelter s ON r.shelter_id = s.shelter_id "
+                   "WHERE s.registration_number LIKE %s", (like,))
+    cursor.execute("DELETE FROM Shelter WHERE registration_number LIKE %s", (like,))
+    conn.commit()
+    cursor.close()
+
+
+def run(strategy, args, item_ids, user_ids):
+    place = STRATEGIES[strategy]
+    hot_items = item_ids[:args.hot_items]
+    latencies, errors = [], {'deadlock': 0, 'lock_wait_timeout': 0, 'other': 0}
+    remaining = [args.orders]
+    lock = threading.Lock()
+
+    def worker(seed_value):
+        rng = random.Random(seed_value)
+        conn = mysql.connector.connect(**DB_CONFIG)
+        try:
+            while True:
+                with lock:
+                    if remaining[0] <= 0:
+                        return
+                    remaining[0] -= 1
+                lines = [(rng.choice(hot_items), rng.randint(1, 3)) for _ in range(args.lines)]
+                user_id = rng.choice(user_ids)
+                started = time.perf_counter()
+                try:
+                    place(conn, user_id, lines)
+                    conn.commit()
+                    with lock:
+                        latencies.append(time.perf_counter() - started)
+                except Error as e:
+                    conn.rollback()
+                    with lock:
+                        errors[error_kind(e)] += 1
+        finally:
+            conn.close()
+
+    threads = [threading.Thread(target=worker, args=(args.seed + i,)) for i in range(args.threads)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    return dict(strategy=strategy, errors=errors, **latency_summary(latencies, elapsed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--orders', type=int, default=400, help='orders per strategy')
+    parser.add_argument('--lines', type=int, default=50, help='lines per cart')
+    parser.add_argument('--items', type=int, default=500, help='bench items to seed')
+    parser.add_argument('--hot-items', type=int, default=100, help='carts draw from the first N items')
+    parser.add_argument('--shelters', type=int, default=5)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--strategy', choices=sorted(STRATEGIES), action='append',
+                        help='run only this strategy (repeatable); default runs both')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help='also write the results to this file')
+    parser.add_argument('--cleanup', action='store_true', help='delete the bench rows and exit')
+    args = parser.parse_args()
+
+    conn = mysql.connector.connect(**DB_CONFIG)
+    if args.cleanup:
+        cleanup(conn)
+        conn.close()
+        print('Bench rows removed')
+        return
+    item_ids, user_ids = seed(conn, args.shelters, args.items, args.users)
+    conn.close()
+
+    results = []
+    for strategy in args.strategy or ['per-line', 'set-based']:
+        result = run(strategy, args, item_ids, user_ids)
+        results.append(result)
+        print(f"{strategy:>10}: {result['per_sec']:>8} orders/s  "
+              f"p50 {result['p50_ms']} ms  p95 {result['p95_ms']} ms  p99 {result['p99_ms']} ms  "
+              f"errors {result['errors']}")
+    if args.json:
+        write_json(args.json, 'order_batch', args, results)
+
+
+if __name__ == '__main__':
+    main()
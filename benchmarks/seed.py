@@ -0,0 +1,207 @@
+"""
+Seed a benchmark database with configurable volumes.
+
+With --create the database named by DB_NAME in .env is dropped and rebuilt from pet_centre.sql,
+routines_and_triggers.sql and admin_setup.sql (admin / admin123), then brought up to date with
+the migrations in migrations/. Only database names containing "bench" are dropped unless --force
+is given. Then shelters, caretakers, users, pets with vet records, shop items, historical orders
+and pending adoption applications are inserted in --chunk sized multi-row INSERTs, with the triggers enabled so ShelterStats and EntityVersion
+match what the app would have produced. Data is generated from --seed, so two runs with the
+same arguments produce the same database.
+
+Bench users are bench-user-<n> with password "bench" (one scrypt hash at the configured cost,
+shared by all of them) and a large wallet; journeys.py and login.py log in as them.
+
+Usage:
+    python benchmarks/seed.py --create                          # 100k pets, 1M orders, 50k users
+    python benchmarks/seed.py --create --pets 1000 --orders 10000 --users 500   # quick smoke run
+"""
+import argparse
+import os
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from common import REPO_ROOT
+
+import mysql.connector
+
+from app import DB_CONFIG, hash_password, run_migrations, sql_statements
+
+USER_PREFIX = 'bench-user-'
+USER_PASSWORD = 'bench'
+SCHEMA_FILES = ['pet_centre.sql', 'routines_and_triggers.sql', 'admin_setup.sql']
+SPECIES = {
+    'Dog': ['Labrador', 'Beagle', 'Golden Retriever', 'Poodle', 'Boxer', 'Husky', 'Mixed'],
+    'Cat': ['Siamese', 'Persian', 'Maine Coon', 'Bengal', 'Ragdoll', 'Mixed'],
+    'Rabbit': ['Lop', 'Rex', 'Dutch', 'Mixed'],
+    'Bird': ['Parakeet', 'Cockatiel', 'Canary'],
+}
+NAMES = ['Buddy', 'Luna', 'Max', 'Bella', 'Charlie', 'Lucy', 'Milo', 'Daisy', 'Rocky', 'Coco',
+         'Oscar', 'Nala', 'Leo', 'Molly', 'Teddy', 'Rosie', 'Bo', 'Pepper', 'Simba', 'Ziggy']
+ITEMS = ['Dog Food', 'Cat Food', 'Chew Toy', 'Collar', 'Leash', 'Litter', 'Bed', 'Shampoo',
+         'Treats', 'Scratching Post', 'Bowl', 'Carrier', 'Brush', 'Cage', 'Seed Mix']
+
+
+def create_database(args):
+    name = DB_CONFIG['database']
+    if 'bench' not in name.lower() and not args.force:
+        raise SystemExit(f"Refusing to drop database '{name}': use a DB_NAME containing 'bench' or pass --force")
+    server_config = {k: v for k, v in DB_CONFIG.items() if k != 'database'}
+    conn = mysql.connector.connect(**server_config)
+    cursor = conn.cursor()
+    cursor.execute(f"DROP DATABASE IF EXISTS `{name}`")
+    cursor.execute(f"CREATE DATABASE `{name}` CHARACTER SET utf8mb4")
+    cursor.execute(f"USE `{name}`")
+    for filename in SCHEMA_FILES:
+        with open(os.path.join(REPO_ROOT, filename), encoding='utf-8') as f:
+            for statement in sql_statements(f.read()):
+                cursor.execute(statement)
+        print(f"Loaded {filename}")
+    conn.commit()
+    run_migrations(conn)
+    cursor.close()
+    conn.close()
+
+
+def insert_rows(conn, table, columns, rows, chunk):
+    """Insert generated rows chunk by chunk; returns the number inserted"""
+    cursor = conn.cursor()
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+    started, count, batch = time.perf_counter(), 0, []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= chunk:
+            cursor.executemany(sql, batch)
+            conn.commit()
+            count += len(batch)
+            batch = []
+    if batch:
+        cursor.executemany(sql, batch)
+        conn.commit()
+        count += len(batch)
+    cursor.close()
+    elapsed = time.perf_counter() - started
+    print(f"{table:>20}: {count:>9} rows in {elapsed:6.1f}s ({count / elapsed if elapsed else 0:,.0f} rows/s)")
+    return count
+
+
+def ids(conn, sql, params=()):
+    cursor = conn.cursor()
+    cursor.execute(sql, params)
+    result = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+    return result
+
+
+def seed(conn, args):
+    rng = random.Random(args.seed)
+    today = date.today()
+
+    def past_date(days):
+        return today - timedelta(days=rng.randint(0, days))
+
+    insert_rows(conn, 'Shelter', ['name', 'address', 'registration_number'],
+                ((f'Bench Shelter {i}', f'{i} Bench Street', f'BENCH-{i:05d}') for i in range(args.shelters)),
+                args.chunk)
+    shelter_ids = ids(conn, "SELECT shelter_id FROM Shelter ORDER BY shelter_id")
+
+    insert_rows(conn, 'Caretaker', ['name', 'contact', 'shelter_id'],
+                ((f'Caretaker {i}', f'555-{i:06d}', rng.choice(shelter_ids)) for i in range(args.caretakers)),
+                args.chunk)
+    caretakers = {}
+    cursor = conn.cursor()
+    cursor.execute("SELECT caretaker_id, shelter_id FROM Caretaker")
+    for caretaker_id, shelter_id in cursor.fetchall():
+        caretakers.setdefault(shelter_id, []).append(caretaker_id)
+    cursor.close()
+
+    password_hash = hash_password(USER_PASSWORD)
+    insert_rows(conn, 'User', ['username', 'password_hash', 'name', 'contact', 'address', 'wallet'],
+                ((f'{USER_PREFIX}{i}', password_hash, f'Bench User {i}', f'555-{i:07d}', 'Bench', Decimal('1000000.00'))
+                 for i in range(args.users)),
+                args.chunk)
+    user_ids = ids(conn, "SELECT user_id FROM User WHERE username LIKE %s ORDER BY user_id", (USER_PREFIX + '%',))
+
+    def pets():
+        for i in range(args.pets):
+            species = rng.choice(list(SPECIES))
+            shelter_id = rng.choice(shelter_ids)
+            yield (f'{rng.choice(NAMES)} {i}', species, rng.choice(SPECIES[species]), rng.randint(0, 15),
+                   rng.choice(['Healthy', 'Healthy', 'Healthy', 'Recovering', 'Needs medication']),
+                   Decimal(rng.randint(50, 500)), shelter_id,
+                   rng.choice(caretakers.get(shelter_id) or [None]),
+                   'Adopted' if rng.random() < args.adopted_share else 'Available')
+    insert_rows(conn, 'Pet', ['name', 'species', 'breed', 'age', 'health_status', 'price', 'shelter_id',
+                              'caretaker_id', 'status'], pets(), args.chunk)
+    pet_ids = ids(conn, "SELECT pet_id FROM Pet ORDER BY pet_id")
+
+    insert_rows(conn, 'VetRecord', ['pet_id', 'checkup_date', 'remarks', 'treatment'],
+                ((pet_id, past_date(730), 'Routine checkup', rng.choice(['None', 'Vaccination', 'Deworming']))
+                 for pet_id in pet_ids for _ in range(args.vet_records)),
+                args.chunk)
+
+    insert_rows(conn, 'ShopItem', ['shelter_id', 'name', 'description', 'price', 'stock_quantity'],
+                ((rng.choice(shelter_ids), f'{rng.choice(ITEMS)} {i}', f'Bench item {i}',
+                  Decimal(rng.randint(100, 10000)) / 100, args.stock)
+                 for i in range(args.items)),
+                args.chunk)
+    cursor = conn.cursor()
+    cursor.execute("SELECT item_id, shelter_id, price FROM ShopItem")
+    items = cursor.fetchall()
+    cursor.close()
+
+    def orders():
+        for _ in range(args.orders):
+            item_id, shelter_id, price = rng.choice(items)
+            quantity = rng.randint(1, 3)
+            yield rng.choice(user_ids), shelter_id, item_id, quantity, price * quantity, past_date(730)
+    insert_rows(conn, 'ShopOrder', ['user_id', 'shelter_id', 'item_id', 'quantity', 'price', 'order_date'],
+                orders(), args.chunk)
+
+    available = ids(conn, "SELECT pet_id FROM Pet WHERE status = 'Available' ORDER BY pet_id")
+    pairs = set()
+    while available and user_ids and len(pairs) < min(args.applications, len(available) * len(user_ids)):
+        pairs.add((rng.choice(user_ids), rng.choice(available)))
+    insert_rows(conn, 'AdopterApplication', ['user_id', 'pet_id', 'status', 'date'],
+                ((user_id, pet_id, 'pending', past_date(60)) for user_id, pet_id in sorted(pairs)),
+                args.chunk)
+
+    cursor = conn.cursor()
+    cursor.execute("ANALYZE TABLE Shelter, Caretaker, User, Pet, VetRecord, ShopItem, ShopOrder, AdopterApplication")
+    cursor.fetchall()
+    cursor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--create', action='store_true', help='drop and recreate DB_NAME from the schema files first')
+    parser.add_argument('--force', action='store_true', help="allow --create on a database without 'bench' in its name")
+    parser.add_argument('--shelters', type=int, default=50)
+    parser.add_argument('--caretakers', type=int, default=500)
+    parser.add_argument('--users', type=int, default=50000)
+    parser.add_argument('--pets', type=int, default=100000)
+    parser.add_argument('--adopted-share', type=float, default=0.2, help='fraction of pets seeded as Adopted')
+    parser.add_argument('--vet-records', type=int, default=2, help='vet records per pet')
+    parser.add_argument('--items', type=int, default=2000)
+    parser.add_argument('--stock', type=int, default=100000000, help='initial stock per shop item')
+    parser.add_argument('--orders', type=int, default=1000000)
+    parser.add_argument('--applications', type=int, default=20000, help='pending adoption applications')
+    parser.add_argument('--chunk', type=int, default=5000, help='rows per INSERT/commit')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    if args.create:
+        create_database(args)
+    conn = mysql.connector.connect(**DB_CONFIG)
+    if ids(conn, "SELECT user_id FROM User WHERE username LIKE %s LIMIT 1", (USER_PREFIX + '%',)):
+        raise SystemExit('Database already has bench rows; rerun with --create to start over')
+    started = time.perf_counter()
+    seed(conn, args)
+    conn.close()
+    print(f"Seeded {DB_CONFIG['database']} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
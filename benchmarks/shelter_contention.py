@@ -0,0 +1,180 @@
+"""
+Benchmark: concurrent sales for one shelter, to see whether they still queue on shared rows.
+
+Seeds one bench shelter with --items items and --users funded users in the database configured in
+.env. Then --threads connections place single-item orders (CALL place_shop_order) for --duration
+seconds. Each order picks a random item and user, so orders seldom share an item or wallet row.
+The rows they can share are the shelter's counter, version-token and revenue rows, which are
+sharded by connection. Reports orders/sec, p50/p95/p99 latency and deadlock/timeout counts. It
+also reports the InnoDB row lock waits and lock wait time during the run (Innodb_row_lock_waits /
+Innodb_row_lock_time from SHOW GLOBAL STATUS, server-wide, so run it on an otherwise idle
+server), and how many ShelterStats / EntityVersion / ShelterRevenueShard rows the shelter ended
+up with. Run it with --json on the commits before and after a change and compare them with
+compare.py.
+
+Usage:
+    python benchmarks/shelter_contention.py --threads 32 --duration 30 --json contention.json
+    python benchmarks/shelter_contention.py --cleanup     # remove the bench rows afterwards
+"""
+import argparse
+import random
+import threading
+import time
+from decimal import Decimal
+
+from common import error_kind, latency_summary, write_json
+
+import mysql.connector
+from mysql.connector import Error
+
+from app import DB_CONFIG
+
+BENCH_PREFIX = 'bench-contention-'
+
+
+def seed(conn, items, users):
+    """Create (or top up) the bench shelter, its items and users; returns (shelter_id, item_ids, user_ids)"""
+    cursor = conn.cursor()
+    cursor.execute(
+        "INSERT IGNORE INTO Shelter (name, address, registration_number) VALUES (%s, 'bench', %s)",
+        (f'{BENCH_PREFIX}shelter', f'{BENCH_PREFIX}0')
+    )
+    cursor.execute("SELECT shelter_id FROM Shelter WHERE registration_number = %s", (f'{BENCH_PREFIX}0',))
+    shelter_id = cursor.fetchone()[0]
+
+    cursor.execute("SELECT COUNT(*) FROM ShopItem WHERE name LIKE %s", (BENCH_PREFIX + '%',))
+    existing = cursor.fetchone()[0]
+    if existing < items:
+        cursor.executemany(
+            "INSERT INTO ShopItem (shelter_id, name, description, price, stock_quantity) VALUES (%s, %s, 'bench', %s, 0)",
+            [(shelter_id, f'{BENCH_PREFIX}item-{i}', Decimal('1.00')) for i in range(existing, items)]
+        )
+    cursor.execute("UPDATE ShopItem SET stock_quantity = 100000000 WHERE name LIKE %s", (BENCH_PREFIX + '%',))
+    cursor.execute("SELECT item_id FROM ShopItem WHERE name LIKE %s ORDER BY item_id LIMIT %s", (BENCH_PREFIX + '%', items))
+    item_ids = [row[0] for row in cursor.fetchall()]
+
+    cursor.executemany(
+        "INSERT IGNORE INTO User (username, password_hash, name, wallet) VALUES (%s, 'bench', 'Bench User', 0)",
+        [(f'{BENCH_PREFIX}user-{i}',) for i in range(users)]
+    )
+    cursor.execute(
+        "INSERT INTO WalletTransaction (user_id, amount, kind, reference) "
+        "SELECT user_id, 90000000, 'adjustment', 'bench' FROM User WHERE username LIKE %s",
+        (BENCH_PREFIX + '%',)
+    )
+    cursor.execute("SELECT user_id FROM User WHERE username LIKE %s LIMIT %s", (BENCH_PREFIX + '%', users))
+    user_ids = [row[0] for row in cursor.fetchall()]
+    conn.commit()
+    cursor.close()
+    return shelter_id, item_ids, user_ids
+
+
+def cleanup(conn):
+    cursor = conn.cursor()
+    like = BENCH_PREFIX + '%'
+    cursor.execute("DELETE so FROM ShopOrder so JOIN User u ON so.user_id = u.user_id WHERE u.username LIKE %s", (like,))
+    cursor.execute("DELETE FROM ShopItem WHERE name LIKE %s", (like,))
+    for table in ('WalletTransaction', 'WalletBalance'):
+        cursor.execute(f"DELETE w FROM {table} w JOIN User u ON w.user_id = u.user_id WHERE u.username LIKE %s", (like,))
+    cursor.execute("DELETE FROM User WHERE username LIKE %s", (like,))
+    cursor.execute("DELETE r FROM ShelterRevenueShard r JOIN Shelter s ON r.shelter_id = s.shelter_id "
+                   "WHERE s.registration_number LIKE %s", (like,))
+    cursor.execute("DELETE v FROM EntityVersion v JOIN Shelter s ON v.scope_id = s.shelter_id "
+                   "WHERE v.entity IN ('pets', 'shop_items', 'shelters') AND s.registration_number LIKE %s", (like,))
+    cursor.execute("DELETE FROM Shelter WHERE registration_number LIKE %s", (like,))
+    conn.commit()
+    cursor.close()
+
+
+def row_lock_status(conn):
+    cursor = conn.cursor()
+    cursor.execute("SHOW GLOBAL STATUS WHERE Variable_name IN ('Innodb_row_lock_waits', 'Innodb_row_lock_time')")
+    status = {name: int(value) for name, value in cursor.fetchall()}
+    cursor.close()
+    return status
+
+
+def shard_rows(conn, shelter_id):
+    cursor = conn.cursor()
+    counts = {}
+    for table, where in (('ShelterStats', 'shelter_id = %s'),
+                         ('EntityVersion', "entity = 'shop_items' AND scope_id = %s"),
+                         ('ShelterRevenueShard', 'shelter_id = %s')):
+        cursor.execute(f"SELECT COUNT(*) FROM {table} WHERE {where}", (shelter_id,))
+        counts[table] = cursor.fetchone()[0]
+    cursor.close()
+    return counts
+
+
+def run(args, item_ids, user_ids):
+    latencies, errors = [], {'deadlock': 0, 'lock_wait_timeout': 0, 'other': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+
+    def worker(seed_value):
+        rng = random.Random(seed_value)
+        conn = mysql.connector.connect(**DB_CONFIG)
+        cursor = conn.cursor()
+        try:
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    cursor.callproc('place_shop_order', [rng.choice(user_ids), rng.choice(item_ids), 1])
+                    conn.commit()
+                    with lock:
+                        latencies.append(time.perf_counter() - started)
+                except Error as e:
+                    conn.rollback()
+                    with lock:
+                        errors[error_kind(e)] += 1
+        finally:
+            cursor.close()
+            conn.close()
+
+    threads = [threading.Thread(target=worker, args=(args.seed + i,)) for i in range(args.threads)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return dict(target=f'{args.threads} threads', errors=errors,
+                **latency_summary(latencies, time.perf_counter() - started))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=30, help='seconds to place orders for')
+    parser.add_argument('--items', type=int, default=2000, help='bench items in the shelter')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help='also write the results to this file')
+    parser.add_argument('--cleanup', action='store_true', help='delete the bench rows and exit')
+    args = parser.parse_args()
+
+    conn = mysql.connector.connect(**DB_CONFIG)
+    if args.cleanup:
+        cleanup(conn)
+        conn.close()
+        print('Bench rows removed')
+        return
+    shelter_id, item_ids, user_ids = seed(conn, args.items, args.users)
+
+    before = row_lock_status(conn)
+    result = run(args, item_ids, user_ids)
+    after = row_lock_status(conn)
+    result['row_lock_waits'] = after['Innodb_row_lock_waits'] - before['Innodb_row_lock_waits']
+    result['row_lock_time_ms'] = after['Innodb_row_lock_time'] - before['Innodb_row_lock_time']
+    result['shard_rows'] = shard_rows(conn, shelter_id)
+    conn.close()
+
+    print(f"{result['per_sec']:>8} orders/s  p50 {result['p50_ms']} ms  p95 {result['p95_ms']} ms  "
+          f"p99 {result['p99_ms']} ms  errors {result['errors']}")
+    print(f"row lock waits {result['row_lock_waits']} ({result['row_lock_time_ms']} ms waited); "
+          f"rows for the shelter: {result['shard_rows']}")
+    if args.json:
+        write_json(args.json, 'shelter_contention', args, [result])
+
+
+if __name__ == '__main__':
+    main()
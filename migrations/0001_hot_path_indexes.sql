@@ -0,0 +1,21 @@
+-- Indexes for the hot read paths. pet_centre.sql only has primary, unique and foreign key indexes.
+-- InnoDB adds secondary indexes in place while reads and writes continue; ALGORITHM=INPLACE,
+-- LOCK=NONE makes MySQL fail instead of silently falling back to a blocking table copy.
+-- The single-column FK indexes on AdopterApplication.user_id, VetRecord.pet_id and
+-- ShopOrder.user_id become redundant and are dropped by MySQL once these exist.
+
+-- list_available_pets / list_available_pets_page: status = 'Available' [AND shelter_id = ?] ORDER BY pet_id
+ALTER TABLE Pet ADD INDEX idx_pet_status_shelter (status, shelter_id), ALGORITHM=INPLACE, LOCK=NONE;
+
+-- apply_for_adoption: duplicate pending application check for (user, pet)
+ALTER TABLE AdopterApplication ADD INDEX idx_application_user_pet_status (user_id, pet_id, status),
+    ALGORITHM=INPLACE, LOCK=NONE;
+
+-- Adoption history and the admin queue: status = ? ORDER BY date DESC
+ALTER TABLE AdopterApplication ADD INDEX idx_application_status_date (status, date), ALGORITHM=INPLACE, LOCK=NONE;
+
+-- Pet details: vet records for a pet, newest first
+ALTER TABLE VetRecord ADD INDEX idx_vetrecord_pet_date (pet_id, checkup_date), ALGORITHM=INPLACE, LOCK=NONE;
+
+-- get_my_orders: user_id = ? ORDER BY order_date DESC
+ALTER TABLE ShopOrder ADD INDEX idx_shoporder_user_date (user_id, order_date), ALGORITHM=INPLACE, LOCK=NONE;
@@ -0,0 +1,176 @@
+-- Shelter revenue in sharded counter rows instead of the single Shelter.revenue row that every
+-- adoption and order for a shelter used to queue on (see section 13 of routines_and_triggers.sql).
+-- Shelter.revenue keeps the revenue recorded so far; readers add the shards to it.
+
+CREATE TABLE IF NOT EXISTS ShelterRevenueShard (
+    shelter_id INT NOT NULL,
+    shard TINYINT UNSIGNED NOT NULL,
+    amount DECIMAL(12,2) NOT NULL DEFAULT 0.00,
+    version BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+    PRIMARY KEY (shelter_id, shard),
+    FOREIGN KEY (shelter_id) REFERENCES Shelter(shelter_id)
+);
+
+DELIMITER $$
+
+DROP FUNCTION IF EXISTS revenue_shard$$
+DROP PROCEDURE IF EXISTS add_shelter_revenue$$
+DROP PROCEDURE IF EXISTS approve_adoption$$
+DROP PROCEDURE IF EXISTS place_shop_order$$
+
+CREATE FUNCTION revenue_shard() RETURNS TINYINT UNSIGNED
+NOT DETERMINISTIC NO SQL
+RETURN CONNECTION_ID() % 16$$
+
+CREATE PROCEDURE add_shelter_revenue(IN p_shelter_id INT, IN p_amount DECIMAL(10,2))
+BEGIN
+  IF p_shelter_id IS NOT NULL AND p_amount <> 0 THEN
+    INSERT INTO ShelterRevenueShard (shelter_id, shard, amount, version, updated_at)
+      VALUES (p_shelter_id, revenue_shard(), p_amount, 1, CURRENT_TIMESTAMP(6))
+      ON DUPLICATE KEY UPDATE amount = amount + p_amount, version = version + 1,
+                              updated_at = CURRENT_TIMESTAMP(6);
+  END IF;
+END$$
+
+CREATE PROCEDURE approve_adoption(IN p_application_id INT)
+BEGIN
+  DECLARE v_user INT;
+  DECLARE v_pet INT;
+  DECLARE v_app_status VARCHAR(20);
+  DECLARE v_pet_status VARCHAR(20);
+  DECLARE v_price DECIMAL(10,2);
+  DECLARE v_wallet DECIMAL(10,2);
+  DECLARE v_shelter INT;
+  DECLARE v_vet_count INT;
+
+  DECLARE EXIT HANDLER FOR SQLEXCEPTION
+  BEGIN
+    ROLLBACK;
+    RESIGNAL; -- preserve original error message for client
+  END;
+
+  START TRANSACTION;
+
+  SELECT user_id, pet_id, status INTO v_user, v_pet, v_app_status
+    FROM AdopterApplication WHERE application_id = p_application_id FOR UPDATE;
+
+  IF v_app_status IS NULL THEN
+    SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Application not found', MYSQL_ERRNO = 5001;
+  END IF;
+  IF v_app_status <> 'pending' THEN
+    SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Application is not pending', MYSQL_ERRNO = 5002;
+  END IF;
+
+  SELECT status, price, shelter_id INTO v_pet_status, v_price, v_shelter
+    FROM Pet WHERE pet_id = v_pet FOR UPDATE;
+
+  IF v_pet_status IS NULL THEN
+    SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Pet not found', MYSQL_ERRNO = 5003;
+  END IF;
+  IF v_pet_status <> 'Available' THEN
+    SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Pet is not available for adoption', MYSQL_ERRNO = 5004;
+  END IF;
+
+  -- Prevent donor from adopting their own donated pet
+  IF EXISTS (
+      SELECT 1 FROM DonorApplication da
+      WHERE da.pet_id = v_pet AND da.user_id = v_user AND da.status = 'approved'
+  ) THEN
+    SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Donors cannot adopt their own donated pet', MYSQL_ERRNO = 5005;
+  END IF;
+
+  -- Require at least one vet record before approval
+  SELECT COUNT(*) INTO v_vet_count FROM VetRecord WHERE pet_id = v_pet;
+  IF v_vet_count = 0 THEN
+    SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Pet must have at least one veterinary checkup before adoption', MYSQL_ERRNO = 5006;
+  END IF;
+
+  -- check buyer funds if price > 0
+  IF v_price > 0 THEN
+    SELECT wallet INTO v_wallet FROM User WHERE user_id = v_user FOR UPDATE;
+    IF v_wallet IS NULL THEN
+      SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'User not found', MYSQL_ERRNO = 5007;
+    END IF;
+    IF v_wallet < v_price THEN
+      SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Insufficient funds in user wallet', MYSQL_ERRNO = 5008;
+    END IF;
+
+    UPDATE User SET wallet = wallet - v_price WHERE user_id = v_user;
+    CALL add_shelter_revenue(v_shelter, v_price);
+  END IF;
+
+  UPDATE Pet SET status = 'Adopted' WHERE pet_id = v_pet;
+  UPDATE AdopterApplication SET status = 'approved' WHERE application_id = p_application_id;
+  
+  -- Auto-reject all other pending applications for this pet
+  UPDATE AdopterApplication
+    SET status = 'rejected'
+    WHERE pet_id = v_pet AND status = 'pending' AND application_id <> p_application_id;
+
+  COMMIT;
+  SELECT v_pet AS pet_id;
+END$$
+
+CREATE PROCEDURE place_shop_order(
+  IN p_user_id INT,
+  IN p_item_id INT,
+  IN p_quantity INT
+)
+BEGIN
+  DECLARE v_price DECIMAL(10,2);
+  DECLARE v_total DECIMAL(10,2);
+  DECLARE v_wallet DECIMAL(10,2);
+  DECLARE v_shelter_id INT;
+  DECLARE v_stock INT;
+  
+  DECLARE EXIT HANDLER FOR SQLEXCEPTION
+  BEGIN
+    ROLLBACK;
+    SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'place_shop_order: transaction failed';
+  END;
+  
+  START TRANSACTION;
+  
+  -- Validate user
+  SELECT wallet INTO v_wallet FROM User WHERE user_id = p_user_id FOR UPDATE;
+  IF v_wallet IS NULL THEN
+    SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'User not found';
+  END IF;
+  
+  -- Validate item and check stock
+  SELECT price, shelter_id, stock_quantity INTO v_price, v_shelter_id, v_stock
+    FROM ShopItem WHERE item_id = p_item_id FOR UPDATE;
+    
+  IF v_price IS NULL THEN
+    SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Item not found';
+  END IF;
+  
+  IF p_quantity <= 0 THEN
+    SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Quantity must be positive';
+  END IF;
+  
+  IF v_stock < p_quantity THEN
+    SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Insufficient stock';
+  END IF;
+  
+  SET v_total = v_price * p_quantity;
+  
+  IF v_wallet < v_total THEN
+    SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Insufficient funds in wallet';
+  END IF;
+  
+  -- Deduct from user wallet
+  UPDATE User SET wallet = wallet - v_total WHERE user_id = p_user_id;
+  
+  -- Add to shelter revenue
+  CALL add_shelter_revenue(v_shelter_id, v_total);
+  
+  -- Insert order (triggers will handle stock adjustment)
+  INSERT INTO ShopOrder (user_id, shelter_id, item_id, quantity, price, order_date)
+    VALUES (p_user_id, v_shelter_id, p_item_id, p_quantity, v_total, CURDATE());
+  
+  COMMIT;
+END$$
+
+DELIMITER ;
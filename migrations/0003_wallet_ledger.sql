@@ -0,0 +1,233 @@
+-- Wallet ledger: credits and debits are appended to WalletTransaction instead of updating
+-- User.wallet in place, and WalletBalance keeps an incrementally compacted snapshot (see section
+-- 14 of routines_and_triggers.sql). Existing balances become one 'opening' row per user.
+
+CREATE TABLE IF NOT EXISTS WalletTransaction (
+    txn_id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    user_id INT NOT NULL,
+    amount DECIMAL(12,2) NOT NULL,
+    kind ENUM('opening', 'topup', 'order', 'adoption', 'adjustment') NOT NULL,
+    reference VARCHAR(64) DEFAULT NULL,
+    idempotency_key VARCHAR(64) DEFAULT NULL,
+    created_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+    KEY idx_wallettxn_user (user_id, txn_id),
+    UNIQUE KEY uq_wallettxn_idempotency (user_id, idempotency_key),
+    FOREIGN KEY (user_id) REFERENCES User(user_id)
+);
+
+CREATE TABLE IF NOT EXISTS WalletBalance (
+    user_id INT PRIMARY KEY,
+    balance DECIMAL(12,2) NOT NULL DEFAULT 0.00,
+    last_txn_id BIGINT NOT NULL DEFAULT 0,
+    compacted_at TIMESTAMP(6) NULL DEFAULT NULL,
+    FOREIGN KEY (user_id) REFERENCES User(user_id)
+);
+
+INSERT IGNORE INTO WalletTransaction (user_id, amount, kind, idempotency_key)
+    SELECT user_id, wallet, 'opening', 'opening' FROM User WHERE IFNULL(wallet, 0) <> 0;
+
+INSERT IGNORE INTO WalletBalance (user_id, balance, last_txn_id)
+    SELECT u.user_id, COALESCE(SUM(t.amount), 0), COALESCE(MAX(t.txn_id), 0)
+    FROM User u LEFT JOIN WalletTransaction t ON t.user_id = u.user_id
+    GROUP BY u.user_id;
+
+DELIMITER $$
+
+DROP PROCEDURE IF EXISTS wallet_lock$$
+DROP PROCEDURE IF EXISTS wallet_post$$
+DROP TRIGGER IF EXISTS user_after_insert$$
+DROP PROCEDURE IF EXISTS approve_adoption$$
+DROP PROCEDURE IF EXISTS place_shop_order$$
+
+-- Lock the wallet and return its balance in p_balance (NULL if the user has no wallet). Once
+-- p_fold_after or more rows are pending, they are folded into the snapshot while it is locked.
+CREATE PROCEDURE wallet_lock(IN p_user_id INT, IN p_fold_after INT, OUT p_balance DECIMAL(12,2))
+BEGIN
+  DECLARE v_snapshot DECIMAL(12,2);
+  DECLARE v_last BIGINT;
+  DECLARE v_delta DECIMAL(12,2);
+  DECLARE v_pending INT;
+  DECLARE v_max BIGINT;
+
+  SET p_balance = NULL;
+  SELECT balance, last_txn_id INTO v_snapshot, v_last
+    FROM WalletBalance WHERE user_id = p_user_id FOR UPDATE;
+  IF v_last IS NOT NULL THEN
+    -- Locking read: sees rows committed after this transaction's read view was taken
+    SELECT COALESCE(SUM(amount), 0), COUNT(*), MAX(txn_id) INTO v_delta, v_pending, v_max
+      FROM WalletTransaction WHERE user_id = p_user_id AND txn_id > v_last LOCK IN SHARE MODE;
+    SET p_balance = v_snapshot + v_delta;
+    IF v_pending > 0 AND v_pending >= p_fold_after THEN
+      UPDATE WalletBalance SET balance = p_balance, last_txn_id = v_max, compacted_at = CURRENT_TIMESTAMP(6)
+        WHERE user_id = p_user_id;
+    END IF;
+  END IF;
+END$$
+
+-- Append a ledger row: positive p_amount credits, negative debits. Debits must hold wallet_lock;
+-- credits take LOCK IN SHARE MODE on the WalletBalance row first. p_idempotency_key, when given,
+-- is unique per user (duplicate key error 1062 on a replay).
+CREATE PROCEDURE wallet_post(
+  IN p_user_id INT,
+  IN p_amount DECIMAL(12,2),
+  IN p_kind VARCHAR(16),
+  IN p_reference VARCHAR(64),
+  IN p_idempotency_key VARCHAR(64)
+)
+BEGIN
+  INSERT INTO WalletTransaction (user_id, amount, kind, reference, idempotency_key)
+    VALUES (p_user_id, p_amount, p_kind, p_reference, p_idempotency_key);
+END$$
+
+CREATE TRIGGER user_after_insert
+AFTER INSERT ON User
+FOR EACH ROW
+BEGIN
+  INSERT INTO WalletBalance (user_id, balance, last_txn_id) VALUES (NEW.user_id, 0, 0);
+  IF IFNULL(NEW.wallet, 0) <> 0 THEN
+    CALL wallet_post(NEW.user_id, NEW.wallet, 'opening', NULL, 'opening');
+  END IF;
+END$$
+
+CREATE PROCEDURE approve_adoption(IN p_application_id INT)
+BEGIN
+  DECLARE v_user INT;
+  DECLARE v_pet INT;
+  DECLARE v_app_status VARCHAR(20);
+  DECLARE v_pet_status VARCHAR(20);
+  DECLARE v_price DECIMAL(10,2);
+  DECLARE v_wallet DECIMAL(12,2);
+  DECLARE v_shelter INT;
+  DECLARE v_vet_count INT;
+
+  DECLARE EXIT HANDLER FOR SQLEXCEPTION
+  BEGIN
+    ROLLBACK;
+    RESIGNAL; -- preserve original error message for client
+  END;
+
+  START TRANSACTION;
+
+  SELECT user_id, pet_id, status INTO v_user, v_pet, v_app_status
+    FROM AdopterApplication WHERE application_id = p_application_id FOR UPDATE;
+
+  IF v_app_status IS NULL THEN
+    SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Application not found', MYSQL_ERRNO = 5001;
+  END IF;
+  IF v_app_status <> 'pending' THEN
+    SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Application is not pending', MYSQL_ERRNO = 5002;
+  END IF;
+
+  SELECT status, price, shelter_id INTO v_pet_status, v_price, v_shelter
+    FROM Pet WHERE pet_id = v_pet FOR UPDATE;
+
+  IF v_pet_status IS NULL THEN
+    SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Pet not found', MYSQL_ERRNO = 5003;
+  END IF;
+  IF v_pet_status <> 'Available' THEN
+    SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Pet is not available for adoption', MYSQL_ERRNO = 5004;
+  END IF;
+
+  -- Prevent donor from adopting their own donated pet
+  IF EXISTS (
+      SELECT 1 FROM DonorApplication da
+      WHERE da.pet_id = v_pet AND da.user_id = v_user AND da.status = 'approved'
+  ) THEN
+    SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Donors cannot adopt their own donated pet', MYSQL_ERRNO = 5005;
+  END IF;
+
+  -- Require at least one vet record before approval
+  SELECT COUNT(*) INTO v_vet_count FROM VetRecord WHERE pet_id = v_pet;
+  IF v_vet_count = 0 THEN
+    SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Pet must have at least one veterinary checkup before adoption', MYSQL_ERRNO = 5006;
+  END IF;
+
+  -- check buyer funds if price > 0
+  IF v_price > 0 THEN
+    CALL wallet_lock(v_user, 32, v_wallet);
+    IF v_wallet IS NULL THEN
+      SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'User not found', MYSQL_ERRNO = 5007;
+    END IF;
+    IF v_wallet < v_price THEN
+      SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Insufficient funds in user wallet', MYSQL_ERRNO = 5008;
+    END IF;
+
+    CALL wallet_post(v_user, -v_price, 'adoption', CONCAT('application:', p_application_id),
+                     CONCAT('adoption:', p_application_id));
+    CALL add_shelter_revenue(v_shelter, v_price);
+  END IF;
+
+  UPDATE Pet SET status = 'Adopted' WHERE pet_id = v_pet;
+  UPDATE AdopterApplication SET status = 'approved' WHERE application_id = p_application_id;
+  
+  -- Auto-reject all other pending applications for this pet
+  UPDATE AdopterApplication
+    SET status = 'rejected'
+    WHERE pet_id = v_pet AND status = 'pending' AND application_id <> p_application_id;
+
+  COMMIT;
+  SELECT v_pet AS pet_id;
+END$$
+
+CREATE PROCEDURE place_shop_order(
+  IN p_user_id INT,
+  IN p_item_id INT,
+  IN p_quantity INT
+)
+BEGIN
+  DECLARE v_price DECIMAL(10,2);
+  DECLARE v_total DECIMAL(10,2);
+  DECLARE v_wallet DECIMAL(12,2);
+  DECLARE v_shelter_id INT;
+  DECLARE v_stock INT;
+  
+  DECLARE EXIT HANDLER FOR SQLEXCEPTION
+  BEGIN
+    ROLLBACK;
+    SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'place_shop_order: transaction failed';
+  END;
+  
+  START TRANSACTION;
+  
+  -- Validate user (locks the wallet, not the User row)
+  CALL wallet_lock(p_user_id, 32, v_wallet);
+  IF v_wallet IS NULL THEN
+    SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'User not found';
+  END IF;
+  
+  -- Validate item and check stock
+  SELECT price, shelter_id, stock_quantity INTO v_price, v_shelter_id, v_stock
+    FROM ShopItem WHERE item_id = p_item_id FOR UPDATE;
+    
+  IF v_price IS NULL THEN
+    SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Item not found';
+  END IF;
+  
+  IF p_quantity <= 0 THEN
+    SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Quantity must be positive';
+  END IF;
+  
+  IF v_stock < p_quantity THEN
+    SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Insufficient stock';
+  END IF;
+  
+  SET v_total = v_price * p_quantity;
+  
+  IF v_wallet < v_total THEN
+    SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Insufficient funds in wallet';
+  END IF;
+  
+  -- Add to shelter revenue
+  CALL add_shelter_revenue(v_shelter_id, v_total);
+  
+  -- Insert order (triggers will handle stock adjustment)
+  INSERT INTO ShopOrder (user_id, shelter_id, item_id, quantity, price, order_date)
+    VALUES (p_user_id, v_shelter_id, p_item_id, p_quantity, v_total, CURDATE());
+  
+  -- Deduct from user wallet
+  CALL wallet_post(p_user_id, -v_total, 'order', CONCAT('order:', LAST_INSERT_ID()), NULL);
+  
+  COMMIT;
+END$$
+
+DELIMITER ;
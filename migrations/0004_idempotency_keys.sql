@@ -0,0 +1,16 @@
+-- Responses of POST requests sent with an Idempotency-Key header, so a retried request gets the
+-- stored response instead of running again (see idempotent() in app.py). response_status is NULL
+-- while the first request is still running. Rows expire after IDEMPOTENCY_TTL seconds.
+
+CREATE TABLE IF NOT EXISTS IdempotencyKey (
+    user_id INT NOT NULL,
+    idempotency_key VARCHAR(64) NOT NULL,
+    request_hash CHAR(64) NOT NULL,
+    response_status SMALLINT DEFAULT NULL,
+    response_body MEDIUMTEXT,
+    content_type VARCHAR(100) DEFAULT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (user_id, idempotency_key),
+    KEY idx_idempotency_expires (expires_at)
+);
@@ -0,0 +1,17 @@
+-- Server-side cart. Each row reserves `quantity` units of an item for a user: the units are taken
+-- out of ShopItem.stock_quantity when reserved and put back when the line is removed or, once
+-- expires_at has passed, by the reservation sweeper (sweep_expired_reservations() in app.py).
+-- Checkout turns the rows into ShopOrder rows.
+
+CREATE TABLE IF NOT EXISTS CartItem (
+    user_id INT NOT NULL,
+    item_id INT NOT NULL,
+    quantity INT NOT NULL,
+    reserved_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (user_id, item_id),
+    KEY idx_cart_expires (expires_at),
+    KEY idx_cart_item_expires (item_id, expires_at),
+    FOREIGN KEY (user_id) REFERENCES User(user_id) ON DELETE CASCADE,
+    FOREIGN KEY (item_id) REFERENCES ShopItem(item_id) ON DELETE CASCADE
+);
@@ -0,0 +1,76 @@
+-- ShelterStats counters and EntityVersion tokens in sharded rows. Every order still wrote the
+-- shelter's ShelterStats row (order_count) and, through the stock UPDATE on ShopItem, its
+-- 'shop_items' EntityVersion row; adoptions did the same through the Pet triggers. Those were the
+-- same per-shelter hot rows that 0002 removed for revenue, so both tables get a shard column in
+-- their primary key. Writers pick one of 16 shards by connection (counter_shard()) and readers
+-- add the shards up (see sections 11 and 12 of routines_and_triggers.sql).
+-- Existing rows become shard 0, so totals do not change.
+
+ALTER TABLE ShelterStats ADD COLUMN shard TINYINT UNSIGNED NOT NULL DEFAULT 0 AFTER shelter_id,
+    DROP PRIMARY KEY, ADD PRIMARY KEY (shelter_id, shard);
+
+ALTER TABLE EntityVersion ADD COLUMN shard TINYINT UNSIGNED NOT NULL DEFAULT 0 AFTER scope_id,
+    DROP PRIMARY KEY, ADD PRIMARY KEY (entity, scope_id, shard);
+
+DELIMITER $$
+
+DROP FUNCTION IF EXISTS counter_shard$$
+DROP PROCEDURE IF EXISTS bump_shelter_stats$$
+DROP PROCEDURE IF EXISTS rebuild_shelter_stats$$
+DROP PROCEDURE IF EXISTS bump_entity_version$$
+
+CREATE FUNCTION counter_shard() RETURNS TINYINT UNSIGNED
+NOT DETERMINISTIC NO SQL
+RETURN CONNECTION_ID() % 16$$
+
+CREATE PROCEDURE bump_shelter_stats(
+  IN p_shelter_id INT,
+  IN p_available INT,
+  IN p_adopted INT,
+  IN p_caretakers INT,
+  IN p_items INT,
+  IN p_orders INT
+)
+BEGIN
+  -- A shard may go negative (an order counted on one shard, deleted on another); only the sum counts
+  IF p_shelter_id IS NOT NULL THEN
+    INSERT INTO ShelterStats (shelter_id, shard, available_count, adopted_count, caretaker_count, item_count, order_count)
+      VALUES (p_shelter_id, counter_shard(), p_available, p_adopted, p_caretakers, p_items, p_orders)
+      ON DUPLICATE KEY UPDATE
+        available_count = available_count + p_available,
+        adopted_count = adopted_count + p_adopted,
+        caretaker_count = caretaker_count + p_caretakers,
+        item_count = item_count + p_items,
+        order_count = order_count + p_orders;
+  END IF;
+END$$
+
+CREATE PROCEDURE rebuild_shelter_stats()
+BEGIN
+  DECLARE EXIT HANDLER FOR SQLEXCEPTION
+  BEGIN
+    ROLLBACK;
+    RESIGNAL;
+  END;
+
+  START TRANSACTION;
+  DELETE FROM ShelterStats;
+  INSERT INTO ShelterStats (shelter_id, shard, available_count, adopted_count, caretaker_count, item_count, order_count)
+    SELECT s.shelter_id, 0,
+           (SELECT COUNT(*) FROM Pet p WHERE p.shelter_id = s.shelter_id AND p.status = 'Available'),
+           (SELECT COUNT(*) FROM Pet p WHERE p.shelter_id = s.shelter_id AND p.status = 'Adopted'),
+           (SELECT COUNT(*) FROM Caretaker c WHERE c.shelter_id = s.shelter_id),
+           (SELECT COUNT(*) FROM ShopItem si WHERE si.shelter_id = s.shelter_id),
+           (SELECT COUNT(*) FROM ShopOrder so WHERE so.shelter_id = s.shelter_id)
+    FROM Shelter s;
+  COMMIT;
+END$$
+
+CREATE PROCEDURE bump_entity_version(IN p_entity VARCHAR(32), IN p_scope_id INT)
+BEGIN
+  INSERT INTO EntityVersion (entity, scope_id, shard, version, updated_at)
+  VALUES (p_entity, IFNULL(p_scope_id, 0), counter_shard(), 1, CURRENT_TIMESTAMP(6))
+  ON DUPLICATE KEY UPDATE version = version + 1, updated_at = CURRENT_TIMESTAMP(6);
+END$$
+
+DELIMITER ;
@@ -0,0 +1,8 @@
+-- The wallet's conditional GET version is now its ledger position (WalletBalance.last_txn_id plus
+-- the pending WalletTransaction rows, see ENTITY_VERSION_SHARDS in app.py). User.wallet is no
+-- longer updated after the opening balance, so the trigger that bumped a 'wallet' token on it
+-- never fired; drop it together with the tokens it left behind.
+
+DROP TRIGGER IF EXISTS user_version_after_update;
+
+DELETE FROM EntityVersion WHERE entity = 'wallet';
@@ -104,3 +104,30 @@ CREATE TABLE DonorApplication (
     FOREIGN KEY (user_id) REFERENCES User(user_id),
     FOREIGN KEY (pet_id) REFERENCES Pet(pet_id)
 );
+
+-- Per-shelter counters maintained by triggers in routines_and_triggers.sql, in up to 16 shard
+-- rows per shelter (sum them to read a counter).
+-- Recompute from scratch with: CALL rebuild_shelter_stats();  (or `flask rebuild-shelter-stats`)
+CREATE TABLE IF NOT EXISTS ShelterStats (
+    shelter_id INT NOT NULL,
+    shard TINYINT UNSIGNED NOT NULL DEFAULT 0,
+    available_count INT NOT NULL DEFAULT 0,
+    adopted_count INT NOT NULL DEFAULT 0,
+    caretaker_count INT NOT NULL DEFAULT 0,
+    item_count INT NOT NULL DEFAULT 0,
+    order_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (shelter_id, shard),
+    FOREIGN KEY (shelter_id) REFERENCES Shelter(shelter_id) ON DELETE CASCADE
+);
+
+-- Version tokens for HTTP conditional GET (ETag / Last-Modified), bumped by triggers in
+-- routines_and_triggers.sql. Up to 16 shard rows per (entity, scope), summed by readers: scope_id
+-- is the shelter_id for pets, shop_items and shelters, and 0 for applications.
+CREATE TABLE IF NOT EXISTS EntityVersion (
+    entity VARCHAR(32) NOT NULL,
+    scope_id INT NOT NULL DEFAULT 0,
+    shard TINYINT UNSIGNED NOT NULL DEFAULT 0,
+    version BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+    PRIMARY KEY (entity, scope_id, shard)
+);
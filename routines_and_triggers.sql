@@ -11,9 +11,18 @@ DROP PROCEDURE IF EXISTS approve_adoption$$
 DROP PROCEDURE IF EXISTS reject_adoption$$
 DROP PROCEDURE IF EXISTS accept_donor_application$$
 DROP PROCEDURE IF EXISTS list_available_pets$$
+DROP PROCEDURE IF EXISTS list_available_pets_page$$
 DROP PROCEDURE IF EXISTS add_vet_record$$
 DROP PROCEDURE IF EXISTS place_shop_order$$
 DROP FUNCTION IF EXISTS check_pet_eligibility$$
+DROP FUNCTION IF EXISTS counter_shard$$
+DROP PROCEDURE IF EXISTS bump_shelter_stats$$
+DROP PROCEDURE IF EXISTS rebuild_shelter_stats$$
+DROP FUNCTION IF EXISTS revenue_shard$$
+DROP PROCEDURE IF EXISTS add_shelter_revenue$$
+DROP PROCEDURE IF EXISTS wallet_lock$$
+DROP PROCEDURE IF EXISTS wallet_post$$
+DROP TRIGGER IF EXISTS user_after_insert$$
 
 DROP TRIGGER IF EXISTS shoporder_before_insert$$
 DROP TRIGGER IF EXISTS shoporder_after_insert$$
@@ -21,6 +30,33 @@ DROP TRIGGER IF EXISTS shoporder_after_delete$$
 DROP TRIGGER IF EXISTS shoporder_before_update$$
 DROP TRIGGER IF EXISTS shoporder_after_update$$
 DROP TRIGGER IF EXISTS donorapplication_after_update$$
+DROP TRIGGER IF EXISTS shelter_after_insert$$
+DROP TRIGGER IF EXISTS pet_after_insert$$
+DROP TRIGGER IF EXISTS pet_after_update$$
+DROP TRIGGER IF EXISTS pet_after_delete$$
+DROP TRIGGER IF EXISTS caretaker_after_insert$$
+DROP TRIGGER IF EXISTS caretaker_after_update$$
+DROP TRIGGER IF EXISTS caretaker_after_delete$$
+DROP TRIGGER IF EXISTS shopitem_after_insert$$
+DROP TRIGGER IF EXISTS shopitem_after_update$$
+DROP TRIGGER IF EXISTS shopitem_after_delete$$
+DROP PROCEDURE IF EXISTS bump_entity_version$$
+DROP TRIGGER IF EXISTS pet_version_after_insert$$
+DROP TRIGGER IF EXISTS pet_version_after_update$$
+DROP TRIGGER IF EXISTS pet_version_after_delete$$
+DROP TRIGGER IF EXISTS shopitem_version_after_insert$$
+DROP TRIGGER IF EXISTS shopitem_version_after_update$$
+DROP TRIGGER IF EXISTS shopitem_version_after_delete$$
+DROP TRIGGER IF EXISTS shelter_version_after_insert$$
+DROP TRIGGER IF EXISTS shelter_version_after_update$$
+DROP TRIGGER IF EXISTS shelter_version_after_delete$$
+DROP TRIGGER IF EXISTS adopterapplication_version_after_insert$$
+DROP TRIGGER IF EXISTS adopterapplication_version_after_update$$
+DROP TRIGGER IF EXISTS adopterapplication_version_after_delete$$
+DROP TRIGGER IF EXISTS donorapplication_version_after_insert$$
+DROP TRIGGER IF EXISTS donorapplication_version_after_update$$
+DROP TRIGGER IF EXISTS donorapplication_version_after_delete$$
+DROP TRIGGER IF EXISTS user_version_after_update$$
 
 -- 1) Procedure: apply_for_adoption (enhanced: prevents duplicate pending applications)
 CREATE PROCEDURE apply_for_adoption(IN p_user_id INT, IN p_pet_id INT)
@@ -63,6 +99,8 @@ BEGIN
 END$$
 
 -- 2) Procedure: approve adoption (enhanced: requires vet record, rejects competing applications)
+-- Validation failures carry MYSQL_ERRNO 5001-5008 (see APPROVAL_ERROR_CODES in app.py) so callers
+-- can skip pre-validation. On success returns the adopted pet_id as a one-row result set.
 CREATE PROCEDURE approve_adoption(IN p_application_id INT)
 BEGIN
   DECLARE v_user INT;
@@ -70,7 +108,7 @@ BEGIN
   DECLARE v_app_status VARCHAR(20);
   DECLARE v_pet_status VARCHAR(20);
   DECLARE v_price DECIMAL(10,2);
-  DECLARE v_wallet DECIMAL(10,2);
+  DECLARE v_wallet DECIMAL(12,2);
   DECLARE v_shelter INT;
   DECLARE v_vet_count INT;
 
@@ -86,20 +124,20 @@ BEGIN
     FROM AdopterApplication WHERE application_id = p_application_id FOR UPDATE;
 
   IF v_app_status IS NULL THEN
-    SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Application not found';
+    SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Application not found', MYSQL_ERRNO = 5001;
   END IF;
   IF v_app_status <> 'pending' THEN
-    SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Application is not pending';
+    SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Application is not pending', MYSQL_ERRNO = 5002;
   END IF;
 
   SELECT status, price, shelter_id INTO v_pet_status, v_price, v_shelter
     FROM Pet WHERE pet_id = v_pet FOR UPDATE;
 
   IF v_pet_status IS NULL THEN
-    SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Pet not found';
+    SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Pet not found', MYSQL_ERRNO = 5003;
   END IF;
   IF v_pet_status <> 'Available' THEN
-    SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Pet is not available for adoption';
+    SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Pet is not available for adoption', MYSQL_ERRNO = 5004;
   END IF;
 
   -- Prevent donor from adopting their own donated pet
@@ -107,27 +145,28 @@ BEGIN
       SELECT 1 FROM DonorApplication da
       WHERE da.pet_id = v_pet AND da.user_id = v_user AND da.status = 'approved'
   ) THEN
-    SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Donors cannot adopt their own donated pet';
+    SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Donors cannot adopt their own donated pet', MYSQL_ERRNO = 5005;
   END IF;
 
   -- Require at least one vet record before approval
   SELECT COUNT(*) INTO v_vet_count FROM VetRecord WHERE pet_id = v_pet;
   IF v_vet_count = 0 THEN
-    SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Pet must have at least one veterinary checkup before adoption';
+    SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Pet must have at least one veterinary checkup before adoption', MYSQL_ERRNO = 5006;
   END IF;
 
   -- check buyer funds if price > 0
   IF v_price > 0 THEN
-    SELECT wallet INTO v_wallet FROM User WHERE user_id = v_user FOR UPDATE;
+    CALL wallet_lock(v_user, 32, v_wallet);
     IF v_wallet IS NULL THEN
-      SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'User not found';
+      SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'User not found', MYSQL_ERRNO = 5007;
     END IF;
     IF v_wallet < v_price THEN
-      SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Insufficient funds in user wallet';
+      SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Insufficient funds in user wallet', MYSQL_ERRNO = 5008;
     END IF;
 
-    UPDATE User SET wallet = wallet - v_price WHERE user_id = v_user;
-    UPDATE Shelter SET revenue = revenue + v_price WHERE shelter_id = v_shelter;
+    CALL wallet_post(v_user, -v_price, 'adoption', CONCAT('application:', p_application_id),
+                     CONCAT('adoption:', p_application_id));
+    CALL add_shelter_revenue(v_shelter, v_price);
   END IF;
 
   UPDATE Pet SET status = 'Adopted' WHERE pet_id = v_pet;
@@ -139,6 +178,7 @@ BEGIN
     WHERE pet_id = v_pet AND status = 'pending' AND application_id <> p_application_id;
 
   COMMIT;
+  SELECT v_pet AS pet_id;
 END$$
 
 -- 3) Procedure: reject adoption
@@ -210,6 +250,18 @@ BEGIN
     ORDER BY pet_id;
 END$$
 
+-- 5b) Procedure: one keyset page of available pets (pet_id > p_after_id), used by GET /api/pets
+CREATE PROCEDURE list_available_pets_page(IN p_shelter_id INT, IN p_after_id INT, IN p_limit INT)
+BEGIN
+  SELECT pet_id, name, species, breed, age, health_status, price, shelter_id
+    FROM Pet
+    WHERE status = 'Available'
+      AND (p_shelter_id IS NULL OR shelter_id = p_shelter_id)
+      AND (p_after_id IS NULL OR pet_id > p_after_id)
+    ORDER BY pet_id
+    LIMIT p_limit;
+END$$
+
 -- 6) Function: check if pet is eligible for adoption (has vet record)
 CREATE FUNCTION check_pet_eligibility(p_pet_id INT)
 RETURNS VARCHAR(20)
@@ -267,7 +319,7 @@ CREATE PROCEDURE place_shop_order(
 BEGIN
   DECLARE v_price DECIMAL(10,2);
   DECLARE v_total DECIMAL(10,2);
-  DECLARE v_wallet DECIMAL(10,2);
+  DECLARE v_wallet DECIMAL(12,2);
   DECLARE v_shelter_id INT;
   DECLARE v_stock INT;
   
@@ -279,8 +331,8 @@ BEGIN
   
   START TRANSACTION;
   
-  -- Validate user
-  SELECT wallet INTO v_wallet FROM User WHERE user_id = p_user_id FOR UPDATE;
+  -- Validate user (locks the wallet, not the User row)
+  CALL wallet_lock(p_user_id, 32, v_wallet);
   IF v_wallet IS NULL THEN
     SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'User not found';
   END IF;
@@ -307,16 +359,16 @@ BEGIN
     SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Insufficient funds in wallet';
   END IF;
   
-  -- Deduct from user wallet
-  UPDATE User SET wallet = wallet - v_total WHERE user_id = p_user_id;
-  
   -- Add to shelter revenue
-  UPDATE Shelter SET revenue = revenue + v_total WHERE shelter_id = v_shelter_id;
+  CALL add_shelter_revenue(v_shelter_id, v_total);
   
   -- Insert order (triggers will handle stock adjustment)
   INSERT INTO ShopOrder (user_id, shelter_id, item_id, quantity, price, order_date)
     VALUES (p_user_id, v_shelter_id, p_item_id, p_quantity, v_total, CURDATE());
   
+  -- Deduct from user wallet
+  CALL wallet_post(p_user_id, -v_total, 'order', CONCAT('order:', LAST_INSERT_ID()), NULL);
+  
   COMMIT;
 END$$
 
@@ -339,12 +391,13 @@ BEGIN
   END IF;
 END$$
 
--- AFTER INSERT: decrement stock
+-- AFTER INSERT: decrement stock, count the order for its shelter
 CREATE TRIGGER shoporder_after_insert
 AFTER INSERT ON ShopOrder
 FOR EACH ROW
 BEGIN
   UPDATE ShopItem SET stock_quantity = stock_quantity - NEW.quantity WHERE item_id = NEW.item_id;
+  CALL bump_shelter_stats(NEW.shelter_id, 0, 0, 0, 0, 1);
 END$$
 
 -- AFTER DELETE: restock
@@ -353,6 +406,7 @@ AFTER DELETE ON ShopOrder
 FOR EACH ROW
 BEGIN
   UPDATE ShopItem SET stock_quantity = stock_quantity + OLD.quantity WHERE item_id = OLD.item_id;
+  CALL bump_shelter_stats(OLD.shelter_id, 0, 0, 0, 0, -1);
 END$$
 
 -- BEFORE UPDATE: when quantity changes, ensure stock is available for increase and adjust on success
@@ -408,6 +462,348 @@ BEGIN
   END IF;
 END$$
 
+-- 11) Shelter counters (ShelterStats): kept current by the triggers below inside the
+-- writing transaction, so the revenue dashboard reads a few rows per shelter instead of
+-- counting. Every order and adoption changes a counter, so each shelter has up to 16 shard
+-- rows, picked by connection with counter_shard(); concurrent sales for one shelter write
+-- different rows and readers add the shards up.
+CREATE FUNCTION counter_shard() RETURNS TINYINT UNSIGNED
+NOT DETERMINISTIC NO SQL
+RETURN CONNECTION_ID() % 16$$
+
+CREATE PROCEDURE bump_shelter_stats(
+  IN p_shelter_id INT,
+  IN p_available INT,
+  IN p_adopted INT,
+  IN p_caretakers INT,
+  IN p_items INT,
+  IN p_orders INT
+)
+BEGIN
+  -- A shard may go negative (an order counted on one shard, deleted on another); only the sum counts
+  IF p_shelter_id IS NOT NULL THEN
+    INSERT INTO ShelterStats (shelter_id, shard, available_count, adopted_count, caretaker_count, item_count, order_count)
+      VALUES (p_shelter_id, counter_shard(), p_available, p_adopted, p_caretakers, p_items, p_orders)
+      ON DUPLICATE KEY UPDATE
+        available_count = available_count + p_available,
+        adopted_count = adopted_count + p_adopted,
+        caretaker_count = caretaker_count + p_caretakers,
+        item_count = item_count + p_items,
+        order_count = order_count + p_orders;
+  END IF;
+END$$
+
+-- Recompute every shelter's counters from the base tables
+CREATE PROCEDURE rebuild_shelter_stats()
+BEGIN
+  DECLARE EXIT HANDLER FOR SQLEXCEPTION
+  BEGIN
+    ROLLBACK;
+    RESIGNAL;
+  END;
+
+  START TRANSACTION;
+  DELETE FROM ShelterStats;
+  INSERT INTO ShelterStats (shelter_id, shard, available_count, adopted_count, caretaker_count, item_count, order_count)
+    SELECT s.shelter_id, 0,
+           (SELECT COUNT(*) FROM Pet p WHERE p.shelter_id = s.shelter_id AND p.status = 'Available'),
+           (SELECT COUNT(*) FROM Pet p WHERE p.shelter_id = s.shelter_id AND p.status = 'Adopted'),
+           (SELECT COUNT(*) FROM Caretaker c WHERE c.shelter_id = s.shelter_id),
+           (SELECT COUNT(*) FROM ShopItem si WHERE si.shelter_id = s.shelter_id),
+           (SELECT COUNT(*) FROM ShopOrder so WHERE so.shelter_id = s.shelter_id)
+    FROM Shelter s;
+  COMMIT;
+END$$
+
+CREATE TRIGGER shelter_after_insert
+AFTER INSERT ON Shelter
+FOR EACH ROW
+BEGIN
+  CALL bump_shelter_stats(NEW.shelter_id, 0, 0, 0, 0, 0);
+END$$
+
+CREATE TRIGGER pet_after_insert
+AFTER INSERT ON Pet
+FOR EACH ROW
+BEGIN
+  CALL bump_shelter_stats(NEW.shelter_id, NEW.status = 'Available', NEW.status = 'Adopted', 0, 0, 0);
+END$$
+
+CREATE TRIGGER pet_after_update
+AFTER UPDATE ON Pet
+FOR EACH ROW
+BEGIN
+  IF NOT (OLD.shelter_id <=> NEW.shelter_id) OR OLD.status <> NEW.status THEN
+    CALL bump_shelter_stats(OLD.shelter_id, -(OLD.status = 'Available'), -(OLD.status = 'Adopted'), 0, 0, 0);
+    CALL bump_shelter_stats(NEW.shelter_id, NEW.status = 'Available', NEW.status = 'Adopted', 0, 0, 0);
+  END IF;
+END$$
+
+CREATE TRIGGER pet_after_delete
+AFTER DELETE ON Pet
+FOR EACH ROW
+BEGIN
+  CALL bump_shelter_stats(OLD.shelter_id, -(OLD.status = 'Available'), -(OLD.status = 'Adopted'), 0, 0, 0);
+END$$
+
+CREATE TRIGGER caretaker_after_insert
+AFTER INSERT ON Caretaker
+FOR EACH ROW
+BEGIN
+  CALL bump_shelter_stats(NEW.shelter_id, 0, 0, 1, 0, 0);
+END$$
+
+CREATE TRIGGER caretaker_after_update
+AFTER UPDATE ON Caretaker
+FOR EACH ROW
+BEGIN
+  IF NOT (OLD.shelter_id <=> NEW.shelter_id) THEN
+    CALL bump_shelter_stats(OLD.shelter_id, 0, 0, -1, 0, 0);
+    CALL bump_shelter_stats(NEW.shelter_id, 0, 0, 1, 0, 0);
+  END IF;
+END$$
+
+CREATE TRIGGER caretaker_after_delete
+AFTER DELETE ON Caretaker
+FOR EACH ROW
+BEGIN
+  CALL bump_shelter_stats(OLD.shelter_id, 0, 0, -1, 0, 0);
+END$$
+
+CREATE TRIGGER shopitem_after_insert
+AFTER INSERT ON ShopItem
+FOR EACH ROW
+BEGIN
+  CALL bump_shelter_stats(NEW.shelter_id, 0, 0, 0, 1, 0);
+END$$
+
+CREATE TRIGGER shopitem_after_update
+AFTER UPDATE ON ShopItem
+FOR EACH ROW
+BEGIN
+  IF NOT (OLD.shelter_id <=> NEW.shelter_id) THEN
+    CALL bump_shelter_stats(OLD.shelter_id, 0, 0, 0, -1, 0);
+    CALL bump_shelter_stats(NEW.shelter_id, 0, 0, 0, 1, 0);
+  END IF;
+END$$
+
+CREATE TRIGGER shopitem_after_delete
+AFTER DELETE ON ShopItem
+FOR EACH ROW
+BEGIN
+  CALL bump_shelter_stats(OLD.shelter_id, 0, 0, 0, -1, 0);
+END$$
+
+-- 12) Version tokens (EntityVersion) behind the ETag / Last-Modified headers of the GET
+-- endpoints. Scoped per shelter (0 for applications) and sharded like ShelterStats, so
+-- concurrent writers, including every order's stock update and every adoption, do not
+-- queue on a single row; readers sum the shards (and scopes). The wallet has no token here:
+-- its version is the ledger position (see ENTITY_VERSION_SHARDS in app.py).
+CREATE PROCEDURE bump_entity_version(IN p_entity VARCHAR(32), IN p_scope_id INT)
+BEGIN
+  INSERT INTO EntityVersion (entity, scope_id, shard, version, updated_at)
+  VALUES (p_entity, IFNULL(p_scope_id, 0), counter_shard(), 1, CURRENT_TIMESTAMP(6))
+  ON DUPLICATE KEY UPDATE version = version + 1, updated_at = CURRENT_TIMESTAMP(6);
+END$$
+
+CREATE TRIGGER pet_version_after_insert
+AFTER INSERT ON Pet
+FOR EACH ROW
+BEGIN
+  CALL bump_entity_version('pets', NEW.shelter_id);
+END$$
+
+CREATE TRIGGER pet_version_after_update
+AFTER UPDATE ON Pet
+FOR EACH ROW
+BEGIN
+  CALL bump_entity_version('pets', NEW.shelter_id);
+  IF NOT (OLD.shelter_id <=> NEW.shelter_id) THEN
+    CALL bump_entity_version('pets', OLD.shelter_id);
+  END IF;
+  -- Application listings show the pet's name
+  IF NOT (OLD.name <=> NEW.name) THEN
+    CALL bump_entity_version('applications', 0);
+  END IF;
+END$$
+
+CREATE TRIGGER pet_version_after_delete
+AFTER DELETE ON Pet
+FOR EACH ROW
+BEGIN
+  CALL bump_entity_version('pets', OLD.shelter_id);
+END$$
+
+CREATE TRIGGER shopitem_version_after_insert
+AFTER INSERT ON ShopItem
+FOR EACH ROW
+BEGIN
+  CALL bump_entity_version('shop_items', NEW.shelter_id);
+END$$
+
+CREATE TRIGGER shopitem_version_after_update
+AFTER UPDATE ON ShopItem
+FOR EACH ROW
+BEGIN
+  CALL bump_entity_version('shop_items', NEW.shelter_id);
+  IF NOT (OLD.shelter_id <=> NEW.shelter_id) THEN
+    CALL bump_entity_version('shop_items', OLD.shelter_id);
+  END IF;
+END$$
+
+CREATE TRIGGER shopitem_version_after_delete
+AFTER DELETE ON ShopItem
+FOR EACH ROW
+BEGIN
+  CALL bump_entity_version('shop_items', OLD.shelter_id);
+END$$
+
+CREATE TRIGGER shelter_version_after_insert
+AFTER INSERT ON Shelter
+FOR EACH ROW
+BEGIN
+  CALL bump_entity_version('shelters', NEW.shelter_id);
+END$$
+
+CREATE TRIGGER shelter_version_after_update
+AFTER UPDATE ON Shelter
+FOR EACH ROW
+BEGIN
+  CALL bump_entity_version('shelters', NEW.shelter_id);
+  -- Shop item listings show the shelter's name
+  IF NOT (OLD.name <=> NEW.name) THEN
+    CALL bump_entity_version('shop_items', NEW.shelter_id);
+  END IF;
+END$$
+
+CREATE TRIGGER shelter_version_after_delete
+AFTER DELETE ON Shelter
+FOR EACH ROW
+BEGIN
+  CALL bump_entity_version('shelters', OLD.shelter_id);
+END$$
+
+CREATE TRIGGER adopterapplication_version_after_insert
+AFTER INSERT ON AdopterApplication
+FOR EACH ROW
+BEGIN
+  CALL bump_entity_version('applications', 0);
+END$$
+
+CREATE TRIGGER adopterapplication_version_after_update
+AFTER UPDATE ON AdopterApplication
+FOR EACH ROW
+BEGIN
+  CALL bump_entity_version('applications', 0);
+END$$
+
+CREATE TRIGGER adopterapplication_version_after_delete
+AFTER DELETE ON AdopterApplication
+FOR EACH ROW
+BEGIN
+  CALL bump_entity_version('applications', 0);
+END$$
+
+CREATE TRIGGER donorapplication_version_after_insert
+AFTER INSERT ON DonorApplication
+FOR EACH ROW
+BEGIN
+  CALL bump_entity_version('applications', 0);
+END$$
+
+CREATE TRIGGER donorapplication_version_after_update
+AFTER UPDATE ON DonorApplication
+FOR EACH ROW
+BEGIN
+  CALL bump_entity_version('applications', 0);
+END$$
+
+CREATE TRIGGER donorapplication_version_after_delete
+AFTER DELETE ON DonorApplication
+FOR EACH ROW
+BEGIN
+  CALL bump_entity_version('applications', 0);
+END$$
+
+-- 13) Shelter revenue. Adding to Shelter.revenue made every sale for a shelter queue on its
+-- row, so new revenue goes to one of 16 ShelterRevenueShard rows per shelter, picked by
+-- connection so concurrent transactions land on different rows. Readers add up
+-- Shelter.revenue (revenue from before the shards) and the shards. Together with the sharded
+-- ShelterStats and EntityVersion rows above, a sale writes no row that every other sale for
+-- the shelter also writes (the item, pet and wallet rows it changes are its own).
+CREATE FUNCTION revenue_shard() RETURNS TINYINT UNSIGNED
+NOT DETERMINISTIC NO SQL
+RETURN CONNECTION_ID() % 16$$
+
+CREATE PROCEDURE add_shelter_revenue(IN p_shelter_id INT, IN p_amount DECIMAL(10,2))
+BEGIN
+  IF p_shelter_id IS NOT NULL AND p_amount <> 0 THEN
+    INSERT INTO ShelterRevenueShard (shelter_id, shard, amount, version, updated_at)
+      VALUES (p_shelter_id, revenue_shard(), p_amount, 1, CURRENT_TIMESTAMP(6))
+      ON DUPLICATE KEY UPDATE amount = amount + p_amount, version = version + 1,
+                              updated_at = CURRENT_TIMESTAMP(6);
+  END IF;
+END$$
+
+-- 14) Wallet ledger. Balances are never updated in place: every credit and debit is a
+-- WalletTransaction row, and WalletBalance holds a snapshot of the ledger up to last_txn_id.
+-- The balance is the snapshot plus the later rows. Debits lock the user's WalletBalance row
+-- (wallet_lock) so two purchases cannot both spend the same funds; credits only take a shared
+-- lock on it, so top-ups run concurrently and never wait on the User row. Every writer holds
+-- one of the two locks until commit, so whoever holds the exclusive lock sees every ledger row
+-- for the user and can fold them into the snapshot (compaction) without missing one that is
+-- still uncommitted. User.wallet is only read once, as the opening balance of a new user.
+
+-- Lock the wallet and return its balance in p_balance (NULL if the user has no wallet). Once
+-- p_fold_after or more rows are pending, they are folded into the snapshot while it is locked.
+CREATE PROCEDURE wallet_lock(IN p_user_id INT, IN p_fold_after INT, OUT p_balance DECIMAL(12,2))
+BEGIN
+  DECLARE v_snapshot DECIMAL(12,2);
+  DECLARE v_last BIGINT;
+  DECLARE v_delta DECIMAL(12,2);
+  DECLARE v_pending INT;
+  DECLARE v_max BIGINT;
+
+  SET p_balance = NULL;
+  SELECT balance, last_txn_id INTO v_snapshot, v_last
+    FROM WalletBalance WHERE user_id = p_user_id FOR UPDATE;
+  IF v_last IS NOT NULL THEN
+    -- Locking read: sees rows committed after this transaction's read view was taken
+    SELECT COALESCE(SUM(amount), 0), COUNT(*), MAX(txn_id) INTO v_delta, v_pending, v_max
+      FROM WalletTransaction WHERE user_id = p_user_id AND txn_id > v_last LOCK IN SHARE MODE;
+    SET p_balance = v_snapshot + v_delta;
+    IF v_pending > 0 AND v_pending >= p_fold_after THEN
+      UPDATE WalletBalance SET balance = p_balance, last_txn_id = v_max, compacted_at = CURRENT_TIMESTAMP(6)
+        WHERE user_id = p_user_id;
+    END IF;
+  END IF;
+END$$
+
+-- Append a ledger row: positive p_amount credits, negative debits. Debits must hold wallet_lock;
+-- credits take LOCK IN SHARE MODE on the WalletBalance row first. p_idempotency_key, when given,
+-- is unique per user (duplicate key error 1062 on a replay).
+CREATE PROCEDURE wallet_post(
+  IN p_user_id INT,
+  IN p_amount DECIMAL(12,2),
+  IN p_kind VARCHAR(16),
+  IN p_reference VARCHAR(64),
+  IN p_idempotency_key VARCHAR(64)
+)
+BEGIN
+  INSERT INTO WalletTransaction (user_id, amount, kind, reference, idempotency_key)
+    VALUES (p_user_id, p_amount, p_kind, p_reference, p_idempotency_key);
+END$$
+
+CREATE TRIGGER user_after_insert
+AFTER INSERT ON User
+FOR EACH ROW
+BEGIN
+  INSERT INTO WalletBalance (user_id, balance, last_txn_id) VALUES (NEW.user_id, 0, 0);
+  IF IFNULL(NEW.wallet, 0) <> 0 THEN
+    CALL wallet_post(NEW.user_id, NEW.wallet, 'opening', NULL, 'opening');
+  END IF;
+END$$
+
 DELIMITER ;
 
 -- End of routines_and_triggers.sql
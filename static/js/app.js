@@ -4,6 +4,118 @@ const API_BASE = '/api';
 // Current user state
 let currentUser = null;
 
+// Conditional GET: remember the validators and body of each response that carries an ETag,
+// send them back on the next request and rebuild the response from memory on 304.
+// Identical GETs issued while one is in flight share its response.
+const conditionalCache = new Map(); // url -> {etag, lastModified, body}
+const inFlight = new Map(); // url -> Promise<Response>
+function conditionalFetch(url) {
+    let pending = inFlight.get(url);
+    if (!pending) {
+        pending = revalidatingFetch(url);
+        inFlight.set(url, pending);
+        pending.finally(() => inFlight.delete(url)).catch(() => {});
+    }
+    // Every caller gets its own copy of the body
+    return pending.then(response => response.clone());
+}
+
+async function revalidatingFetch(url) {
+    const cached = conditionalCache.get(url);
+    const headers = {};
+    if (cached) {
+        headers['If-None-Match'] = cached.etag;
+        if (cached.lastModified) headers['If-Modified-Since'] = cached.lastModified;
+    }
+    const response = await fetch(url, {credentials: 'include', headers});
+    if (response.status === 304 && cached) {
+        return new Response(cached.body, {status: 200, headers: {'Content-Type': 'application/json'}});
+    }
+    const etag = response.headers.get('ETag');
+    if (response.ok && etag) {
+        conditionalCache.set(url, {
+            etag,
+            lastModified: response.headers.get('Last-Modified'),
+            body: await response.clone().text()
+        });
+    }
+    return response;
+}
+
+// Reference data (shelters, caretakers) is memoized for REFERENCE_TTL_MS and seeded by
+// /api/bootstrap; admin writes to it call invalidateReference().
+const REFERENCE_TTL_MS = 30000;
+const referenceMemo = new Map(); // path -> {expires, data}
+let bootstrapPromise = null;
+
+function rememberReference(path, data) {
+    referenceMemo.set(path, {expires: Date.now() + REFERENCE_TTL_MS, data});
+}
+
+async function fetchReference(path) {
+    if (bootstrapPromise) await bootstrapPromise.catch(() => {});
+    const memo = referenceMemo.get(path);
+    if (memo && memo.expires > Date.now()) return memo.data;
+    const response = await conditionalFetch(`${API_BASE}${path}`);
+    const data = await response.json();
+    if (!response.ok) throw new Error(data.error || 'Request failed');
+    rememberReference(path, data);
+    return data;
+}
+
+function invalidateReference() {
+    referenceMemo.clear();
+}
+
+// Keyset pagination: each list endpoint returns {<listKey>: [...], next_cursor}.
+// A pager remembers the cursor and fetches one page per next() call.
+function createPager(url, listKey, params = {}) {
+    return {
+        cursor: null,
+        done: false,
+        loading: false,
+        async next() {
+            if (this.done || this.loading) return [];
+            this.loading = true;
+            try {
+                const qs = new URLSearchParams(params);
+                if (this.cursor) qs.set('after', this.cursor);
+                const query = qs.toString();
+                const response = await conditionalFetch(query ? `${url}?${query}` : url);
+                const data = await response.json();
+                if (!response.ok) throw new Error(data.error || 'Request failed');
+                this.cursor = data.next_cursor || null;
+                this.done = !this.cursor;
+                return data[listKey] || [];
+            } finally {
+                this.loading = false;
+            }
+        }
+    };
+}
+
+// Infinite scroll: call loadMore() whenever a sentinel placed after `el` scrolls into view.
+// loadMore() returns true while more pages remain.
+function observeScrollEnd(el, loadMore) {
+    if (!el) return;
+    let sentinel = el.nextElementSibling;
+    if (!sentinel || !sentinel.classList.contains('scroll-sentinel')) {
+        sentinel = document.createElement('div');
+        sentinel.className = 'scroll-sentinel';
+        el.after(sentinel);
+    }
+    if (sentinel._observer) sentinel._observer.disconnect();
+    const observer = new IntersectionObserver(async entries => {
+        if (!entries.some(e => e.isIntersecting)) return;
+        const more = await loadMore();
+        observer.unobserve(sentinel);
+        // Re-observing fires again immediately if the sentinel is still visible
+        if (more) observer.observe(sentinel);
+    }, {rootMargin: '200px'});
+    sentinel._observer = observer;
+    observer.observe(sentinel);
+}
+
 // Initialize app
 document.addEventListener('DOMContentLoaded', () => {
     setupEventListeners();
@@ -64,7 +176,10 @@ function showSection(sectionId) {
     if (section) section.style.display = 'block';
     
     // Load section-specific data
-    if (sectionId === 'shop') loadShopItems();
+    if (sectionId === 'shop') {
+        loadShopItems();
+        if (currentUser) loadCart();
+    }
     if (sectionId === 'my-applications') loadMyApplications();
     if (sectionId === 'my-orders') loadMyOrders();
     if (sectionId === 'admin') {
@@ -143,6 +258,10 @@ async function logout() {
     try {
         await fetch(`${API_BASE}/logout`, {method: 'POST', credentials: 'include'});
         currentUser = null;
+        conditionalCache.clear(); // cached bodies may be user-specific
+        invalidateReference();
+        cart = {items: [], total: 0, expires_at: null};
+        updateCartDisplay();
         updateUIForLoggedOutUser();
         showAlert('Logged out successfully', 'success');
     } catch (error) {
@@ -151,21 +270,20 @@ async function logout() {
 }
 
 function checkLoginStatus() {
-    // Check if user is logged in via session using /api/me
-    fetch(`${API_BASE}/me`, {credentials: 'include'})
+    // One request for the session user, wallet and reference data
+    bootstrapPromise = fetch(`${API_BASE}/bootstrap`, {credentials: 'include'})
         .then(res => {
-            console.log('checkLoginStatus /api/me status', res.status);
-            if (!res.ok) throw new Error('Not authenticated');
+            if (!res.ok) throw new Error('Bootstrap failed');
             return res.json();
         })
         .then(data => {
+            rememberReference('/shelters', data.shelters);
+            if (data.caretakers) rememberReference('/caretakers', data.caretakers);
             if (data.user) {
                 currentUser = data.user;
-                // is_admin is already in data.user from /api/me endpoint
-                console.log('checkLoginStatus - currentUser:', currentUser);
                 updateUIForLoggedInUser();
                 if (!currentUser.is_admin) {
-                    loadWalletBalance();
+                    showWalletBalance(data.wallet?.balance ?? 0);
                 } else {
                     // If admin, automatically show admin dashboard
                     showSection('admin');
@@ -175,7 +293,8 @@ function checkLoginStatus() {
                 updateUIForLoggedOutUser();
             }
         })
-        .catch(() => updateUIForLoggedOutUser());
+        .catch(() => updateUIForLoggedOutUser())
+        .finally(() => { bootstrapPromise = null; });
 }
 
 function updateUIForLoggedInUser() {
@@ -274,11 +393,9 @@ async function loadWalletBalance() {
         // Only load if element exists (wallet-display is only for non-admin users)
         if (!walletDisplay) return;
         
-        const response = await fetch(`${API_BASE}/wallet/balance`, {credentials: 'include'});
+        const response = await conditionalFetch(`${API_BASE}/wallet/balance`);
         const data = await response.json();
-        if (response.ok) {
-            walletDisplay.textContent = `$${data.balance.toFixed(2)}`;
-        }
+        if (response.ok) showWalletBalance(data.balance);
     } catch (error) {
         console.error('Failed to load wallet balance', error);
     }
@@ -310,11 +427,15 @@ async function handleAddFunds(e) {
     }
 }
 
+function showWalletBalance(balance) {
+    const walletDisplay = document.getElementById('wallet-display');
+    if (walletDisplay) walletDisplay.textContent = `$${Number(balance).toFixed(2)}`;
+}
+
 // Shelters
 async function loadShelters() {
     try {
-        const response = await fetch(`${API_BASE}/shelters`, {credentials: 'include'});
-        const shelters = await response.json();
+        const shelters = await fetchReference('/shelters');
         
         const select = document.getElementById('shelter-filter');
         select.innerHTML = '<option value="">All Shelters</option>';
@@ -330,30 +451,43 @@ async function loadShelters() {
 }
 
 // Pets
+let petsPager = null;
+
 async function loadPets() {
     const queryEl = document.getElementById('pet-search');
     const q = queryEl ? queryEl.value.trim() : '';
-    let url = `${API_BASE}/pets`;
-    if (q) {
-        const params = new URLSearchParams({ q });
-        url = `${url}?${params.toString()}`;
-    }
+    const pager = createPager(`${API_BASE}/pets`, 'pets', q ? { q } : {});
+    petsPager = pager;
     
     try {
-        const response = await fetch(url, {credentials: 'include'});
-        const pets = await response.json();
+        const pets = await pager.next();
+        if (pager !== petsPager) return;
         displayPets(pets);
+        observeScrollEnd(document.getElementById('pets-grid'), () => loadMorePets(pager));
     } catch (error) {
         showAlert('Failed to load pets', 'error');
     }
 }
 
-function displayPets(pets) {
+async function loadMorePets(pager) {
+    if (pager !== petsPager || pager.done) return false;
+    try {
+        const pets = await pager.next();
+        if (pager !== petsPager) return false;
+        displayPets(pets, true);
+    } catch (error) {
+        showAlert('Failed to load more pets', 'error');
+        return false;
+    }
+    return !pager.done;
+}
+
+function displayPets(pets, append = false) {
     const grid = document.getElementById('pets-grid');
-    grid.innerHTML = '';
+    if (!append) grid.innerHTML = '';
     
     if (pets.length === 0) {
-        grid.innerHTML = '<p>No pets available at the moment.</p>';
+        if (!append) grid.innerHTML = '<p>No pets available at the moment.</p>';
         return;
     }
     
@@ -441,29 +575,42 @@ async function applyForAdoption(petId) {
 }
 
 // Shop
+let shopPager = null;
+
 async function loadShopItems() {
     try {
         const queryEl = document.getElementById('shop-search');
         const q = queryEl ? queryEl.value.trim() : '';
-        let url = `${API_BASE}/shop/items`;
-        if (q) {
-            const params = new URLSearchParams({ q });
-            url = `${url}?${params.toString()}`;
-        }
-        const response = await fetch(url, {credentials: 'include'});
-        const items = await response.json();
+        const pager = createPager(`${API_BASE}/shop/items`, 'items', q ? { q } : {});
+        shopPager = pager;
+        const items = await pager.next();
+        if (pager !== shopPager) return;
         displayShopItems(items);
+        observeScrollEnd(document.getElementById('shop-grid'), () => loadMoreShopItems(pager));
     } catch (error) {
         showAlert('Failed to load shop items', 'error');
     }
 }
 
-function displayShopItems(items) {
+async function loadMoreShopItems(pager) {
+    if (pager !== shopPager || pager.done) return false;
+    try {
+        const items = await pager.next();
+        if (pager !== shopPager) return false;
+        displayShopItems(items, true);
+    } catch (error) {
+        showAlert('Failed to load more shop items', 'error');
+        return false;
+    }
+    return !pager.done;
+}
+
+function displayShopItems(items, append = false) {
     const grid = document.getElementById('shop-grid');
-    grid.innerHTML = '';
+    if (!append) grid.innerHTML = '';
     
     if (items.length === 0) {
-        grid.innerHTML = '<p>No items available.</p>';
+        if (!append) grid.innerHTML = '<p>No items available.</p>';
         return;
     }
     
@@ -478,101 +625,130 @@ function displayShopItems(items) {
             <p class="card-info"><strong>Shelter:</strong> ${item.shelter_name}</p>
             <div class="card-actions">
                 <input type="number" id="qty-${item.item_id}" min="1" max="${item.stock_quantity}" value="1" style="width: 60px; padding: 0.3rem;">
-                <button class="btn btn-success" onclick="addToCart(${item.item_id}, ${item.price}, ${item.shelter_id}, '${item.name.replace(/'/g, "\'")}')">Add to Cart</button>
+                <button class="btn btn-success" onclick="addToCart(${item.item_id})">Add to Cart</button>
             </div>
         `;
         grid.appendChild(card);
     });
 }
 
-// Cart functionality
-const cart = new Map(); // item_id -> {name, price, shelter_id, quantity}
+// Cart functionality: the cart lives on the server, and adding an item reserves its stock
+// for a limited time (see the expiry shown under the cart).
+let cart = {items: [], total: 0, expires_at: null};
 
-function addToCart(itemId, price, shelterId, name) {
+async function cartRequest(method, path, body) {
+    const options = {method, credentials: 'include'};
+    if (body !== undefined) {
+        options.headers = {'Content-Type': 'application/json'};
+        options.body = JSON.stringify(body);
+    }
+    const response = await fetch(`${API_BASE}/cart${path}`, options);
+    const data = await response.json();
+    if (!response.ok) throw new Error(data.error || 'Cart update failed');
+    cart = data;
+    updateCartDisplay();
+    return data;
+}
+
+async function loadCart() {
+    try {
+        await cartRequest('GET', '');
+    } catch (error) {
+        showAlert('Failed to load cart', 'error');
+    }
+}
+
+async function addToCart(itemId) {
     if (!currentUser) {
         showAlert('Please login to add items to cart', 'error');
         openModal('login-modal');
         return;
     }
     const qtyInput = document.getElementById(`qty-${itemId}`);
-    const qty = Math.max(1, parseInt(qtyInput?.value || '1'));
-    if (cart.has(itemId)) {
-        const entry = cart.get(itemId);
-        entry.quantity += qty;
-        cart.set(itemId, entry);
-    } else {
-        cart.set(itemId, {name, price: Number(price), shelter_id: shelterId, quantity: qty});
+    const quantity = Math.max(1, parseInt(qtyInput?.value || '1'));
+    try {
+        await cartRequest('POST', '/items', {item_id: itemId, quantity});
+        loadShopItems();
+    } catch (error) {
+        showAlert(error.message, 'error');
     }
-    updateCartDisplay();
 }
 
 function updateCartDisplay() {
     const list = document.getElementById('cart-list');
     const totalEl = document.getElementById('cart-total');
     if (!list || !totalEl) return;
-    if (cart.size === 0) {
+    if (cart.items.length === 0) {
         list.innerHTML = '<p>Your cart is empty.</p>';
         totalEl.textContent = '$0.00';
         return;
     }
     let html = '';
-    let total = 0;
-    cart.forEach((entry, itemId) => {
-        const line = entry.price * entry.quantity;
-        total += line;
+    cart.items.forEach(entry => {
         html += `<div style="display:flex; justify-content: space-between; align-items:center; gap:10px; margin:4px 0;">
             <div>
                 <strong>${entry.name}</strong><br/>
                 <small>$${entry.price.toFixed(2)} x </small>
-                <input type="number" min="1" value="${entry.quantity}" style="width:60px;" onchange="setCartQty(${itemId}, this.value)">
+                <input type="number" min="1" value="${entry.quantity}" style="width:60px;" onchange="setCartQty(${entry.item_id}, this.value)">
             </div>
             <div>
-                $${line.toFixed(2)}
-                <button class="btn btn-danger btn-small" style="margin-left:8px;" onclick="removeFromCart(${itemId})">x</button>
+                $${entry.line_total.toFixed(2)}
+                <button class="btn btn-danger btn-small" style="margin-left:8px;" onclick="removeFromCart(${entry.item_id})">x</button>
             </div>
         </div>`;
     });
+    if (cart.expires_at) {
+        html += `<p><small>Items are reserved until ${new Date(cart.expires_at).toLocaleTimeString()}</small></p>`;
+    }
     list.innerHTML = html;
-    totalEl.textContent = `$${total.toFixed(2)}`;
+    totalEl.textContent = `$${cart.total.toFixed(2)}`;
 }
 
-function setCartQty(itemId, value) {
-    const qty = Math.max(1, parseInt(value || '1'));
-    if (cart.has(itemId)) {
-        const entry = cart.get(itemId);
-        entry.quantity = qty;
-        cart.set(itemId, entry);
+async function setCartQty(itemId, value) {
+    const quantity = Math.max(1, parseInt(value || '1'));
+    try {
+        await cartRequest('PUT', `/items/${itemId}`, {quantity});
+        loadShopItems();
+    } catch (error) {
+        showAlert(error.message, 'error');
         updateCartDisplay();
     }
 }
 
-function removeFromCart(itemId) {
-    cart.delete(itemId);
-    updateCartDisplay();
+async function removeFromCart(itemId) {
+    try {
+        await cartRequest('DELETE', `/items/${itemId}`);
+        loadShopItems();
+    } catch (error) {
+        showAlert(error.message, 'error');
+    }
 }
 
+// One key per checkout attempt, so a retried click or a resent request is not charged twice
+let checkoutKey = null;
+
 async function checkoutCart() {
     if (!currentUser) {
         showAlert('Please login to checkout', 'error');
         openModal('login-modal');
         return;
     }
-    if (cart.size === 0) {
+    if (cart.items.length === 0) {
         showAlert('Your cart is empty', 'error');
         return;
     }
-    const items = Array.from(cart.entries()).map(([item_id, e]) => ({item_id, quantity: e.quantity}));
+    checkoutKey = checkoutKey || (crypto.randomUUID ? crypto.randomUUID() : `${Date.now()}-${Math.random().toString(36).slice(2)}`);
     try {
-        const response = await fetch(`${API_BASE}/shop/order/batch`, {
+        const response = await fetch(`${API_BASE}/cart/checkout`, {
             method: 'POST',
             credentials: 'include',
-            headers: {'Content-Type': 'application/json'},
-            body: JSON.stringify({items})
+            headers: {'Idempotency-Key': checkoutKey}
         });
         const data = await response.json();
+        if (response.status < 500) checkoutKey = null;
         if (response.ok) {
             showAlert(`Order placed successfully! Charged $${Number(data.total_charged || 0).toFixed(2)}`, 'success');
-            cart.clear();
+            cart = {items: [], total: 0, expires_at: null};
             updateCartDisplay();
             loadWalletBalance();
             loadShopItems();
@@ -590,8 +766,7 @@ async function checkoutCart() {
 
 async function loadShopShelterDropdown() {
     try {
-        const response = await fetch(`${API_BASE}/shelters`, {credentials: 'include'});
-        const shelters = await response.json();
+        const shelters = await fetchReference('/shelters');
         const select = document.getElementById('shop-shelter-filter');
         if (!select) return;
         select.innerHTML = '<option value="">All Shelters</option>';
@@ -769,7 +944,7 @@ function showAdminTab(tabName) {
 async function loadAdminDashboard() {
     const content = document.getElementById('admin-content');
     try {
-        const response = await fetch('/api/admin/applications', {credentials: 'include'});
+        const response = await conditionalFetch(`${API_BASE}/admin/applications`);
         const applications = await response.json();
         console.log('Admin applications data:', applications);
         
@@ -778,7 +953,11 @@ async function loadAdminDashboard() {
         if (!applications || applications.length === 0) {
             html += '<p>No applications at this time.</p>';
         } else {
-            html += '<table border="1" style="width:100%; border-collapse: collapse;"><tr><th>Type</th><th>User</th><th>Pet</th><th>Status</th><th>Date</th><th>Actions</th></tr>';
+            html += `<div style="margin: 10px 0;">
+                <button class="btn btn-success btn-small" onclick="bulkUpdateApplications('approve')">Approve selected</button>
+                <button class="btn btn-danger btn-small" onclick="bulkUpdateApplications('reject')">Reject selected</button>
+            </div>`;
+            html += '<table border="1" style="width:100%; border-collapse: collapse;"><tr><th><input type="checkbox" title="Select all pending" onchange="document.querySelectorAll(\'.app-select\').forEach(cb => cb.checked = this.checked)"></th><th>Type</th><th>User</th><th>Pet</th><th>Status</th><th>Date</th><th>Actions</th></tr>';
             applications.forEach(app => {
                 const statusColor = app.status === 'approved' ? 'green' : app.status === 'rejected' ? 'red' : 'orange';
                 // Get the application ID - handle both adoption and donor apps
@@ -788,6 +967,7 @@ async function loadAdminDashboard() {
                 const appType = app.type === 'adoption' ? 'adoption' : 'donor';
                 console.log(`App: type=${appType}, appId=${appId}, adoption_app_id=${app.adoption_app_id}, donor_app_id=${app.donor_app_id}`);
                 html += `<tr>
+                    <td>${app.status === 'pending' ? `<input type="checkbox" class="app-select" data-type="${appType}" data-id="${appId}">` : ''}</td>
                     <td><strong>${app.type === 'adoption' ? 'Adoption' : 'Donor'}</strong></td>
                     <td>${app.username}</td>
                     <td>${app.pet_name}</td>
@@ -846,12 +1026,46 @@ async function updateApplicationStatus(appId, appType, newStatus) {
     }
 }
 
+// Approve or reject every checked application with one request
+async function bulkUpdateApplications(action) {
+    const actions = Array.from(document.querySelectorAll('.app-select:checked'))
+        .map(cb => ({type: cb.dataset.type, id: Number(cb.dataset.id), action}));
+    if (actions.length === 0) {
+        showAlert('Select at least one pending application', 'error');
+        return;
+    }
+    if (!confirm(`${action === 'approve' ? 'Approve' : 'Reject'} ${actions.length} application(s)?`)) return;
+
+    try {
+        const response = await fetch(`${API_BASE}/admin/applications/bulk`, {
+            method: 'POST',
+            credentials: 'include',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({actions})
+        });
+        const data = await response.json();
+        if (!response.ok) {
+            alert(`Error: ${data.error || 'Failed to update applications'}`);
+            return;
+        }
+        const failures = data.results.filter(r => !r.ok);
+        if (failures.length === 0) {
+            showAlert(`${data.succeeded} application(s) updated`, 'success');
+        } else {
+            alert(`${data.succeeded} updated, ${data.failed} failed:\n` +
+                failures.map(r => `${r.type} #${r.id}: ${r.error}`).join('\n'));
+        }
+        loadAdminDashboard();
+    } catch (error) {
+        alert(`Failed to update applications: ${error.message}`);
+    }
+}
+
 // Load and display all shelters with CRUD
 async function loadAdminShelters() {
     const content = document.getElementById('admin-content');
     try {
-        const response = await fetch(`${API_BASE}/shelters`, {credentials: 'include'});
-        const shelters = await response.json();
+        const shelters = await fetchReference('/shelters');
         
         let html = `<h3>Manage Shelters</h3>
             <button class="btn btn-primary" onclick="showShelterForm(null)">+ Add Shelter</button>
@@ -975,8 +1189,7 @@ async function loadAdminShopItems() {
 
 async function loadShelterDropdownForShopItem() {
     try {
-        const response = await fetch(`${API_BASE}/shelters`, {credentials: 'include'});
-        const shelters = await response.json();
+        const shelters = await fetchReference('/shelters');
         const select = document.getElementById('shopitem-shelter-id');
         if (!select) return;
         select.innerHTML = '<option value="">Select Shelter</option>';
@@ -1061,13 +1274,16 @@ async function loadAdminRevenue() {
         let html = `<h3>Finance - Shelter Revenues</h3>
             <div class="card"><strong>Total Revenue:</strong> $${totalRevenue.toFixed(2)}</div>
             <table border="1" style="width:100%; border-collapse: collapse; margin-top: 10px;">
-                <tr><th>Shelter</th><th>Revenue</th><th>Adopted Pets</th><th>Available Pets</th></tr>`;
+                <tr><th>Shelter</th><th>Revenue</th><th>Adopted Pets</th><th>Available Pets</th><th>Caretakers</th><th>Shop Items</th><th>Orders</th></tr>`;
         shelters.forEach(s => {
             html += `<tr>
                 <td>${s.name} (#${s.shelter_id})</td>
                 <td>$${Number(s.revenue || 0).toFixed(2)}</td>
                 <td>${s.adopted_count}</td>
                 <td>${s.available_count}</td>
+                <td>${s.caretaker_count}</td>
+                <td>${s.item_count}</td>
+                <td>${s.order_count}</td>
             </tr>`;
         });
         html += '</table>';
@@ -1078,31 +1294,42 @@ async function loadAdminRevenue() {
 }
 
 // Admin: Adoption history view
+let historyPager = null;
+
+function adoptionHistoryRows(adoptions) {
+    return adoptions.map(a => `<tr>
+                    <td>${a.adoption_date}</td>
+                    <td>${a.username} (#${a.user_id})</td>
+                    <td>${a.pet_name} (#${a.pet_id})</td>
+                    <td>${a.species}${a.breed ? ' / ' + a.breed : ''}</td>
+                    <td>$${Number(a.price || 0).toFixed(2)}</td>
+                    <td>${a.shelter_name || ''}</td>
+                </tr>`).join('');
+}
+
 async function loadAdoptionHistory() {
     const content = document.getElementById('admin-content');
     try {
-        const response = await fetch(`${API_BASE}/admin/adoptions/history`, {credentials: 'include'});
-        const data = await response.json();
-        if (!response.ok) throw new Error(data.error || 'Failed to load adoptions');
-        const adoptions = data.adoptions || [];
+        const pager = createPager(`${API_BASE}/admin/adoptions/history`, 'adoptions');
+        historyPager = pager;
+        const adoptions = await pager.next();
         let html = `<h3>Adoption History</h3>`;
         if (adoptions.length === 0) {
             html += '<p>No adoptions yet.</p>';
         } else {
-            html += '<table border="1" style="width:100%; border-collapse: collapse;"><tr><th>Date</th><th>User</th><th>Pet</th><th>Species/Breed</th><th>Price</th><th>Shelter</th></tr>';
-            adoptions.forEach(a => {
-                html += `<tr>
-                    <td>${a.adoption_date}</td>
-                    <td>${a.username} (#${a.user_id})</td>
-                    <td>${a.pet_name} (#${a.pet_id})</td>
-                    <td>${a.species}${a.breed ? ' / ' + a.breed : ''}</td>
-                    <td>$${Number(a.price || 0).toFixed(2)}</td>
-                    <td>${a.shelter_name || ''}</td>
-                </tr>`;
-            });
+            html += '<table id="adoption-history-table" border="1" style="width:100%; border-collapse: collapse;"><tr><th>Date</th><th>User</th><th>Pet</th><th>Species/Breed</th><th>Price</th><th>Shelter</th></tr>';
+            html += adoptionHistoryRows(adoptions);
             html += '</table>';
         }
         content.innerHTML = html;
+        observeScrollEnd(document.getElementById('adoption-history-table'), async () => {
+            if (pager !== historyPager || pager.done) return false;
+            const more = await pager.next();
+            const table = document.getElementById('adoption-history-table');
+            if (pager !== historyPager || !table) return false;
+            table.tBodies[0].insertAdjacentHTML('beforeend', adoptionHistoryRows(more));
+            return !pager.done;
+        });
     } catch (error) {
         content.innerHTML = `<p style="color: red;">Error loading adoption history: ${error.message}</p>`;
     }
@@ -1140,6 +1367,7 @@ async function saveShelter() {
         const data = await response.json();
         if (response.ok) {
             showAlert(id ? 'Shelter updated!' : 'Shelter created!', 'success');
+            invalidateReference();
             loadAdminShelters();
         } else {
             alert(`Error: ${data.error}`);
@@ -1159,6 +1387,7 @@ async function deleteShelter(id) {
         const data = await response.json();
         if (response.ok) {
             showAlert('Shelter deleted!', 'success');
+            invalidateReference();
             loadAdminShelters();
         } else {
             alert(`Error: ${data.error}`);
@@ -1169,12 +1398,38 @@ async function deleteShelter(id) {
 }
 
 // Load and display all pets with CRUD
+let adminPetsPager = null;
+
+function adminPetRows(pets) {
+    return pets.map(p => {
+        const nameStyle = !p.name ? 'style="background-color: #ffcccc;"' : '';
+        const specStyle = !p.species ? 'style="background-color: #ffcccc;"' : '';
+        const healthStyle = !p.health_status ? 'style="background-color: #ffcccc;"' : '';
+        return `<tr>
+                    <td>${p.pet_id}</td>
+                    <td ${nameStyle}>${p.name || '(empty)'}</td>
+                    <td ${specStyle}>${p.species || '(empty)'}</td>
+                    <td>${p.breed || '(empty)'}</td>
+                    <td>${p.age || '(empty)'}</td>
+                    <td ${healthStyle}>${p.health_status || '(empty)'}</td>
+                    <td>${p.status || 'Available'}</td>
+                    <td>$${p.price || '0'}</td>
+                    <td>
+                        <button class="btn btn-small" onclick="showPetForm(${p.pet_id})">Edit</button>
+                        <button class="btn btn-small" onclick="openVetModal(${p.pet_id}, '${p.name}')">Vet Records</button>
+                        <button class="btn btn-danger btn-small" onclick="deletePet(${p.pet_id})">Delete</button>
+                    </td>
+                </tr>`;
+    }).join('');
+}
+
 async function loadAdminPets() {
     const content = document.getElementById('admin-content');
     try {
-        // Fetch all pets (including adopted) via admin endpoint
-        const response = await fetch(`${API_BASE}/admin/pets`, {credentials: 'include'});
-        const pets = await response.json();
+        // Fetch all pets (including adopted) via admin endpoint, one page at a time
+        const pager = createPager(`${API_BASE}/admin/pets`, 'pets');
+        adminPetsPager = pager;
+        const pets = await pager.next();
         
         let html = `<h3>Manage Pets</h3>
             <button class="btn btn-primary" onclick="showPetForm(null)">+ Add Pet</button>
@@ -1228,31 +1483,20 @@ async function loadAdminPets() {
         if (pets.length === 0) {
             html += '<p>No pets found.</p>';
         } else {
-            html += '<table border="1" style="width:100%; border-collapse: collapse;"><tr><th>ID</th><th>Name</th><th>Species</th><th>Breed</th><th>Age</th><th>Health</th><th>Status</th><th>Price</th><th>Actions</th></tr>';
-            pets.forEach(p => {
-                const nameStyle = !p.name ? 'style="background-color: #ffcccc;"' : '';
-                const specStyle = !p.species ? 'style="background-color: #ffcccc;"' : '';
-                const healthStyle = !p.health_status ? 'style="background-color: #ffcccc;"' : '';
-                html += `<tr>
-                    <td>${p.pet_id}</td>
-                    <td ${nameStyle}>${p.name || '(empty)'}</td>
-                    <td ${specStyle}>${p.species || '(empty)'}</td>
-                    <td>${p.breed || '(empty)'}</td>
-                    <td>${p.age || '(empty)'}</td>
-                    <td ${healthStyle}>${p.health_status || '(empty)'}</td>
-                    <td>${p.status || 'Available'}</td>
-                    <td>$${p.price || '0'}</td>
-                    <td>
-                        <button class="btn btn-small" onclick="showPetForm(${p.pet_id})">Edit</button>
-                        <button class="btn btn-small" onclick="openVetModal(${p.pet_id}, '${p.name}')">Vet Records</button>
-                        <button class="btn btn-danger btn-small" onclick="deletePet(${p.pet_id})">Delete</button>
-                    </td>
-                </tr>`;
-            });
+            html += '<table id="admin-pets-table" border="1" style="width:100%; border-collapse: collapse;"><tr><th>ID</th><th>Name</th><th>Species</th><th>Breed</th><th>Age</th><th>Health</th><th>Status</th><th>Price</th><th>Actions</th></tr>';
+            html += adminPetRows(pets);
             html += '</table>';
         }
         html += '</div>';
         content.innerHTML = html;
+        observeScrollEnd(document.getElementById('admin-pets-table'), async () => {
+            if (pager !== adminPetsPager || pager.done) return false;
+            const more = await pager.next();
+            const table = document.getElementById('admin-pets-table');
+            if (pager !== adminPetsPager || !table) return false;
+            table.tBodies[0].insertAdjacentHTML('beforeend', adminPetRows(more));
+            return !pager.done;
+        });
         
         // Populate shelter and caretaker dropdowns
         loadShelterDropdown();
@@ -1264,8 +1508,7 @@ async function loadAdminPets() {
 
 async function loadShelterDropdown() {
     try {
-        const response = await fetch(`${API_BASE}/shelters`, {credentials: 'include'});
-        const shelters = await response.json();
+        const shelters = await fetchReference('/shelters');
         const select = document.getElementById('pet-shelter-id');
         select.innerHTML = '<option value="">Select Shelter</option>';
         shelters.forEach(s => {
@@ -1498,8 +1741,7 @@ async function deletePet(id) {
 async function loadAdminCaretakers() {
     const content = document.getElementById('admin-content');
     try {
-        const response = await fetch(`${API_BASE}/caretakers`, {credentials: 'include'});
-        const caretakers = await response.json() || [];
+        const caretakers = await fetchReference('/caretakers') || [];
         
         let html = `<h3>Manage Caretakers</h3>
             <button class="btn btn-primary" onclick="showCaretakerForm(null)">+ Add Caretaker</button>
@@ -1555,8 +1797,7 @@ async function loadAdminCaretakers() {
 
 async function loadShelterDropdownForCaretaker() {
     try {
-        const response = await fetch(`${API_BASE}/shelters`, {credentials: 'include'});
-        const shelters = await response.json();
+        const shelters = await fetchReference('/shelters');
         const select = document.getElementById('caretaker-shelter-id');
         select.innerHTML = '<option value="">Select Shelter</option>';
         shelters.forEach(s => {
@@ -1599,6 +1840,7 @@ async function saveCaretaker() {
         const data = await response.json();
         if (response.ok) {
             showAlert(id ? 'Caretaker updated!' : 'Caretaker created!', 'success');
+            invalidateReference();
             loadAdminCaretakers();
         } else {
             alert(`Error: ${data.error}`);
@@ -1618,6 +1860,7 @@ async function deleteCaretaker(id) {
         const data = await response.json();
         if (response.ok) {
             showAlert('Caretaker deleted!', 'success');
+            invalidateReference();
             loadAdminCaretakers();
         } else {
             alert(`Error: ${data.error}`);